@@ -0,0 +1,119 @@
+"""
+Benchmark: direct-XML OOXML extractors vs. python-docx / python-pptx / openpyxl.
+
+Builds a synthetic corpus in a temporary directory and times both extraction
+paths on it.
+
+    python benchmarks/bench_ooxml.py [--files 20] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import docx  # noqa: E402
+import openpyxl  # noqa: E402
+from pptx import Presentation  # noqa: E402
+from pptx.util import Inches  # noqa: E402
+
+from utils.file_operations import extract_docx_text, extract_excel_text, extract_pptx_text  # noqa: E402
+from utils.ooxml import extract_docx_xml, extract_pptx_xml, extract_xlsx_xml  # noqa: E402
+
+WORDS = "検索 読み取り専用 ビューア preview extract document table header footer notes".split()
+
+
+def _sentence(i: int, length: int = 12) -> str:
+    return " ".join(WORDS[(i + k) % len(WORDS)] for k in range(length))
+
+
+def make_docx(path: str, paragraphs: int) -> None:
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "ヘッダー " + _sentence(0)
+    document.sections[0].footer.paragraphs[0].text = "フッター " + _sentence(1)
+    for i in range(paragraphs):
+        document.add_paragraph(_sentence(i))
+        if i % 50 == 0:
+            table = document.add_table(rows=5, cols=4)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"{r}-{c} {WORDS[(r + c) % len(WORDS)]}"
+    document.save(path)
+
+
+def make_pptx(path: str, slides: int) -> None:
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for i in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"スライド {i}"
+        slide.placeholders[1].text = "\n".join(_sentence(i + k) for k in range(6))
+        shape = slide.shapes.add_table(3, 3, Inches(1), Inches(4), Inches(6), Inches(1))
+        for r in range(3):
+            for c in range(3):
+                shape.table.cell(r, c).text = WORDS[(i + r + c) % len(WORDS)]
+        slide.notes_slide.notes_text_frame.text = "ノート " + _sentence(i)
+    prs.save(path)
+
+
+def make_xlsx(path: str, rows: int) -> None:
+    wb = openpyxl.Workbook()
+    for s in range(3):
+        ws = wb.active if s == 0 else wb.create_sheet()
+        ws.title = f"Sheet{s + 1}"
+        for r in range(rows):
+            ws.append([WORDS[(r + c) % len(WORDS)] if c % 2 else r * c for c in range(10)])
+    wb.save(path)
+
+
+def build_corpus(directory: str, count: int) -> dict:
+    corpus = {"docx": [], "pptx": [], "xlsx": []}
+    for i in range(count):
+        for ext, maker, size in (("docx", make_docx, 400), ("pptx", make_pptx, 30), ("xlsx", make_xlsx, 1000)):
+            path = os.path.join(directory, f"sample{i}.{ext}")
+            maker(path, size)
+            corpus[ext].append(path)
+    return corpus
+
+
+def time_extractor(fn: Callable[[str], str], files: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in files:
+            fn(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20, help="files per format")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pairs = {
+        "docx": (extract_docx_text, extract_docx_xml),
+        "pptx": (extract_pptx_text, extract_pptx_xml),
+        "xlsx": (extract_excel_text, extract_xlsx_xml),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building synthetic corpus ({args.files} files per format)...")
+        corpus = build_corpus(tmp, args.files)
+        print(f"{'format':<8}{'object model':>14}{'direct XML':>14}{'speedup':>10}{'chars old/new':>20}")
+        for ext, (old, new) in pairs.items():
+            files = corpus[ext]
+            t_old = time_extractor(old, files, args.repeat)
+            t_new = time_extractor(new, files, args.repeat)
+            chars_old = sum(len(old(p)) for p in files)
+            chars_new = sum(len(new(p)) for p in files)
+            print(f"{ext:<8}{t_old:>13.3f}s{t_new:>13.3f}s{t_old / t_new:>9.1f}x{chars_old:>10}/{chars_new}")
+
+
+if __name__ == "__main__":
+    main()
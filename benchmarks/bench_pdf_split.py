@@ -0,0 +1,89 @@
+"""
+Benchmark: searching large PDFs with and without page-range splitting.
+
+Builds synthetic multi-page PDFs in a temporary directory and searches them
+with a fresh disk cache, once with large PDFs split into page ranges across
+the pool and once with every PDF extracted whole by one worker.
+
+    python benchmarks/bench_pdf_split.py [--files 30] [--pages 250] [--workers 1]
+
+The split thresholds are lowered in this process before the pool forks, so
+the synthetic PDFs qualify regardless of their size on disk. Requires the
+fork start method (Linux/macOS).
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import fitz  # noqa: E402
+
+from bench_ooxml import _sentence  # noqa: E402
+
+
+def make_pdf(path: str, pages: int) -> None:
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(20):
+            page.insert_text((40, 40 + line * 18), f"{i}-{line} " + _sentence(i + line, 8))
+    doc.save(path)
+    doc.close()
+
+
+def build_corpus(directory: str, count: int, pages: int) -> List[str]:
+    files = []
+    for i in range(count):
+        path = os.path.join(directory, f"sample{i}.pdf")
+        make_pdf(path, pages)
+        files.append(path)
+    return files
+
+
+def run(files: List[str], split: bool, workers: Optional[int]):
+    from utils import search_worker
+    from utils.process_pool import create_process_pool
+    from utils.text_cache import TextCache
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Fresh disk cache and thresholds per run, inherited by the forked workers
+        search_worker.text_cache = TextCache(cache_dir)
+        search_worker.PDF_PARALLEL_MIN_BYTES = 0
+        search_worker.PDF_PARALLEL_MIN_PAGES = 200 if split else 10 ** 9
+        with create_process_pool(workers) as pool:
+            start = time.perf_counter()
+            hits = sum(1 for _path, count in search_worker.iter_search(pool, "preview", files) if count)
+            seconds = time.perf_counter() - start
+    return seconds, hits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--pages", type=int, default=250)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        sys.exit("This benchmark needs the fork start method (Linux/macOS).")
+    multiprocessing.set_start_method("fork")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building {args.files} PDFs of {args.pages} pages...")
+        files = build_corpus(tmp, args.files, args.pages)
+        print(f"{'mode':<14}{'best of ' + str(args.repeat):>12}{'hits':>7}")
+        for label, split in (("whole", False), ("page ranges", True)):
+            timings = [run(files, split, args.workers) for _ in range(args.repeat)]
+            print(f"{label:<14}{min(t for t, _ in timings):>11.2f}s{timings[0][1]:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: streaming search hits into the results view vs. a plain QListWidget.
+
+Feeds synthetic hits to Previewer in batches (as the content search does) and
+processes GUI events after every batch, then times sorting and filtering.
+Runs with the offscreen Qt platform unless QT_QPA_PLATFORM is set.
+
+    python benchmarks/bench_results_view.py [--hits 50000] [--batch 500]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QListWidget  # noqa: E402
+
+from widgets.previewer import Previewer  # noqa: E402
+from widgets.search_results_model import SearchResultsModel  # noqa: E402
+
+
+def make_hits(count: int) -> List[Tuple[str, int]]:
+    # The paths do not exist; the benchmark only sorts by path and hit count
+    return [(f"/share/project{i % 97}/sub{i % 13}/file_{(i * 7919) % count:06d}.txt", 1 + i % 5)
+            for i in range(count)]
+
+
+def bench_list_widget(app: QApplication, hits: List[Tuple[str, int]], batch: int) -> float:
+    # batch=len(hits) is what the old display_search_results did: fill once, then show
+    widget = QListWidget()
+    widget.resize(900, 700)
+    widget.show()
+    app.processEvents()
+    start = time.perf_counter()
+    for i in range(0, len(hits), batch):
+        for path, count in hits[i:i + batch]:
+            widget.addItem(f"{path} ({count})")
+        app.processEvents()
+    return time.perf_counter() - start
+
+
+def bench_previewer(app: QApplication, hits: List[Tuple[str, int]], batch: int) -> dict:
+    previewer = Previewer()
+    previewer.resize(900, 700)
+    previewer.show()
+    app.processEvents()
+    view = previewer.search_results_list
+    timings = {}
+
+    start = time.perf_counter()
+    previewer.begin_search_results("bench")
+    for i in range(0, len(hits), batch):
+        previewer.append_search_results(hits[i:i + batch])
+        app.processEvents()
+    previewer.finish_search_results("bench")
+    app.processEvents()
+    timings["stream + final sort"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    view.sortByColumn(SearchResultsModel.COL_HITS, Qt.SortOrder.DescendingOrder)
+    app.processEvents()
+    timings["sort by hits"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    previewer.results_filter.setText("project1")
+    app.processEvents()
+    timings["filter"] = time.perf_counter() - start
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    hits = make_hits(args.hits)
+    print(f"{args.hits} hits in batches of {args.batch}")
+    print(f"  QListWidget, all at once:         {bench_list_widget(app, hits, len(hits)):7.2f} s")
+    print(f"  QListWidget, in batches:          {bench_list_widget(app, hits, args.batch):7.2f} s")
+    for name, seconds in bench_previewer(app, hits, args.batch).items():
+        print(f"  results view, {name + ':':<20} {seconds:7.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
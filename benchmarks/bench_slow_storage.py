@@ -0,0 +1,197 @@
+"""
+Benchmark: slow-storage mode on a simulated network share.
+
+Builds a synthetic corpus in a temporary directory and makes it behave like a
+remote share by patching open()/os.stat() in this process before the pool
+forks: every read request and stat pays a round-trip latency, and transfers
+are served one at a time by a shared "server" that also charges a seek when it
+switches between files. Then it indexes the corpus with the normal pipeline
+and with slow-storage mode at several per-mount concurrency limits, and times a
+second (cached) search pass, which is dominated by identity stat calls.
+
+    python benchmarks/bench_slow_storage.py [--files 60] [--latency-ms 2] [--mbps 100] [--seek-ms 4]
+
+PDFs are not part of the corpus: PyMuPDF reads files natively, so the patched
+open() could not delay them. Requires the fork start method (Linux/macOS).
+"""
+from __future__ import annotations
+
+import argparse
+import builtins
+import io
+import itertools
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from bench_ooxml import make_docx, make_xlsx, _sentence  # noqa: E402
+
+
+class SimulatedShare:
+    """Latency and a single shared transfer link for every path below *root*."""
+
+    def __init__(self, root: str, latency_ms: float, mbps: float, seek_ms: float) -> None:
+        self.root = os.path.normcase(os.path.abspath(root)) + os.sep
+        self.latency = latency_ms / 1000
+        self.bytes_per_second = mbps * 1e6
+        self.seek = seek_ms / 1000
+        # Shared with forked workers: the link serves one transfer at a time
+        self._link = multiprocessing.Lock()
+        self._last_file = multiprocessing.Value("q", -1, lock=False)
+        self.requests = multiprocessing.Value("q", 0)
+        self._open = builtins.open
+        self._stat = os.stat
+
+    def covers(self, path) -> bool:
+        if not isinstance(path, (str, os.PathLike)):
+            return False
+        return os.path.normcase(os.path.abspath(os.fspath(path))).startswith(self.root)
+
+    def charge(self, file_id: int, size: int) -> None:
+        with self.requests.get_lock():
+            self.requests.value += 1
+        time.sleep(self.latency)
+        with self._link:
+            delay = size / self.bytes_per_second
+            if self._last_file.value != file_id:
+                delay += self.seek
+                self._last_file.value = file_id
+            time.sleep(delay)
+
+    def install(self) -> None:
+        share = self
+        opened = itertools.count()
+
+        class SlowRaw(io.RawIOBase):
+            def __init__(self, path: str) -> None:
+                self._f = io.FileIO(path, "r")
+                self.name = path
+                self._id = os.getpid() * 1_000_000 + next(opened)
+
+            def readable(self) -> bool:
+                return True
+
+            def seekable(self) -> bool:
+                return True
+
+            def readinto(self, buffer) -> int:
+                n = self._f.readinto(buffer)
+                share.charge(self._id, n or 0)
+                return n
+
+            def seek(self, offset: int, whence: int = 0) -> int:
+                return self._f.seek(offset, whence)
+
+            def tell(self) -> int:
+                return self._f.tell()
+
+            def fileno(self) -> int:
+                return self._f.fileno()
+
+            def close(self) -> None:
+                self._f.close()
+                super().close()
+
+        def slow_open(file, mode="r", buffering=-1, encoding=None, errors=None, newline=None,
+                      closefd=True, opener=None):
+            if not share.covers(file) or any(c in mode for c in "wax+"):
+                return share._open(file, mode, buffering, encoding, errors, newline, closefd, opener)
+            share.charge(-1, 0)  # open は1往復
+            raw = SlowRaw(os.fspath(file))
+            if buffering == 0:
+                return raw
+            buffered = io.BufferedReader(raw, buffering if buffering > 1 else io.DEFAULT_BUFFER_SIZE)
+            if "b" in mode:
+                return buffered
+            return io.TextIOWrapper(buffered, encoding=encoding, errors=errors, newline=newline)
+
+        def slow_stat(path, *args, **kwargs):
+            if share.covers(path):
+                share.charge(-1, 0)
+            return share._stat(path, *args, **kwargs)
+
+        builtins.open = slow_open
+        io.open = slow_open
+        os.stat = slow_stat
+
+
+def make_text(path: str, lines: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(_sentence(i) + "\n")
+
+
+def make_csv(path: str, rows: int) -> None:
+    with open(path, "w", encoding="cp932", newline="") as f:
+        for i in range(rows):
+            f.write(f"{i},{_sentence(i, 4)},{i * 3}\r\n")
+
+
+def build_corpus(directory: str, count: int) -> List[str]:
+    files = []
+    for i in range(count):
+        for ext, maker, size in (("txt", make_text, 4000), ("csv", make_csv, 3000),
+                                 ("docx", make_docx, 300), ("xlsx", make_xlsx, 600)):
+            path = os.path.join(directory, f"sample{i}.{ext}")
+            maker(path, size)
+            files.append(path)
+    return files
+
+
+def run(files: List[str], slow_mode: bool, concurrency: int, workers: Optional[int], share: SimulatedShare):
+    from utils import io_layer
+    from utils import search_worker
+    from utils.process_pool import create_process_pool
+    from utils.text_cache import TextCache
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Fresh disk cache per run, inherited by the forked workers
+        search_worker.text_cache = TextCache(cache_dir)
+        io_layer.configure(io_layer.IOSettings(slow_mode, concurrency))
+        share.requests.value = 0
+        with create_process_pool(workers) as pool:
+            start = time.perf_counter()
+            chars = sum(result[1] for result in search_worker.iter_warm(pool, files))
+            index_seconds = time.perf_counter() - start
+            index_requests = share.requests.value
+        # A new pool, so the search pass starts with empty per-process memory caches
+        with create_process_pool(workers) as pool:
+            start = time.perf_counter()
+            hits = sum(1 for _path, count in search_worker.iter_search(pool, "検索", files) if count)
+            search_seconds = time.perf_counter() - start
+    return index_seconds, index_requests, search_seconds, chars, hits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=60, help="files per format")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="round trip per request")
+    parser.add_argument("--mbps", type=float, default=100.0, help="shared link bandwidth (MB/s)")
+    parser.add_argument("--seek-ms", type=float, default=4.0, help="penalty when the server switches files")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        sys.exit("This benchmark needs the fork start method (Linux/macOS).")
+    multiprocessing.set_start_method("fork")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building synthetic corpus ({args.files} files per format)...")
+        files = build_corpus(tmp, args.files)
+        share = SimulatedShare(tmp, args.latency_ms, args.mbps, args.seek_ms)
+        share.install()
+
+        print(f"{'mode':<18}{'index':>10}{'requests':>10}{'search (cached)':>18}{'chars':>12}{'hits':>7}")
+        configs = [("normal", False, 1)] + [(f"slow, {n}/mount", True, n) for n in (1, 2, 4)]
+        for label, slow_mode, concurrency in configs:
+            index_s, requests, search_s, chars, hits = run(files, slow_mode, concurrency, args.workers, share)
+            print(f"{label:<18}{index_s:>9.2f}s{requests:>10}{search_s:>17.2f}s{chars:>12}{hits:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+ReadOnlyViewer のヘッドレス CLI です。GUI と同じ抽出処理・プロセスプール・ディスクキャッシュを使います。
+
+    python src/cli.py index <dir>            # 抽出してキャッシュを温める (warm も同じ)
+    python src/cli.py search <dir> <keyword> [--json]
+    python src/cli.py stats [--json]
+    python src/cli.py prune [--max-mb 2048]      # ディスクキャッシュを上限まで古いものから削除する
+    python src/cli.py diagnose <dir> [--csv report.csv] [--profile]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from multiprocessing import freeze_support
+from typing import List
+
+from utils import io_layer
+from utils.diagnostics import REPORT_TOP_FILES, DiagnosticsReport
+from utils.disk_cache import atomic_write_bytes, cache_limit_bytes, get_cache_root, prune_cache
+from utils.archive import split_member_path
+from utils.process_pool import create_process_pool
+from utils.search_session import compile_name_filter
+from utils.search_worker import iter_diagnose, iter_search, iter_warm, text_cache, walk_files
+from utils.thumbnail_cache import ThumbnailCache
+
+RUNS_FILE = "runs.json"
+MAX_RECORDED_RUNS = 50
+
+
+def _runs_path() -> str:
+    return os.path.join(get_cache_root(), RUNS_FILE)
+
+
+def load_runs() -> List[dict]:
+    try:
+        with open(_runs_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def record_run(run: dict) -> None:
+    runs = (load_runs() + [run])[-MAX_RECORDED_RUNS:]
+    try:
+        atomic_write_bytes(_runs_path(), json.dumps(runs, ensure_ascii=False, indent=1).encode("utf-8"))
+    except OSError as e:
+        print(f"Error writing run statistics: {e}", file=sys.stderr)
+
+
+def _budget_bytes(args: argparse.Namespace) -> int | None:
+    return None if args.memory_mb is None else int(args.memory_mb * 1024 * 1024)
+
+
+def _configure_io(args: argparse.Namespace) -> None:
+    if args.slow_storage or args.io_concurrency:
+        io_layer.configure(io_layer.IOSettings(
+            True, args.io_concurrency or io_layer.settings.concurrency
+        ))
+
+
+def _collect_files(args: argparse.Namespace) -> List[str]:
+    _configure_io(args)
+    root = os.path.abspath(args.directory)
+    if not os.path.isdir(root):
+        sys.exit(f"ディレクトリが見つかりません: {root}")
+    return walk_files(root, args.pattern)
+
+
+def cmd_index(args: argparse.Namespace) -> int:
+    files = _collect_files(args)
+    print(f"{len(files)} 件のファイルを処理します...", file=sys.stderr)
+    start = time.perf_counter()
+    # アーカイブはメンバーごとに結果が返るので、ファイル数とメンバー数を分けて数えます
+    done = members = cached = 0
+    archives_done = set()
+    total_bytes = 0
+    with create_process_pool(args.workers, _budget_bytes(args)) as pool:
+        for path, _chars, size, _seconds, was_cached in iter_warm(pool, files):
+            member = split_member_path(path)
+            if member is None:
+                done += 1
+            else:
+                members += 1
+                if member[0] not in archives_done:
+                    archives_done.add(member[0])
+                    done += 1
+            cached += was_cached
+            total_bytes += size
+            if not args.quiet and (done + members) % 100 == 0:
+                print(f"  {done}/{len(files)}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    # 失敗したアーカイブや空のアーカイブは結果を返さないので、処理したファイル数は一覧の件数です
+    done = len(files)
+
+    run = {
+        "command": "index",
+        "root": os.path.abspath(args.directory),
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "files": done,
+        "members": members,
+        "cached": cached,
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+    }
+    record_run(run)
+    print(
+        f"完了: {done} 件のファイル (アーカイブ内のファイル {members} 件, キャッシュ済み {cached} 件), "
+        f"{total_bytes / 1e6:.1f} MB, {elapsed:.1f} 秒, "
+        f"{done / elapsed if elapsed else 0:.1f} files/s",
+        file=sys.stderr,
+    )
+    _prune_after_run()
+    return 0
+
+
+def _prune_after_run() -> None:
+    removed, freed = prune_cache()
+    if removed:
+        print(f"キャッシュを {removed} 件 ({freed / 1e6:.1f} MB) 削除しました。", file=sys.stderr)
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    files = _collect_files(args)
+    hits = 0
+    with create_process_pool(args.workers, _budget_bytes(args)) as pool:
+        for file_path, hit_count in iter_search(pool, args.keyword, files):
+            if not hit_count:
+                continue
+            hits += 1
+            if args.json:
+                record = {"path": file_path, "keyword": args.keyword, "hits": hit_count}
+                print(json.dumps(record, ensure_ascii=False), flush=True)
+            else:
+                print(file_path, flush=True)
+    print(f"'{args.keyword}' が {hits} 件のファイルで見つかりました。", file=sys.stderr)
+    _prune_after_run()
+    return 0 if hits else 1
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    text_entries, text_bytes = text_cache.stats()
+    thumb_entries, thumb_bytes = ThumbnailCache().stats()
+    runs = [r for r in load_runs() if r.get("command") == "index"]
+    stats = {
+        "cache_root": get_cache_root(),
+        "text_cache": {"entries": text_entries, "bytes": text_bytes},
+        "thumbnail_cache": {"entries": thumb_entries, "bytes": thumb_bytes},
+        "limit_bytes": cache_limit_bytes(),
+        "recent_runs": runs[-5:],
+    }
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"キャッシュ: {stats['cache_root']}")
+    print(f"  テキスト:     {text_entries} 件, {text_bytes / 1e6:.1f} MB")
+    print(f"  サムネイル:   {thumb_entries} 件, {thumb_bytes / 1e6:.1f} MB")
+    print(f"  上限:         {stats['limit_bytes'] / 1e6:.1f} MB")
+    if runs:
+        print("最近のインデックス実行:")
+    for run in runs[-5:]:
+        seconds = run["seconds"] or 1e-9
+        print(
+            f"  {run['finished']}  {run['root']}: {run['files']} 件 "
+            f"({run['files'] / seconds:.1f} files/s, {run['bytes'] / 1e6 / seconds:.1f} MB/s)"
+        )
+    return 0
+
+
+def cmd_prune(args: argparse.Namespace) -> int:
+    max_bytes = None if args.max_mb is None else int(args.max_mb * 1024 * 1024)
+    removed, freed = prune_cache(max_bytes)
+    print(f"{removed} 件 ({freed / 1e6:.1f} MB) 削除しました。")
+    return 0
+
+
+def cmd_diagnose(args: argparse.Namespace) -> int:
+    files = _collect_files(args)
+    print(f"{len(files)} 件のファイルを診断します (キャッシュを使わずに抽出します)...", file=sys.stderr)
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_dir = tmp if args.profile else None
+        records = []
+        start = time.perf_counter()
+        with create_process_pool(args.workers, _budget_bytes(args)) as pool:
+            for record in iter_diagnose(pool, files, profile_dir):
+                records.append(record)
+                if not args.quiet and len(records) % 100 == 0:
+                    print(f"  {len(records)}/{len(files)}", file=sys.stderr)
+        report = DiagnosticsReport(os.path.abspath(args.directory), records,
+                                   time.perf_counter() - start, profile_dir)
+        print(report.format_text(args.top))
+        if args.profile:
+            print()
+            print(report.profile_text())
+    if args.csv:
+        report.write_csv(args.csv)
+        print(f"CSV を書き出しました: {args.csv}", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="ReadOnlyViewer headless CLI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_tree_options(p: argparse.ArgumentParser) -> None:
+        p.add_argument("directory")
+        p.add_argument("--pattern", default="", help="ファイル名の正規表現フィルタ (ツリーと同じ)")
+        p.add_argument("--workers", type=int, default=None, help="プロセス数 (既定: CPU数 - 1)")
+        p.add_argument("--slow-storage", action="store_true",
+                       help="ネットワーク共有向け: マウントごとの同時読み込み数を制限し、大きな単位で読み込む")
+        p.add_argument("--io-concurrency", type=int, default=None,
+                       help="低速ストレージモードでのマウントごとの同時読み込み数 (既定: 2、指定すると低速モード)")
+        p.add_argument("--memory-mb", type=float, default=None,
+                       help="全プロセス合計のメモリ予算 MB (既定: READONLYVIEWER_MEMORY_BUDGET_MB または 512)")
+
+    index = sub.add_parser("index", aliases=["warm"], help="抽出してディスクキャッシュを温める")
+    add_tree_options(index)
+    index.add_argument("--quiet", action="store_true")
+    index.set_defaults(func=cmd_index)
+
+    search = sub.add_parser("search", help="ファイル内容を検索し、見つかった順に出力する")
+    add_tree_options(search)
+    search.add_argument("keyword")
+    search.add_argument("--json", action="store_true", help="1行1件の JSON で出力")
+    search.set_defaults(func=cmd_search)
+
+    stats = sub.add_parser("stats", help="キャッシュサイズとスループットを表示する")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(func=cmd_stats)
+
+    prune = sub.add_parser("prune", help="ディスクキャッシュを上限まで、最近使われていないものから削除する")
+    prune.add_argument("--max-mb", type=float, default=None,
+                       help="残すサイズ MB (既定: READONLYVIEWER_CACHE_MAX_MB または 2048、0 ですべて削除)")
+    prune.set_defaults(func=cmd_prune)
+
+    diagnose = sub.add_parser("diagnose", help="ファイルごとの抽出時間・メモリ・失敗を計測し、遅いファイルと形式を表示する")
+    add_tree_options(diagnose)
+    diagnose.add_argument("--csv", default=None, help="ファイルごとの結果を CSV に書き出す")
+    diagnose.add_argument("--profile", action="store_true", help="ワーカーで cProfile を取り、上位の関数を表示する")
+    diagnose.add_argument("--top", type=int, default=REPORT_TOP_FILES, help="表示する遅いファイルの件数")
+    diagnose.add_argument("--quiet", action="store_true")
+    diagnose.set_defaults(func=cmd_diagnose)
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        compile_name_filter(getattr(args, "pattern", ""))
+    except re.error as e:
+        parser.error(f"--pattern が正しい正規表現ではありません: {e}")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
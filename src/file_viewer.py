@@ -4,27 +4,62 @@ import os
 import shutil
 import sys
 import tempfile
-from multiprocessing import cpu_count
+import threading
+import time
 from typing import Iterable, List, Tuple
 
-from PyQt6.QtCore import QDir, QSettings, QThreadPool, Qt
-from PyQt6.QtWidgets import QFileDialog, QMainWindow, QSplitter, QStatusBar, QVBoxLayout, QWidget
-
-from utils.search_worker import get_cached_text_preview, search_file_worker
-from utils.worker import Worker, WorkerSignals
+from PyQt6.QtCore import QDir, QSettings, QThreadPool, QTimer, Qt
+from PyQt6.QtGui import QKeySequence, QShortcut
+from PyQt6.QtWidgets import QFileDialog, QMainWindow, QMessageBox, QSplitter, QStatusBar, QVBoxLayout, QWidget
+
+from utils import io_layer
+from utils.archive import list_members, member_path, open_member, split_member_path
+from utils.diagnostics import DiagnosticsReport
+from utils.disk_cache import prune_cache
+from utils.mail_extract import attachment_display_name, is_mail
+from utils.memory_budget import BudgetedCache, MemoryBudget, memory_budget
+from utils.search_session import SearchHistory, SearchQuery, SearchSession
+from utils.search_worker import extract_and_cache, iter_diagnose, iter_search, text_cache
+from utils.worker import Worker, WorkerSignals, pdf_thread_pool
+from widgets.diagnostics_dialog import DiagnosticsDialog
 from widgets.file_tree_view import FileTreeView
 from widgets.previewer import Previewer
 from widgets.search_bar import SearchBar
 
+# Search hits are handed to the GUI thread in batches rather than one by one
+RESULT_BATCH_SIZE = 500
+RESULT_BATCH_INTERVAL = 0.2
+# How often the memory budget checks for system memory pressure (ms)
+MEMORY_PRESSURE_INTERVAL_MS = 5000
+# Diagnostics progress is reported every this many files
+DIAGNOSTICS_PROGRESS_INTERVAL = 50
+# Temporary copies live on disk, so they have their own quota instead of a share of the memory budget
+TEMP_FILES_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def _remove_temp_file(path: str, _value=None) -> None:
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"Error removing temporary file {path}: {e}")
+
 
 class FileViewer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("読み取り専用 ファイルビューア")
-        self.temp_files: List[str] = []
+        # Temporary copies are budgeted by file size against a disk quota; the open PDF is pinned
+        self.temp_file_quota = MemoryBudget(TEMP_FILES_MAX_BYTES, watch_pressure=False)
+        self.temp_files = BudgetedCache("temp_files", budget=self.temp_file_quota, on_evict=_remove_temp_file)
+        self._pinned_temp_file: str | None = None
         self.threadpool = QThreadPool()
         self.signals = WorkerSignals()
         self.process_pool = None
+        self.search_history = SearchHistory()
+        # Each content search gets a generation; signals from older searches are dropped
+        self._search_generation = 0
+        self._search_cancel: threading.Event | None = None
+        memory_budget.register(self.search_history)
 
         # Load stylesheet relative to this file (works regardless of CWD)
         try:
@@ -44,6 +79,8 @@ class FileViewer(QMainWindow):
 
         self.init_ui()
         self.load_settings()
+        # ディスクキャッシュを上限まで削除します (起動を待たせないようバックグラウンドで)
+        self.threadpool.start(Worker(prune_cache))
 
     def init_ui(self) -> None:
         self.search_bar = SearchBar()
@@ -54,6 +91,9 @@ class FileViewer(QMainWindow):
         self.search_bar.content_search_triggered.connect(self.search_file_contents)
         self.file_tree_view.file_double_clicked.connect(self.on_file_selected)
         self.previewer.file_selected_from_search.connect(self.on_file_selected)
+        self.previewer.attachment_selected.connect(self.on_file_selected)
+        self.previewer.history_back_requested.connect(self.show_previous_results)
+        self.previewer.history_forward_requested.connect(self.show_next_results)
 
         left_panel = QWidget()
         left_layout = QVBoxLayout()
@@ -77,12 +117,84 @@ class FileViewer(QMainWindow):
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
 
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(memory_budget.check_pressure)
+        self.memory_timer.start(MEMORY_PRESSURE_INTERVAL_MS)
+        QShortcut(QKeySequence("Ctrl+Shift+M"), self, activated=self.show_memory_report)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self.run_diagnostics)
+
     def set_process_pool(self, pool) -> None:
         self.process_pool = pool
 
     def update_status(self, message: str) -> None:
         self.statusBar.showMessage(message)
 
+    def show_memory_report(self) -> None:
+        QMessageBox.information(
+            self,
+            "メモリ使用量",
+            memory_budget.report() + "\n\n"
+            f"一時ファイル (ディスク): {self.temp_file_quota.total() / 1e6:.1f} / "
+            f"{self.temp_file_quota.limit_bytes / 1e6:.1f} MB",
+        )
+
+    def run_diagnostics(self) -> None:
+        """Measure extraction of every visible file (no caches) and show the slowest files and formats."""
+        if not self.process_pool:
+            self.statusBar.showMessage("検索プロセスが準備できていません。", 3000)
+            return
+        files = self.file_tree_view.get_filtered_file_list()
+        if not files:
+            self.statusBar.showMessage("フィルタリングされたファイルがありません。", 3000)
+            return
+        answer = QMessageBox.question(
+            self,
+            "診断",
+            f"表示中の {len(files)} 件のファイルをキャッシュを使わずに抽出し、時間・メモリ・失敗を計測します。\n"
+            "cProfile によるプロファイルも取得しますか？（抽出が遅くなります）",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel,
+            QMessageBox.StandardButton.No,
+        )
+        if answer == QMessageBox.StandardButton.Cancel:
+            return
+
+        root = self.file_tree_view.get_current_directory()
+        profile = answer == QMessageBox.StandardButton.Yes
+        signals = WorkerSignals()
+        signals.progress.connect(
+            lambda done: self.statusBar.showMessage(f"診断中... {done}/{len(files)}", 0)
+        )
+        worker = Worker(self._diagnose_in_background, root, files, profile, signals.progress.emit, signals=signals)
+        worker.signals.result.connect(self.show_diagnostics)
+        worker.signals.error.connect(self.search_error)
+        self.statusBar.showMessage(f"{len(files)} 件のファイルを診断中...", 0)
+        self.threadpool.start(worker)
+
+    def _diagnose_in_background(self, root: str, file_list: List[str], profile: bool, progress_callback):
+        records = []
+        start = time.monotonic()
+        with tempfile.TemporaryDirectory() as tmp:
+            profile_dir = tmp if profile else None
+            for record in iter_diagnose(self.process_pool, file_list, profile_dir):
+                records.append(record)
+                if len(records) % DIAGNOSTICS_PROGRESS_INTERVAL == 0:
+                    progress_callback(len(records))
+            report = DiagnosticsReport(root, records, time.monotonic() - start, profile_dir)
+            # The worker profiles live in the temporary directory, so merge them before it goes away
+            profile_text = report.profile_text()
+        report.profile_dir = None
+        return report, profile_text
+
+    def show_diagnostics(self, result: tuple) -> None:
+        report, profile_text = result
+        self.statusBar.showMessage(
+            f"診断が完了しました: {len(report.records)} 件, 失敗 {len(report.failures())} 件", 5000
+        )
+        dialog = DiagnosticsDialog(report, profile_text, self)
+        dialog.file_selected.connect(self.on_file_selected)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
     def select_initial_directory(self, default_dir: str) -> str:
         return QFileDialog.getExistingDirectory(
             self,
@@ -104,26 +216,60 @@ class FileViewer(QMainWindow):
         )
         self.previewer.clear_preview(clear_keyword=not is_from_search)
         self.previewer.set_info_text(f"{os.path.basename(file_path)} を読み込み中...")
+        if os.path.splitext(file_path)[1].lower() == ".pdf":
+            # A PDF opened before shows its cached thumbnails while it is being copied
+            self.previewer.show_cached_pdf(file_path)
 
         # Pass the original file_path to the worker for context
         worker = Worker(self.generate_preview, file_path, signals=self.signals)
         worker.signals.result.connect(self.display_preview)
         worker.signals.error.connect(self.preview_error)
-        self.threadpool.start(worker)
-
-    def generate_preview(self, file_path: str) -> Tuple[str, str, str]:
-        temp_path = self.copy_to_temp_readonly(file_path)
-        ext = os.path.splitext(temp_path)[1].lower()
+        # Mail previews may extract PDF attachments with fitz, which must stay on the PDF thread
+        (pdf_thread_pool() if is_mail(file_path) else self.threadpool).start(worker)
+
+    def generate_preview(self, file_path: str) -> tuple:
+        ext = os.path.splitext(file_path)[1].lower()
+        if is_mail(file_path) and split_member_path(file_path) is None:
+            # Attachments are listed without decoding them; each one opens on demand
+            text = self.generate_preview_text(file_path)
+            attachments = [
+                (member_path(file_path, member.name), attachment_display_name(member), member.size)
+                for member in list_members(file_path)
+            ]
+            return ("mail", (text, attachments), file_path)
         if ext == ".pdf":
-            return ("pdf", temp_path, file_path)
-        else:
-            text = get_cached_text_preview(temp_path)
-            return ("text", text, file_path)
-
-    def display_preview(self, result: Tuple[str, str, str]) -> None:
+            return ("pdf", self.copy_to_temp_readonly(file_path), file_path)
+        if split_member_path(file_path) is not None:
+            # Archive members are read straight from the archive into memory
+            return ("text", extract_and_cache(file_path), file_path)
+        return ("text", self.generate_preview_text(file_path), file_path)
+
+    def generate_preview_text(self, file_path: str) -> str:
+        # Text warmed by a search or the CLI is served without copying the file
+        text = text_cache.get(file_path)
+        if text is None:
+            temp_path = self.copy_to_temp_readonly(file_path)
+            try:
+                text = extract_and_cache(file_path, temp_path)
+            finally:
+                # The extracted text is cached, so the copy is not needed any more
+                if self.temp_files.pop(temp_path) is not None:
+                    _remove_temp_file(temp_path)
+        return text
+
+    def display_preview(self, result: tuple) -> None:
         preview_type, content, original_path = result
+        if self._pinned_temp_file is not None:
+            self.temp_files.unpin(self._pinned_temp_file)
+            self._pinned_temp_file = None
         if preview_type == "pdf":
+            # Pages and thumbnails keep reading the copy while the PDF is shown
+            self._pinned_temp_file = content
             self.previewer.show_pdf_preview(content, original_path)
+        elif preview_type == "mail":
+            text, attachments = content
+            self.previewer.show_text_preview(text, original_path)
+            self.previewer.show_attachments(attachments)
         else:
             self.previewer.show_text_preview(content, original_path)
 
@@ -140,49 +286,114 @@ class FileViewer(QMainWindow):
             return
 
         self.previewer.search_keyword = keyword
-        filtered_files = self.file_tree_view.get_filtered_file_list()
+        root = self.file_tree_view.get_current_directory()
+        name_filter = self.file_tree_view.get_filter_pattern()
+        query = SearchQuery(keyword)
+
+        # A narrowing query only needs to look at the hits of an earlier search
+        base_session = self.search_history.find_refinable(root, name_filter, query)
+        if base_session is not None:
+            filtered_files = base_session.candidate_paths(name_filter)
+        else:
+            filtered_files = self.file_tree_view.get_filtered_file_list()
         if not filtered_files:
             self.previewer.set_info_text("検索対象のファイルがありません。")
             self.statusBar.showMessage("フィルタリングされたファイルがありません。", 3000)
             return
 
-        self.previewer.set_info_text(
-            f"'{keyword}' を {len(filtered_files)} 件のファイルから検索中..."
-        )
+        if base_session is not None:
+            self.previewer.set_info_text(
+                f"'{keyword}' を前回の結果 {len(filtered_files)} 件から絞り込み中..."
+            )
+        else:
+            self.previewer.set_info_text(
+                f"'{keyword}' を {len(filtered_files)} 件のファイルから検索中..."
+            )
         self.statusBar.showMessage(f"'{keyword}' を検索中...", 0)
-
-        search_worker_thread = Worker(self._search_in_background, keyword, filtered_files)
-        search_worker_thread.signals.result.connect(self.search_finished)
-        search_worker_thread.signals.error.connect(self.search_error)
+        self.previewer.begin_search_results(keyword)
+
+        self.cancel_search()
+        cancelled = threading.Event()
+        self._search_cancel = cancelled
+        generation = self._search_generation
+        session = SearchSession(root, name_filter, query, refined=base_session is not None)
+        signals = WorkerSignals()
+        signals.progress.connect(
+            lambda batch: self.append_search_batch(generation, batch)
+        )
+        search_worker_thread = Worker(
+            self._search_in_background, session, filtered_files, cancelled, signals.progress.emit, signals=signals
+        )
+        search_worker_thread.signals.result.connect(lambda session: self.search_finished(session, generation))
+        search_worker_thread.signals.error.connect(
+            lambda error: self.search_error(error) if generation == self._search_generation else None
+        )
         self.threadpool.start(search_worker_thread)
 
-    def _search_in_background(self, keyword: str, file_list: List[str]):
-        found_files: List[str] = []
-        tasks = [(file_path, keyword) for file_path in file_list]
-
-        if not tasks:
-            return ([], keyword)
-
-        num_cpus = cpu_count()
-        chunksize = max(1, len(tasks) // (num_cpus * 4))
-
+    def cancel_search(self) -> bool:
+        """Stop the running content search (if any) and ignore anything it still reports."""
+        self._search_generation += 1
+        if self._search_cancel is None:
+            return False
+        self._search_cancel.set()
+        self._search_cancel = None
+        return True
+
+    def _search_in_background(self, session: SearchSession, file_list: List[str],
+                              cancelled: threading.Event, progress_callback):
+        keyword = session.query.text
+        batch: List[Tuple[str, int]] = []
+        start = last_emit = time.monotonic()
         try:
-            for file_path, found in self.process_pool.imap_unordered(
-                search_file_worker, tasks, chunksize=chunksize
-            ):
-                if found:
-                    found_files.append(file_path)
+            for file_path, hits in iter_search(self.process_pool, keyword, file_list):
+                if cancelled.is_set():
+                    # Tasks already queued in the pool still finish, but their results are not read
+                    break
+                if not hits:
+                    continue
+                batch.append((file_path, hits))
+                now = time.monotonic()
+                if len(batch) >= RESULT_BATCH_SIZE or now - last_emit >= RESULT_BATCH_INTERVAL:
+                    session.add_results(batch)
+                    progress_callback(batch)
+                    batch = []
+                    last_emit = now
+            else:
+                session.complete = True
         except Exception as e:
-            print(f"An error occurred during search: {e}")
+            # The hits so far are still shown, but the session is not kept for refining
+            session.error = f"{type(e).__name__}: {e}"
+
+        if batch:
+            session.add_results(batch)
+            progress_callback(batch)
+        session.seconds = time.monotonic() - start
+        return session
 
-        return (found_files, keyword)
+    def append_search_batch(self, generation: int, batch: List[Tuple[str, int]]) -> None:
+        if generation == self._search_generation:
+            self.previewer.append_search_results(batch)
 
-    def search_finished(self, result: Tuple[List[str], str]) -> None:
-        found_files, keyword = result
-        self.previewer.display_search_results(found_files, keyword)
-        if found_files:
+    def search_finished(self, session: SearchSession, generation: int) -> None:
+        if generation != self._search_generation:
+            return
+        self._search_cancel = None
+        keyword = session.query.text
+        hit_total = len(session)
+        self.previewer.finish_search_results(keyword)
+        if not session.complete:
+            # Partial hits would make later refined searches silently miss files
+            self.statusBar.showMessage(
+                f"'{keyword}' の検索は完了しませんでした ({session.error or '中断'})。"
+                f"結果は途中までの {hit_total} 件です。",
+                10000,
+            )
+        elif hit_total:
+            # Empty hit sets cannot be refined, so they are not kept in the history
+            self.search_history.push(session)
+            self.update_history_controls()
             self.statusBar.showMessage(
-                f"'{keyword}' が {len(found_files)} 件のファイルで見つかりました。",
+                f"'{keyword}' が {hit_total} 件のファイルで見つかりました。",
                 5000,
             )
         else:
@@ -191,26 +402,61 @@ class FileViewer(QMainWindow):
                 5000,
             )
 
+    def show_previous_results(self) -> None:
+        self.show_history_session(self.search_history.back())
+
+    def show_next_results(self) -> None:
+        self.show_history_session(self.search_history.forward())
+
+    def show_history_session(self, session: SearchSession | None) -> None:
+        if session is None:
+            return
+        # The results view shows one search at a time
+        if self.cancel_search():
+            self.statusBar.clearMessage()
+        self.previewer.display_search_results(session.results, session.query.text)
+        self.update_history_controls()
+
+    def update_history_controls(self) -> None:
+        current = self.search_history.current()
+        self.previewer.set_history_state(
+            self.search_history.can_go_back(),
+            self.search_history.can_go_forward(),
+            current.describe() if current else "",
+        )
+
     def search_error(self, error_tuple) -> None:
         print(error_tuple)
         self.previewer.set_info_text("ファイル検索中にエラーが発生しました。")
         self.statusBar.showMessage("エラーが発生しました。", 5000)
 
     def copy_to_temp_readonly(self, path: str) -> str:
+        start = time.perf_counter()
+        member = split_member_path(path)
+        src_file = None
+        if member is not None:
+            _info, src_file = open_member(*member)
+            if src_file is None:
+                raise OSError(f"アーカイブのメンバーを読み込めません: {path}")
         with tempfile.NamedTemporaryFile(
             delete=False, mode='w+b', suffix=os.path.splitext(path)[1]
         ) as tmp_file:
-            with open(path, 'rb') as src_file:
-                shutil.copyfileobj(src_file, tmp_file)
-        self.temp_files.append(tmp_file.name)
+            if src_file is not None:
+                with src_file:
+                    shutil.copyfileobj(src_file, tmp_file)
+            else:
+                # Large sequential reads, within the mount's I/O limit in slow-storage mode
+                io_layer.copy_file(path, tmp_file)
+            size = tmp_file.tell()
+        # Pinned until the preview is done with it, so the budget cannot remove it mid-use
+        self.temp_files.pin(tmp_file.name)
+        self.temp_files.put(tmp_file.name, path, size, time.perf_counter() - start)
         return tmp_file.name
 
     def cleanup_temp_files(self) -> None:
-        for f in self.temp_files:
-            try:
-                os.remove(f)
-            except OSError as e:
-                print(f"Error removing temporary file {f}: {e}")
+        for f in self.temp_files.keys():
+            self.temp_files.pop(f)
+            _remove_temp_file(f)
 
     def load_settings(self) -> None:
         settings = QSettings()
@@ -223,7 +469,11 @@ class FileViewer(QMainWindow):
         settings = QSettings()
         settings.setValue("geometry", self.saveGeometry())
         settings.setValue("splitter_state", self.main_splitter.saveState())
-        settings.setValue("last_dir", self.file_tree_view.get_current_directory())
+        last_dir = self.file_tree_view.get_current_directory()
+        # Inside an archive, remember the folder that contains it
+        while last_dir and not os.path.isdir(last_dir) and os.path.dirname(last_dir) != last_dir:
+            last_dir = os.path.dirname(last_dir)
+        settings.setValue("last_dir", last_dir)
 
     def closeEvent(self, event) -> None:
         self.save_settings()
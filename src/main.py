@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import sys
-from multiprocessing import Pool, cpu_count, freeze_support
+from multiprocessing import freeze_support
+from PyQt6.QtCore import QSettings
 from PyQt6.QtWidgets import QApplication
 from file_viewer import FileViewer
+from utils import io_layer
+from utils.memory_budget import memory_budget
+from utils.process_pool import create_process_pool
 
 if __name__ == "__main__":
     # For Windows compatibility
@@ -15,7 +19,15 @@ if __name__ == "__main__":
     
     # Create the process pool and pass it to the main window
     try:
-        pool = Pool(processes=max(1, cpu_count() - 1))
+        # One memory budget for the whole app (env: READONLYVIEWER_MEMORY_BUDGET_MB)
+        settings = QSettings()
+        budget_mb = settings.value("memory_budget_mb", memory_budget.limit_bytes / (1024 * 1024), type=float)
+        # Slow-storage mode for network shares (env: READONLYVIEWER_SLOW_STORAGE)
+        io_layer.configure(io_layer.IOSettings(
+            settings.value("slow_storage", io_layer.settings.slow_mode, type=bool),
+            settings.value("io_concurrency", io_layer.settings.concurrency, type=int),
+        ))
+        pool = create_process_pool(memory_budget_bytes=int(budget_mb * 1024 * 1024))
 
         viewer = FileViewer()
         viewer.set_process_pool(pool)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from typing import IO, Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar.gz", ".tgz", ".tar")
+# メールの添付ファイルも、アーカイブのメンバーと同じ仮想パスで扱います
+CONTAINER_EXTENSIONS = ARCHIVE_EXTENSIONS + (".eml", ".msg")
+# アーカイブ内のメンバーは "<アーカイブのパス>!/<メンバー名>" という仮想パスで表します
+MEMBER_SEPARATOR = "!/"
+# このサイズ以下のメンバーはメモリ上に、超えるものはディスクに溢れる一時ファイルに読み込みます
+MEMBER_MEMORY_BYTES = 16 * 1024 * 1024
+# これより大きいメンバーは抽出しません
+MEMBER_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ArchiveMember(NamedTuple):
+    name: str
+    size: int
+    # zip は CRC32、tar はメンバーごとのチェックサムが無いため更新時刻とサイズ
+    crc: str
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def member_path(archive_path: str, name: str) -> str:
+    return f"{archive_path}{MEMBER_SEPARATOR}{name}"
+
+
+def split_member_path(path: str) -> Optional[Tuple[str, str]]:
+    """Return (archive path, member name) for a virtual member path, or None for a plain path."""
+    index = path.find(MEMBER_SEPARATOR)
+    while index != -1:
+        archive_path = path[:index]
+        if archive_path.lower().endswith(CONTAINER_EXTENSIONS) and os.path.isfile(archive_path):
+            return archive_path, path[index + len(MEMBER_SEPARATOR):]
+        index = path.find(MEMBER_SEPARATOR, index + 1)
+    return None
+
+
+def _is_zip(name: str) -> bool:
+    return name.lower().endswith(".zip")
+
+
+def _zip_member(info: zipfile.ZipInfo) -> ArchiveMember:
+    return ArchiveMember(info.filename, info.file_size, f"{info.CRC:08x}")
+
+
+def _tar_member(info: tarfile.TarInfo) -> ArchiveMember:
+    return ArchiveMember(info.name, info.size, f"{info.mtime}:{info.size}")
+
+
+def _spool(src: IO[bytes], size: int) -> IO[bytes]:
+    """Copy a member stream into a seekable buffer, in memory or spilled to disk when large."""
+    if size <= MEMBER_MEMORY_BYTES:
+        return io.BytesIO(src.read())
+    buffer = tempfile.SpooledTemporaryFile(max_size=MEMBER_MEMORY_BYTES)
+    shutil.copyfileobj(src, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+Source = Union[str, IO[bytes]]
+
+
+def iter_members(source: Source, name: str = "") -> Iterator[Tuple[ArchiveMember, Callable[[], Optional[IO[bytes]]]]]:
+    """
+    アーカイブのファイルメンバーを格納順に返します。展開はせず、tar は先頭から1回だけ読み進めます。
+    2番目の要素を呼ぶとそのメンバーのバッファを返します (大きすぎる場合は None)。
+    呼ばなかったメンバーは読み飛ばされます。source はパスまたはファイルオブジェクトで、
+    ファイルオブジェクトの場合は name で形式を判定します。
+    """
+    name = name or (source if isinstance(source, str) else "")
+    if name.lower().endswith((".eml", ".msg")):
+        from utils.mail_extract import iter_attachments  # mail_extract imports this module
+        yield from iter_attachments(source, name)
+        return
+    if _is_zip(name):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+
+                def open_buffer(info=info, zf=zf) -> Optional[IO[bytes]]:
+                    if info.file_size > MEMBER_MAX_BYTES:
+                        return None
+                    with zf.open(info) as src:
+                        return _spool(src, info.file_size)
+
+                yield _zip_member(info), open_buffer
+        return
+
+    # ストリームモード ("r|*") で開き、圧縮された tar をシークせずに順に読みます
+    if isinstance(source, str):
+        tar = tarfile.open(source, mode="r|*")
+    else:
+        tar = tarfile.open(fileobj=source, mode="r|*")
+    with tar:
+        for info in tar:
+            if not info.isfile():
+                continue
+
+            def open_buffer(info=info) -> Optional[IO[bytes]]:
+                if info.size > MEMBER_MAX_BYTES:
+                    return None
+                src = tar.extractfile(info)
+                return None if src is None else _spool(src, info.size)
+
+            yield _tar_member(info), open_buffer
+
+
+def list_members(source: Source, name: str = "") -> List[ArchiveMember]:
+    return [member for member, _open in iter_members(source, name)]
+
+
+def open_member(archive_path: str, name: str) -> Tuple[Optional[ArchiveMember], Optional[IO[bytes]]]:
+    """Return (member, buffer) for one member; the buffer is None when missing or too large."""
+    if _is_zip(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            try:
+                info = zf.getinfo(name)
+            except KeyError:
+                return None, None
+            if info.file_size > MEMBER_MAX_BYTES:
+                return _zip_member(info), None
+            with zf.open(info) as src:
+                return _zip_member(info), _spool(src, info.file_size)
+    for member, open_buffer in iter_members(archive_path):
+        if member.name == name:
+            return member, open_buffer()
+    return None, None
+
+
+def format_member_listing(members: List[ArchiveMember]) -> str:
+    lines = [f"[アーカイブ: {len(members)} ファイル]"]
+    lines.extend(f"{member.name}\t{member.size}" for member in members)
+    return "\n".join(lines)
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import cProfile
+import csv
+import glob
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from utils import io_layer
+from utils.archive import iter_members, member_path, open_member, split_member_path
+from utils.file_operations import extract_text_from_stream, extract_text_preview, is_extraction_error
+
+# 画面とテキストのレポートに表示する件数
+REPORT_TOP_FILES = 20
+# プロファイルの表示行数
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_FILE_PREFIX = "worker-"
+# ワーカーはこの件数ごとにプロファイルを書き出します。残りは診断の最後に flush_profile で書き出します
+PROFILE_DUMP_INTERVAL = 50
+# flush_profile で全ワーカーがそろうのを待つ最大秒数
+PROFILE_FLUSH_TIMEOUT = 30.0
+
+CSV_COLUMNS = ("path", "format", "seconds", "bytes", "chars", "peak_memory_bytes", "error")
+
+
+class FileDiagnostics(NamedTuple):
+    path: str
+    format: str
+    seconds: float
+    bytes_read: int
+    chars: int
+    # 抽出中のワーカープロセスの最大メモリ (RSS)。測れない環境では 0
+    peak_memory: int
+    # 失敗した場合のエラーメッセージ。成功なら ""
+    error: str
+
+
+class FormatSummary(NamedTuple):
+    format: str
+    files: int
+    seconds: float
+    max_seconds: float
+    bytes_read: int
+    peak_memory: int
+    failures: int
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.files if self.files else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes_read / 1e6 / self.seconds if self.seconds else 0.0
+
+
+def file_format(path: str) -> str:
+    return os.path.splitext(path)[1].lower() or "(拡張子なし)"
+
+
+def _reset_peak_memory() -> None:
+    # Linux では VmHWM をリセットできるため、ファイルごとの最大値を測れます
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_memory() -> int:
+    """Peak resident memory of this process in bytes (since the last reset on Linux), or 0 if unknown."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil  # optional
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+
+# ワーカープロセスごとのプロファイラ。プロファイル先のディレクトリが変わったら作り直します
+_profiler: Optional[cProfile.Profile] = None
+_profile_dir: Optional[str] = None
+# 最後に書き出してから計測したファイル数
+_unsaved_measurements = 0
+
+
+def _get_profiler(profile_dir: Optional[str]) -> Optional[cProfile.Profile]:
+    global _profiler, _profile_dir, _unsaved_measurements
+    if profile_dir is None:
+        return None
+    if _profile_dir != profile_dir:
+        _profiler = cProfile.Profile()
+        _profile_dir = profile_dir
+        _unsaved_measurements = 0
+    return _profiler
+
+
+def _dump_profile() -> None:
+    # 累積した統計をワーカーごとに1ファイルへ上書きします (集計は DiagnosticsReport.profile_text)
+    global _unsaved_measurements
+    if _profiler is not None and _profile_dir is not None and _unsaved_measurements:
+        _profiler.dump_stats(os.path.join(_profile_dir, f"{PROFILE_FILE_PREFIX}{os.getpid()}.prof"))
+        _unsaved_measurements = 0
+
+
+def _maybe_dump_profile() -> None:
+    # 書き出しは統計全体のシリアライズなので、ファイルごとではなく一定件数ごとにします
+    if _unsaved_measurements >= PROFILE_DUMP_INTERVAL:
+        _dump_profile()
+
+
+def flush_profile(profile_dir: str, barrier) -> None:
+    """
+    Write this worker's unsaved profile for *profile_dir*, then wait on *barrier*.
+
+    The caller submits one task per pool worker with a barrier sized to the pool;
+    waiting keeps a worker from taking a second task, so every worker flushes once.
+    """
+    if _profile_dir == profile_dir:
+        _dump_profile()
+    try:
+        barrier.wait(PROFILE_FLUSH_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+
+
+def measure(path: str, size: int, extract: Callable[[], str], profile_dir: Optional[str] = None) -> FileDiagnostics:
+    """Run *extract* once and record its time, the bytes it had to read, peak memory and any failure."""
+    global _unsaved_measurements
+    profiler = _get_profiler(profile_dir)
+    _reset_peak_memory()
+    chars = 0
+    error = ""
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        text = extract()
+        chars = len(text)
+        if is_extraction_error(text):
+            error = text.splitlines()[0] if text else text
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _unsaved_measurements += 1
+    seconds = time.perf_counter() - start
+    return FileDiagnostics(path, file_format(path), seconds, size, chars, _peak_memory(), error)
+
+
+def diagnose_file(file_path: str, profile_dir: Optional[str] = None) -> FileDiagnostics:
+    """
+    extract_text_preview でファイル1件を抽出して計測します。キャッシュは使わず、毎回実際に抽出します。
+    アーカイブ内のメンバーの仮想パスは、そのメンバーだけを読み出して計測します。
+    """
+    member = split_member_path(file_path)
+    if member is not None:
+        archive_path, name = member
+        sizes: List[int] = []
+
+        def extract() -> str:
+            info, buffer = open_member(archive_path, name)
+            if info is not None:
+                sizes.append(info.size)
+            if buffer is None:
+                return f"プレビュー中にエラーが発生しました: {name} を読み込めません"
+            with buffer:
+                return extract_text_from_stream(name, buffer)
+
+        with io_layer.io_slot(archive_path):
+            record = measure(file_path, 0, extract, profile_dir)
+        record = record._replace(bytes_read=sum(sizes))
+    else:
+        try:
+            size = io_layer.getsize(file_path)
+        except OSError as e:
+            return FileDiagnostics(file_path, file_format(file_path), 0.0, 0, 0, 0, f"{type(e).__name__}: {e}")
+        with io_layer.io_slot(file_path):
+            record = measure(file_path, size, lambda: extract_text_preview(file_path), profile_dir)
+    if profile_dir is not None:
+        _maybe_dump_profile()
+    return record
+
+
+def diagnose_archive(archive_path: str, profile_dir: Optional[str] = None) -> List[FileDiagnostics]:
+    """アーカイブはメンバーごとに、検索と同じく展開せずに抽出して計測します。"""
+    records: List[FileDiagnostics] = []
+
+    def extract_member(name: str, open_buffer) -> str:
+        buffer = open_buffer()
+        if buffer is None:
+            return f"プレビュー中にエラーが発生しました: {name} は大きすぎます"
+        with buffer:
+            return extract_text_from_stream(name, buffer)
+
+    try:
+        with io_layer.io_slot(archive_path):
+            for member, open_buffer in iter_members(archive_path):
+                path = member_path(archive_path, member.name)
+                records.append(measure(path, member.size,
+                                       lambda: extract_member(member.name, open_buffer), profile_dir))
+    except Exception as e:
+        records.append(FileDiagnostics(archive_path, file_format(archive_path), 0.0, 0, 0, 0,
+                                       f"{type(e).__name__}: {e}"))
+    if profile_dir is not None:
+        _maybe_dump_profile()
+    return records
+
+
+class DiagnosticsReport:
+    """
+    診断の結果です。遅いファイルと形式ごとの集計を、表示用のテキストと CSV で出力します。
+    """
+
+    def __init__(self, root: str, records: List[FileDiagnostics], seconds: float,
+                 profile_dir: Optional[str] = None) -> None:
+        self.root = root
+        self.records = records
+        self.seconds = seconds
+        self.profile_dir = profile_dir
+
+    def worst_files(self, limit: Optional[int] = REPORT_TOP_FILES) -> List[FileDiagnostics]:
+        ranked = sorted(self.records, key=lambda r: r.seconds, reverse=True)
+        return ranked if limit is None else ranked[:limit]
+
+    def failures(self) -> List[FileDiagnostics]:
+        return [r for r in self.records if r.error]
+
+    def format_summary(self) -> List[FormatSummary]:
+        """形式ごとの集計を、合計時間の長い順に返します。"""
+        groups: Dict[str, List[FileDiagnostics]] = {}
+        for record in self.records:
+            groups.setdefault(record.format, []).append(record)
+        summary = [
+            FormatSummary(
+                fmt,
+                len(records),
+                sum(r.seconds for r in records),
+                max(r.seconds for r in records),
+                sum(r.bytes_read for r in records),
+                max(r.peak_memory for r in records),
+                sum(1 for r in records if r.error),
+            )
+            for fmt, records in groups.items()
+        ]
+        return sorted(summary, key=lambda s: s.seconds, reverse=True)
+
+    def profile_text(self, limit: int = PROFILE_TOP_FUNCTIONS) -> str:
+        """全ワーカーのプロファイルを合算し、累積時間の上位を返します。プロファイルを取っていなければ ""。"""
+        if not self.profile_dir:
+            return ""
+        files = glob.glob(os.path.join(self.profile_dir, f"{PROFILE_FILE_PREFIX}*.prof"))
+        if not files:
+            return ""
+        out = io.StringIO()
+        stats = pstats.Stats(*files, stream=out)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def write_csv(self, path: str) -> None:
+        # Excel で文字化けしないよう BOM つきの UTF-8 で書き出します
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            for r in self.worst_files(None):
+                writer.writerow((r.path, r.format, f"{r.seconds:.4f}", r.bytes_read, r.chars, r.peak_memory, r.error))
+
+    def format_text(self, top: int = REPORT_TOP_FILES) -> str:
+        total_bytes = sum(r.bytes_read for r in self.records)
+        lines = [
+            f"診断: {self.root}",
+            f"{len(self.records)} 件, {total_bytes / 1e6:.1f} MB, 抽出時間の合計 "
+            f"{sum(r.seconds for r in self.records):.1f} 秒 (経過 {self.seconds:.1f} 秒), "
+            f"失敗 {len(self.failures())} 件",
+            "",
+            "形式別 (合計時間順):",
+            f"  {'format':<10}{'files':>7}{'total s':>10}{'mean s':>9}{'max s':>9}{'MB/s':>9}{'peak MB':>10}{'failed':>8}",
+        ]
+        for s in self.format_summary():
+            lines.append(
+                f"  {s.format:<10}{s.files:>7}{s.seconds:>10.2f}{s.mean_seconds:>9.3f}{s.max_seconds:>9.2f}"
+                f"{s.megabytes_per_second:>9.1f}{s.peak_memory / 1e6:>10.1f}{s.failures:>8}"
+            )
+        lines += ["", f"遅いファイル (上位 {top} 件):"]
+        for r in self.worst_files(top):
+            lines.append(f"  {r.seconds:>8.2f}s {r.bytes_read / 1e6:>9.1f} MB {r.peak_memory / 1e6:>8.1f} MB  {r.path}")
+        failures = self.failures()
+        if failures:
+            lines += ["", f"失敗 ({len(failures)} 件):"]
+            lines += [f"  {r.path}: {r.error}" for r in failures[:top]]
+        return "\n".join(lines)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from utils import io_layer
+
+APP_NAME = "ReadOnlyViewer"
+CACHE_MAX_ENV = "READONLYVIEWER_CACHE_MAX_MB"
+# ディスクキャッシュ (テキスト + サムネイル) の合計サイズの上限の既定値
+DEFAULT_CACHE_MAX_MB = 2048
+# 上限を超えたら、この割合まで古いものから削除します (毎回の削除を避けるため)
+PRUNE_TARGET_RATIO = 0.9
+# キャッシュを読んだときに更新時刻を進める間隔。LRU の判定に更新時刻を使います
+TOUCH_INTERVAL_SECONDS = 3600
+# get_cache_root() 以下の、削除してよいキャッシュのディレクトリ
+CACHE_DIRS = ("text", "thumbnails")
+
+
+def get_cache_root() -> str:
+    """Return the per-user cache directory shared by the GUI and pool workers."""
+    override = os.environ.get("READONLYVIEWER_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_NAME)
+
+
+def file_identity(path: str) -> Optional[str]:
+    """
+    ファイルの同一性を表すキーを返します。
+    パス・サイズ・更新時刻から作るので、ファイルが更新されると別のキーになります。
+    低速ストレージモードでは stat 結果を短時間キャッシュするため、その間の更新は反映が遅れます。
+    """
+    try:
+        st = io_layer.stat(path)
+    except OSError:
+        return None
+    key = f"{os.path.normcase(os.path.abspath(path))}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Write via a temp file + rename so concurrent readers never see partial files."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def directory_size(path: str) -> Tuple[int, int]:
+    """Return (file count, total bytes) below *path*."""
+    count = 0
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+                count += 1
+            except OSError:
+                pass
+    return count, total
+
+
+def touch(path: str, mtime: float) -> None:
+    """Mark a cache entry as recently used (at most once per TOUCH_INTERVAL_SECONDS)."""
+    if time.time() - mtime > TOUCH_INTERVAL_SECONDS:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def cache_limit_bytes() -> int:
+    try:
+        return int(float(os.environ.get(CACHE_MAX_ENV, DEFAULT_CACHE_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_CACHE_MAX_MB * 1024 * 1024
+
+
+def prune_lru(roots: Iterable[str], max_bytes: int) -> Tuple[int, int]:
+    """
+    roots 以下のファイルの合計が max_bytes を超えていれば、更新時刻の古い (最近使われていない) ものから削除します。
+    (削除したファイル数, 削除したバイト数) を返します。
+    """
+    entries: List[Tuple[float, int, str]] = []
+    total = 0
+    for root in roots:
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+    if total <= max_bytes:
+        return 0, 0
+
+    entries.sort()
+    target = max_bytes * PRUNE_TARGET_RATIO
+    removed = freed = 0
+    for _mtime, size, path in entries:
+        if total - freed <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+        # 空になったディレクトリ (サムネイルのファイルごとのディレクトリなど) も消します
+        directory = os.path.dirname(path)
+        while not any(os.path.normcase(directory) == os.path.normcase(root) for root in roots):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+    return removed, freed
+
+
+def prune_cache(max_bytes: Optional[int] = None) -> Tuple[int, int]:
+    """Prune the shared text and thumbnail caches to *max_bytes* (default: READONLYVIEWER_CACHE_MAX_MB or 2 GB)."""
+    root = get_cache_root()
+    limit = cache_limit_bytes() if max_bytes is None else max_bytes
+    return prune_lru([os.path.join(root, name) for name in CACHE_DIRS], limit)
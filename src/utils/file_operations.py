@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import io
 import os
-from typing import List, Optional
+from typing import IO, List, Optional
 
 import fitz  # PyMuPDF
 import openpyxl
@@ -9,9 +10,20 @@ from pptx import Presentation
 import csv
 import docx
 import chardet
-from extract_msg import Message
-import email
-from email import policy
+
+from utils.archive import ArchiveMember, format_member_listing, is_archive, list_members
+from utils.mail_extract import extract_mail_text
+from utils.ooxml import extract_docx_xml, extract_pptx_xml, extract_xlsx_xml
+
+# Extractors report failures as text; these prefixes mark results that must not be cached.
+EXTRACTION_ERROR_PREFIXES = (
+    "プレビュー中にエラーが発生しました",
+    "Error extracting MSG file",
+    "Error extracting EML file",
+)
+
+def is_extraction_error(text: str) -> bool:
+    return text.startswith(EXTRACTION_ERROR_PREFIXES)
 
 # --- Text Extraction Functions ---
 def extract_text_preview(filepath: str) -> str:
@@ -19,14 +31,16 @@ def extract_text_preview(filepath: str) -> str:
     #print(f"extract: {filepath}")
     ext = os.path.splitext(filepath)[1].lower()
     try:
-        if ext == ".pdf":
+        if is_archive(filepath):
+            return format_member_listing(list_members(filepath))
+        elif ext == ".pdf":
             return extract_pdf_text(filepath)
         elif ext in [".xlsx", ".xlsm"]:
-            return extract_excel_text(filepath)
+            return extract_ooxml_text(extract_xlsx_xml, extract_excel_text, filepath)
         elif ext in [".pptx", ".pptm"]:
-            return extract_pptx_text(filepath)
+            return extract_ooxml_text(extract_pptx_xml, extract_pptx_text, filepath)
         elif ext in [".docx", ".docm"]:
-            return extract_docx_text(filepath)
+            return extract_ooxml_text(extract_docx_xml, extract_docx_text, filepath)
         elif ext == ".csv":
             return extract_csv_text(filepath)
         elif ext == ".msg":
@@ -40,10 +54,54 @@ def extract_text_preview(filepath: str) -> str:
         # This is a fallback for binary files or read errors.
         return f"プレビュー中にエラーが発生しました: {e}"
 
+def extract_text_from_stream(name: str, stream: IO[bytes]) -> str:
+    """
+    Extract text from a seekable binary stream (e.g. an archive member) without a file on disk.
+    The format is chosen from *name* in the same way as extract_text_preview.
+    """
+    ext = os.path.splitext(name)[1].lower()
+    try:
+        if is_archive(name):
+            return format_member_listing(list_members(stream, name))
+        elif ext == ".pdf":
+            with fitz.open(stream=stream.read(), filetype="pdf") as doc:
+                return "".join(page.get_text() for page in doc)
+        elif ext in [".xlsx", ".xlsm"]:
+            return extract_ooxml_text(extract_xlsx_xml, extract_excel_text, stream)
+        elif ext in [".pptx", ".pptm"]:
+            return extract_ooxml_text(extract_pptx_xml, extract_pptx_text, stream)
+        elif ext in [".docx", ".docm"]:
+            return extract_ooxml_text(extract_docx_xml, extract_docx_text, stream)
+        elif ext == ".csv":
+            return csv_rows_text(io.StringIO(decode_text_bytes(stream.read()), newline=""))
+        elif ext == ".msg":
+            return extract_msg_text(stream.read())
+        elif ext == ".eml":
+            return extract_eml_text(stream)
+        else:
+            return decode_text_bytes(stream.read())
+    except Exception as e:
+        return f"プレビュー中にエラーが発生しました: {e}"
+
+def extract_ooxml_text(fast_extractor, fallback_extractor, filepath: str) -> str:
+    """Use the direct-XML extractor, falling back to the full object model on malformed files."""
+    try:
+        return fast_extractor(filepath)
+    except Exception as e:
+        print(f"Fast OOXML extraction failed for {filepath}, falling back: {e}")
+        if hasattr(filepath, "seek"):
+            filepath.seek(0)
+        return fallback_extractor(filepath)
+
 def extract_pdf_text(filepath: str) -> str:
     with fitz.open(filepath) as doc:
         return "".join(page.get_text() for page in doc)
 
+def extract_pdf_pages(filepath: str, page_numbers: List[int]) -> List[str]:
+    """Extract the given pages only; used to split very large PDFs across pool workers."""
+    with fitz.open(filepath) as doc:
+        return [doc[page_num].get_text() for page_num in page_numbers]
+
 def render_pdf_as_pixmaps(filepath: str, dpi: int = 96):
     try:
         with fitz.open(filepath) as doc:
@@ -53,6 +111,24 @@ def render_pdf_as_pixmaps(filepath: str, dpi: int = 96):
         print(f"PDFレンダリングエラー: {e}")
         return []
 
+def get_pdf_page_count(filepath: str) -> int:
+    try:
+        with fitz.open(filepath) as doc:
+            return doc.page_count
+    except Exception as e:
+        print(f"PDFレンダリングエラー: {e}")
+        return 0
+
+def render_pdf_page(filepath: str, page_num: int, dpi: int = 96):
+    """Render a single page, so page navigation does not re-render the whole document."""
+    try:
+        with fitz.open(filepath) as doc:
+            matrix = fitz.Matrix(dpi / 72, dpi / 72)
+            return doc[page_num].get_pixmap(matrix=matrix)
+    except Exception as e:
+        print(f"PDFレンダリングエラー: {e}")
+        return None
+
 def extract_excel_text(filepath: str) -> str:
     wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
     text = []
@@ -79,19 +155,22 @@ def extract_docx_text(filepath: str) -> str:
 
 def extract_csv_text(filepath: str) -> str:
     encoding = detect_encoding(filepath) or 'utf-8'
-    rows = []
     try:
         with open(filepath, newline="", encoding=encoding, errors='ignore') as f:
-            reader = csv.reader(f)
-            for i, row in enumerate(reader):
-                if i >= 200: # Limit rows for performance
-                    break
-                rows.append(", ".join(row))
-        return "\n".join(rows)
+            return csv_rows_text(f)
     except (UnicodeDecodeError, csv.Error):
         # Fallback to raw text read if CSV parsing fails
         return extract_text_file(filepath)
 
+def csv_rows_text(f) -> str:
+    rows = []
+    reader = csv.reader(f)
+    for i, row in enumerate(reader):
+        if i >= 200: # Limit rows for performance
+            break
+        rows.append(", ".join(row))
+    return "\n".join(rows)
+
 def extract_text_file(filepath: str) -> str:
     """Read a plain text file with robust encoding detection."""
     encoding = detect_encoding(filepath)
@@ -103,6 +182,14 @@ def extract_text_file(filepath: str) -> str:
         with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
             return f.read()
 
+def decode_text_bytes(data: bytes, sample_size: int = 4096) -> str:
+    """Decode in-memory text with the same encoding detection as extract_text_file."""
+    encoding = chardet.detect(data[:sample_size])['encoding'] or 'utf-8'
+    try:
+        return data.decode(encoding, errors='ignore')
+    except LookupError:
+        return data.decode('utf-8', errors='ignore')
+
 def detect_encoding(filepath: str, sample_size: int = 4096) -> Optional[str]:
     """Detect the encoding of a file by reading a sample."""
     try:
@@ -113,69 +200,24 @@ def detect_encoding(filepath: str, sample_size: int = 4096) -> Optional[str]:
     except (IOError, IndexError):
         return None
 
-def extract_msg_text(filepath: str) -> str:
-    """Extract text content from .msg files."""
+def extract_attachment_text(member: ArchiveMember, open_buffer) -> str:
+    """Extract one mail attachment with the format extractors, without writing it to disk."""
+    buffer = open_buffer()
+    if buffer is None:
+        return "(大きすぎるため省略)"
+    with buffer:
+        return extract_text_from_stream(member.name, buffer)
+
+def extract_msg_text(filepath, attachment_text=extract_attachment_text) -> str:
+    """Extract text content from .msg files (a path or the file's bytes), including attachments."""
     try:
-        msg = Message(filepath)
-        text_content = []
-        if msg.subject:
-            text_content.append(f"Subject: {msg.subject}")
-        if msg.sender:
-            text_content.append(f"From: {msg.sender}")
-        if msg.to:
-            text_content.append(f"To: {msg.to}")
-        if msg.cc:
-            text_content.append(f"CC: {msg.cc}")
-        if msg.date:
-            text_content.append(f"Date: {msg.date}")
-        text_content.append("---")
-        if msg.body:
-            text_content.append(msg.body)
-        return "".join(text_content)
+        return extract_mail_text(filepath, ".msg", attachment_text)
     except Exception as e:
         return f"Error extracting MSG file: {e}"
 
-def extract_eml_text(filepath: str) -> str:
-    """Extract text content from .eml files."""
+def extract_eml_text(filepath, attachment_text=extract_attachment_text) -> str:
+    """Extract text content from .eml files (a path or a binary stream), including attachments."""
     try:
-        with open(filepath, 'rb') as fp:
-            msg = email.message_from_binary_file(fp, policy=policy.default)
-
-        text_content = []
-        if msg['subject']:
-            text_content.append(f"Subject: {msg['subject']}")
-        if msg['from']:
-            text_content.append(f"From: {msg['from']}")
-        if msg['to']:
-            text_content.append(f"To: {msg['to']}")
-        if msg['cc']:
-            text_content.append(f"CC: {msg['cc']}")
-        if msg['date']:
-            text_content.append(f"Date: {msg['date']}")
-        text_content.append("---")
-
-        if msg.is_multipart():
-            for part in msg.walk():
-                ctype = part.get_content_type()
-                cdispo = part.get('Content-Disposition')
-
-                # extract plain text body
-                if ctype == 'text/plain' and 'attachment' not in (cdispo or ''):
-                    payload = part.get_payload(decode=True)
-                    charset = part.get_content_charset()
-                    if charset:
-                        text_content.append(payload.decode(charset, errors='ignore'))
-                    else:
-                        text_content.append(payload.decode('utf-8', errors='ignore')) # Fallback
-                    break # Only get the first plain text part
-        else:
-            payload = msg.get_payload(decode=True)
-            charset = msg.get_content_charset()
-            if charset:
-                text_content.append(payload.decode(charset, errors='ignore'))
-            else:
-                text_content.append(payload.decode('utf-8', errors='ignore')) # Fallback
-
-        return "\n".join(text_content)
+        return extract_mail_text(filepath, ".eml", attachment_text)
     except Exception as e:
         return f"Error extracting EML file: {e}"
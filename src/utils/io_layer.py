@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from multiprocessing import BoundedSemaphore
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from utils.memory_budget import memory_budget
+
+SLOW_STORAGE_ENV = "READONLYVIEWER_SLOW_STORAGE"
+IO_CONCURRENCY_ENV = "READONLYVIEWER_IO_CONCURRENCY"
+# 低速ストレージモードで、1つのマウントに同時に読み込みを行うプロセス数の既定値
+DEFAULT_MOUNT_CONCURRENCY = 2
+# マウントごとのセマフォの数。マウントはパスのハッシュで割り当てます (衝突したマウントは枠を共有します)
+MOUNT_LANES = 16
+# 読み込みは大きな単位で先頭から順に行います
+READ_AHEAD_BYTES = 8 * 1024 * 1024
+# これ以下のファイルは一度にメモリへ読み込んでから抽出します (さらにプロセスのメモリ予算の半分までに抑えます)。
+# 超えるファイルはローカルの一時ファイルにコピーしてから抽出します
+IN_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+# stat 結果を再利用する秒数
+STAT_TTL_SECONDS = 30.0
+
+
+class IOSettings:
+    """
+    低速ストレージ (SMB/NFS など) 向けの I/O 設定です。無効の場合、すべての関数は通常のファイル操作と同じです。
+    """
+
+    def __init__(self, slow_mode: bool = False, concurrency: int = DEFAULT_MOUNT_CONCURRENCY,
+                 stat_ttl: float = STAT_TTL_SECONDS) -> None:
+        self.slow_mode = slow_mode
+        self.concurrency = max(1, int(concurrency))
+        self.stat_ttl = stat_ttl if slow_mode else 0.0
+
+    @classmethod
+    def from_env(cls) -> IOSettings:
+        slow_mode = os.environ.get(SLOW_STORAGE_ENV, "").lower() in ("1", "true", "yes", "on")
+        try:
+            concurrency = int(os.environ.get(IO_CONCURRENCY_ENV, DEFAULT_MOUNT_CONCURRENCY))
+        except ValueError:
+            concurrency = DEFAULT_MOUNT_CONCURRENCY
+        return cls(slow_mode, concurrency)
+
+
+settings = IOSettings.from_env()
+# プロセス間で共有するマウントごとのセマフォ (create_process_pool で作成し、ワーカーに渡します)
+_lanes: Optional[List] = None
+
+
+def create_mount_lanes(concurrency: int) -> List:
+    return [BoundedSemaphore(concurrency) for _ in range(MOUNT_LANES)]
+
+
+def configure(new_settings: IOSettings, lanes: Optional[List] = None) -> None:
+    global settings, _lanes
+    settings = new_settings
+    _lanes = lanes if new_settings.slow_mode else None
+    clear_stat_cache()
+
+
+def slow_mode() -> bool:
+    return settings.slow_mode
+
+
+@lru_cache(maxsize=4096)
+def _mount_of_directory(directory: str) -> str:
+    drive, _rest = os.path.splitdrive(directory)
+    if drive:
+        return drive.lower()  # "C:" や UNC の "\\\\server\\share"
+    path = directory
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def mount_point(path: str) -> str:
+    return _mount_of_directory(os.path.dirname(os.path.abspath(path)))
+
+
+@contextmanager
+def _acquire(lane) -> Iterator[None]:
+    lane.acquire()
+    try:
+        yield
+    finally:
+        lane.release()
+
+
+def io_slot(path: str):
+    """Context manager that bounds concurrent reads of *path*'s mount across all processes (slow mode only)."""
+    if _lanes is None:
+        return nullcontext()
+    lane = _lanes[zlib.crc32(mount_point(path).encode("utf-8", "surrogateescape")) % len(_lanes)]
+    return _acquire(lane)
+
+
+_stat_cache: Dict[str, Tuple[float, os.stat_result]] = {}
+_stat_lock = threading.Lock()
+
+
+def stat(path: str) -> os.stat_result:
+    """os.stat with a short-lived cache in slow mode, so repeated identity checks do not hit the share."""
+    if settings.stat_ttl <= 0:
+        return os.stat(path)
+    now = time.monotonic()
+    with _stat_lock:
+        entry = _stat_cache.get(path)
+    if entry is not None and now - entry[0] < settings.stat_ttl:
+        return entry[1]
+    st = os.stat(path)
+    with _stat_lock:
+        if len(_stat_cache) > 100_000:
+            _stat_cache.clear()
+        _stat_cache[path] = (now, st)
+    return st
+
+
+def getsize(path: str) -> int:
+    return stat(path).st_size
+
+
+def clear_stat_cache() -> None:
+    with _stat_lock:
+        _stat_cache.clear()
+
+
+def _advise_sequential(f: IO[bytes]) -> None:
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def in_memory_limit() -> int:
+    """
+    Largest file read_file loads into memory. The pool splits the memory budget between its
+    processes, so with more workers each one holds less.
+    """
+    return min(IN_MEMORY_MAX_BYTES, memory_budget.limit_bytes // 2)
+
+
+def read_file(path: str) -> Optional[bytes]:
+    """
+    ファイル全体を、マウントの同時読み込み数を守りながら大きな単位で順に読み込みます。
+    in_memory_limit() を超えるファイルは None を返します (local_copy を使ってください)。
+    """
+    if getsize(path) > in_memory_limit():
+        return None
+    chunks = []
+    with io_slot(path):
+        with open(path, "rb", buffering=0) as f:
+            _advise_sequential(f)
+            while True:
+                chunk = f.read(READ_AHEAD_BYTES)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def copy_file(path: str, dst: IO[bytes]) -> int:
+    """Copy *path* into *dst* with large sequential reads; return the number of bytes copied."""
+    with io_slot(path):
+        with open(path, "rb", buffering=0) as f:
+            _advise_sequential(f)
+            shutil.copyfileobj(f, dst, READ_AHEAD_BYTES)
+    return dst.tell()
+
+
+@contextmanager
+def local_copy(path: str) -> Iterator[str]:
+    """
+    Copy *path* to a local temporary file with large sequential reads and yield its path; the copy is
+    removed afterwards. The name keeps everything after the first dot, so format checks (".tar.gz") still work.
+    """
+    name = os.path.basename(path)
+    suffix = name[name.find("."):][-64:] if "." in name else ""
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            copy_file(path, dst)
+        yield tmp_path
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import email
+import io
+import mimetypes
+import threading
+from email import policy
+from email.message import EmailMessage
+from html.parser import HTMLParser
+from typing import IO, Callable, Iterator, List, Optional, Tuple, Union
+
+from extract_msg import Message
+
+from utils.archive import ArchiveMember
+
+MAIL_EXTENSIONS = (".eml", ".msg")
+# 添付ファイルはこのサイズまで抽出します
+ATTACHMENT_MAX_BYTES = 32 * 1024 * 1024
+# 1通のメールで抽出する添付ファイルの合計サイズ
+MAIL_ATTACHMENT_BUDGET_BYTES = 128 * 1024 * 1024
+# 添付されたメールの中の添付は、この深さまで抽出します
+MAX_MAIL_DEPTH = 3
+
+Source = Union[str, bytes, IO[bytes]]
+# 添付ファイル1件のテキストを返す関数 (メンバー, バッファを開く関数) -> テキスト
+AttachmentText = Callable[[ArchiveMember, Callable[[], Optional[IO[bytes]]]], str]
+
+_depth = threading.local()
+
+
+def is_mail(path: str) -> bool:
+    return path.lower().endswith(MAIL_EXTENSIONS)
+
+
+class _HTMLText(HTMLParser):
+    """Collect the visible text of an HTML body, one line per block element."""
+
+    _BLOCK_TAGS = {"br", "p", "div", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6", "table", "blockquote"}
+    _SKIP_TAGS = {"script", "style", "head", "title"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag in self._SKIP_TAGS:
+            self._skip += 1
+        elif tag in self._BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag == "td":
+            self.parts.append("\t")
+
+    def handle_endtag(self, tag) -> None:
+        if tag in self._SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in self._BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data) -> None:
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    lines = (line.strip() for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _bounded(data: bytes) -> Optional[IO[bytes]]:
+    return io.BytesIO(data) if len(data) <= ATTACHMENT_MAX_BYTES else None
+
+
+class _EmlMail:
+    """
+    .eml の構造だけを解析し、本文と添付のデコードは必要になった時点で1つずつ行います。
+    """
+
+    def __init__(self, source: Source) -> None:
+        if isinstance(source, str):
+            with open(source, "rb") as fp:
+                self.msg: EmailMessage = email.message_from_binary_file(fp, policy=policy.default)
+        elif isinstance(source, bytes):
+            self.msg = email.message_from_bytes(source, policy=policy.default)
+        else:
+            self.msg = email.message_from_binary_file(source, policy=policy.default)
+        # text/plain が無ければ text/html を本文にします
+        self._body_part = self.msg.get_body(preferencelist=("plain", "html"))
+
+    def headers(self) -> List[str]:
+        lines = []
+        for label, key in (("Subject", "subject"), ("From", "from"), ("To", "to"), ("CC", "cc"), ("Date", "date")):
+            if self.msg[key]:
+                lines.append(f"{label}: {self.msg[key]}")
+        return lines
+
+    def body(self) -> str:
+        part = self._body_part
+        if part is None:
+            return ""
+        try:
+            content = part.get_content()
+        except (LookupError, UnicodeError):
+            payload = part.get_payload(decode=True) or b""
+            content = payload.decode("utf-8", errors="ignore")
+        if part.get_content_subtype() == "html":
+            return html_to_text(content)
+        return content
+
+    def _leaf_parts(self, part) -> Iterator[EmailMessage]:
+        if part.get_content_maintype() == "multipart":
+            for sub in part.iter_parts():
+                yield from self._leaf_parts(sub)
+        else:
+            yield part
+
+    def attachments(self) -> Iterator[Tuple[ArchiveMember, Callable[[], Optional[IO[bytes]]]]]:
+        index = 0
+        for part in self._leaf_parts(self.msg):
+            if part is self._body_part:
+                continue
+            filename = part.get_filename()
+            content_type = part.get_content_type()
+            if content_type == "message/rfc822":
+                inner = part.get_payload(0)
+                filename = filename or f"{inner.get('subject') or 'message'}.eml"
+
+                def open_buffer(inner=inner) -> Optional[IO[bytes]]:
+                    return _bounded(inner.as_bytes())
+
+                size = len(str(inner))
+            elif filename or part.is_attachment():
+                filename = filename or f"attachment{index + 1}{mimetypes.guess_extension(content_type) or ''}"
+
+                def open_buffer(part=part) -> Optional[IO[bytes]]:
+                    return _bounded(part.get_payload(decode=True) or b"")
+
+                # base64 のデコード前の長さから見積もります
+                payload = part.get_payload()
+                size = len(payload) * 3 // 4 if isinstance(payload, str) else 0
+            else:
+                continue  # 本文の別表現 (multipart/alternative の片方) など
+            index += 1
+            yield ArchiveMember(f"{index}/{filename}", size, str(size)), open_buffer
+
+
+class _MsgMail:
+    """Outlook の .msg です。extract_msg は添付のデータをアクセスされた時点で読み込みます。"""
+
+    def __init__(self, source: Source) -> None:
+        if not isinstance(source, (str, bytes)):
+            source = source.read()
+        self.msg = Message(source)
+
+    def close(self) -> None:
+        self.msg.close()
+
+    def headers(self) -> List[str]:
+        lines = []
+        for label, value in (("Subject", self.msg.subject), ("From", self.msg.sender), ("To", self.msg.to),
+                             ("CC", self.msg.cc), ("Date", self.msg.date)):
+            if value:
+                lines.append(f"{label}: {value}")
+        return lines
+
+    def body(self) -> str:
+        if self.msg.body:
+            return self.msg.body
+        html = self.msg.htmlBody
+        if html:
+            return html_to_text(html.decode("utf-8", errors="ignore") if isinstance(html, bytes) else html)
+        return ""
+
+    def attachments(self) -> Iterator[Tuple[ArchiveMember, Callable[[], Optional[IO[bytes]]]]]:
+        for index, attachment in enumerate(self.msg.attachments, start=1):
+            data = attachment.data
+            if isinstance(data, bytes):
+                filename = attachment.getFilename() or f"attachment{index}"
+
+                def open_buffer(data=data) -> Optional[IO[bytes]]:
+                    return _bounded(data)
+
+                size = len(data)
+            elif data is not None and hasattr(data, "exportBytes"):
+                # 添付された .msg
+                filename = f"{getattr(data, 'subject', None) or 'message'}.msg"
+
+                def open_buffer(data=data) -> Optional[IO[bytes]]:
+                    return _bounded(data.exportBytes())
+
+                size = 0
+            else:
+                continue
+            yield ArchiveMember(f"{index}/{filename}", size, str(size)), open_buffer
+
+
+def open_mail(source: Source, name: str):
+    return _MsgMail(source) if name.lower().endswith(".msg") else _EmlMail(source)
+
+
+def iter_attachments(source: Source, name: str) -> Iterator[Tuple[ArchiveMember, Callable[[], Optional[IO[bytes]]]]]:
+    """Yield (member, open_buffer) for each attachment; the member name is "<番号>/<ファイル名>"."""
+    mail = open_mail(source, name)
+    try:
+        yield from mail.attachments()
+    finally:
+        if hasattr(mail, "close"):
+            mail.close()
+
+
+def attachment_display_name(member: ArchiveMember) -> str:
+    return member.name.split("/", 1)[-1]
+
+
+def extract_mail_text(source: Source, name: str, attachment_text: AttachmentText) -> str:
+    """
+    メールのヘッダー・本文と、添付ファイルのテキストを連結して返します。
+    添付は attachment_text で抽出し、サイズの上限・合計の予算・入れ子の深さを超えるものは名前だけを出力します。
+    """
+    mail = open_mail(source, name)
+    depth = getattr(_depth, "value", 0)
+    _depth.value = depth + 1
+    try:
+        text_content = mail.headers()
+        text_content.append("---")
+        text_content.append(mail.body())
+        budget = MAIL_ATTACHMENT_BUDGET_BYTES
+        for member, open_buffer in mail.attachments():
+            label = f"[添付: {attachment_display_name(member)}]"
+            if depth + 1 >= MAX_MAIL_DEPTH or member.size > min(budget, ATTACHMENT_MAX_BYTES):
+                text_content.append(f"{label} (省略)")
+                continue
+            budget -= member.size
+            text_content.append(label)
+            text_content.append(attachment_text(member, open_buffer))
+        return "\n".join(text_content)
+    finally:
+        _depth.value = depth
+        if hasattr(mail, "close"):
+            mail.close()
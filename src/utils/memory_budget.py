@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_BUDGET_MB = 512
+# 空きメモリが物理メモリのこの割合を下回ったら、予算の半分まで縮小します
+PRESSURE_AVAILABLE_FRACTION = 0.10
+PRESSURE_CHECK_INTERVAL = 2.0
+# キャッシュ内で追い出し候補として比較する、古い順のエントリ数
+EVICTION_WINDOW = 8
+
+
+def system_memory() -> Optional[Tuple[int, int]]:
+    """Return (available bytes, total bytes) of physical memory, or None if unknown."""
+    try:
+        import psutil  # optional
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        vm = psutil.virtual_memory()
+        return vm.available, vm.total
+
+    if sys.platform.startswith("linux"):
+        info: Dict[str, int] = {}
+        try:
+            with open("/proc/meminfo", "r", encoding="ascii") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    info[key] = int(value.split()[0]) * 1024
+            return info["MemAvailable"], info["MemTotal"]
+        except (OSError, KeyError, ValueError, IndexError):
+            return None
+
+    if sys.platform == "win32":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys, status.ullTotalPhys
+    return None
+
+
+class MemoryReporter:
+    """Report usage that the budget counts but cannot evict (e.g. the text shown in the preview)."""
+
+    def __init__(self, name: str, usage: Callable[[], int]) -> None:
+        self.name = name
+        self._usage = usage
+
+    def memory_usage(self) -> int:
+        return self._usage()
+
+    def eviction_score(self) -> Optional[float]:
+        return None
+
+    def evict_one(self) -> int:
+        return 0
+
+
+class MemoryBudget:
+    """
+    プロセス内のすべてのキャッシュを集計し、1つの予算を超えたら
+    再作成コストあたりのサイズが最も大きい (=捨てても損が少ない) エントリから追い出します。
+    キャッシュは memory_usage() / eviction_score() / evict_one() を持つオブジェクトとして登録します。
+    ディスク上の一時ファイルのようにメモリではないものは、watch_pressure=False の別の予算で管理します。
+    """
+
+    def __init__(self, limit_bytes: int, watch_pressure: bool = True) -> None:
+        self.limit_bytes = limit_bytes
+        self.watch_pressure = watch_pressure
+        self._caches: List[Any] = []
+        self._lock = threading.RLock()
+        self._last_pressure_check = 0.0
+
+    def set_limit(self, limit_bytes: int) -> None:
+        self.limit_bytes = max(0, int(limit_bytes))
+        self.enforce()
+
+    def register(self, cache) -> None:
+        with self._lock:
+            if cache not in self._caches:
+                self._caches.append(cache)
+
+    def unregister(self, cache) -> None:
+        with self._lock:
+            if cache in self._caches:
+                self._caches.remove(cache)
+
+    def usage(self) -> Dict[str, int]:
+        with self._lock:
+            result: Dict[str, int] = {}
+            for cache in self._caches:
+                result[cache.name] = result.get(cache.name, 0) + cache.memory_usage()
+            return result
+
+    def total(self) -> int:
+        with self._lock:
+            return sum(cache.memory_usage() for cache in self._caches)
+
+    def enforce(self, limit_bytes: Optional[int] = None) -> int:
+        """Evict until usage fits *limit_bytes* (default: the budget). Return bytes freed."""
+        self._check_pressure_throttled()
+        limit = self.limit_bytes if limit_bytes is None else limit_bytes
+        freed = 0
+        with self._lock:
+            total = self.total()
+            while total > limit:
+                candidates = []
+                for cache in self._caches:
+                    score = cache.eviction_score()
+                    if score is not None:
+                        candidates.append((score, id(cache), cache))
+                if not candidates:
+                    break
+                _score, _id, cache = min(candidates, key=lambda c: (c[0], c[1]))
+                released = cache.evict_one()
+                if released <= 0:
+                    break
+                freed += released
+                total -= released
+        return freed
+
+    def under_pressure(self) -> bool:
+        if not self.watch_pressure:
+            return False
+        memory = system_memory()
+        if memory is None:
+            return False
+        available, total = memory
+        return total > 0 and available / total < PRESSURE_AVAILABLE_FRACTION
+
+    def check_pressure(self) -> int:
+        """Shed down to half the budget when the system is short of memory."""
+        self._last_pressure_check = time.monotonic()
+        if self.under_pressure():
+            return self.enforce(self.limit_bytes // 2)
+        return 0
+
+    def _check_pressure_throttled(self) -> None:
+        if time.monotonic() - self._last_pressure_check >= PRESSURE_CHECK_INTERVAL:
+            self.check_pressure()
+
+    def report(self) -> str:
+        usage = self.usage()
+        lines = [f"メモリ予算: {self.total() / 1e6:.1f} / {self.limit_bytes / 1e6:.1f} MB"]
+        for name, used in sorted(usage.items(), key=lambda item: -item[1]):
+            lines.append(f"  {name}: {used / 1e6:.1f} MB")
+        memory = system_memory()
+        if memory is not None:
+            lines.append(f"システムの空きメモリ: {memory[0] / 1e6:.0f} / {memory[1] / 1e6:.0f} MB")
+        return "\n".join(lines)
+
+
+def _default_budget_bytes() -> int:
+    try:
+        return int(float(os.environ.get("READONLYVIEWER_MEMORY_BUDGET_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_BUDGET_MB * 1024 * 1024
+
+
+# プロセスごとに1つの予算を共有します
+memory_budget = MemoryBudget(_default_budget_bytes())
+
+
+class BudgetedCache:
+    """
+    サイズと再作成コスト (秒) を持つエントリの LRU キャッシュです。
+    生成時に予算へ登録され、追加のたびに予算全体で追い出しが行われます。
+    """
+
+    def __init__(self, name: str, budget: Optional[MemoryBudget] = None,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None) -> None:
+        self.name = name
+        self.budget = budget or memory_budget
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._pinned: set = set()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.budget.register(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int, cost: float = 0.0) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, max(1, int(size)), max(0.0, cost))
+            self._bytes += max(1, int(size))
+        self.budget.enforce()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            self._pinned.discard(key)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._bytes = 0
+
+    def pin(self, key: Hashable) -> None:
+        """Protect an entry that is in use from eviction."""
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key: Hashable) -> None:
+        with self._lock:
+            self._pinned.discard(key)
+
+    def memory_usage(self) -> int:
+        return self._bytes
+
+    def _candidate(self) -> Optional[Tuple[float, Hashable]]:
+        best = None
+        for i, (key, (_value, size, cost)) in enumerate(self._entries.items()):
+            if i >= EVICTION_WINDOW and best is not None:
+                break
+            if key in self._pinned:
+                continue
+            # 1MB あたりの再作成コスト。小さいほど捨てやすい
+            score = cost / (size / 1e6)
+            if best is None or score < best[0]:
+                best = (score, key)
+        return best
+
+    def eviction_score(self) -> Optional[float]:
+        with self._lock:
+            candidate = self._candidate()
+            return None if candidate is None else candidate[0]
+
+    def evict_one(self) -> int:
+        with self._lock:
+            candidate = self._candidate()
+            if candidate is None:
+                return 0
+            key = candidate[1]
+            value, size, _cost = self._entries.pop(key)
+            self._bytes -= size
+        if self._on_evict is not None:
+            try:
+                self._on_evict(key, value)
+            except Exception as e:
+                print(f"Error evicting from {self.name}: {e}")
+        return size
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import datetime
+import posixpath
+import re
+import zipfile
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from xml.etree.ElementTree import iterparse
+
+# OOXML ファイル (docx/pptx/xlsx) の zip パートを直接ストリーミング解析する軽量抽出器です。
+# python-docx / python-pptx / openpyxl のオブジェクトモデルを構築しないため高速です。
+# 名前空間は Transitional / Strict で異なるため、タグはローカル名で判定します。
+
+Source = Union[str, BinaryIO]
+
+_REL_NOTES_SLIDE = "/notesSlide"
+
+# xlsx の日付/時刻の表示形式。判定と変換は openpyxl と同じです
+_BUILTIN_DATE_FORMATS = {14, 15, 16, 17, 18, 19, 20, 21, 22, 45, 46, 47}
+_BUILTIN_TIMEDELTA_FORMATS = {46}
+_FORMAT_STRIP_RE = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_DATE_FORMAT_RE = re.compile(r"(?<![_\\])[dmhysDMHYS]")
+_TIMEDELTA_FORMAT_RE = re.compile(r"\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?")
+_WINDOWS_EPOCH = datetime.datetime(1899, 12, 30)
+_MAC_EPOCH = datetime.datetime(1904, 1, 1)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _rel_id(elem) -> str:
+    """Return the namespaced r:id attribute (not the plain numeric id)."""
+    for key, value in elem.attrib.items():
+        if key.startswith("{") and _local(key) == "id":
+            return value
+    return ""
+
+
+def _natural_key(name: str):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def _read_rels(zf: zipfile.ZipFile, part: str) -> Dict[str, tuple]:
+    """Return {rId: (target part path, relationship type)} for *part*."""
+    base_dir, name = posixpath.split(part)
+    rels_path = posixpath.join(base_dir, "_rels", f"{name}.rels")
+    rels: Dict[str, tuple] = {}
+    try:
+        fp = zf.open(rels_path)
+    except KeyError:
+        return rels
+    with fp:
+        for _event, elem in iterparse(fp):
+            if _local(elem.tag) != "Relationship" or elem.get("TargetMode") == "External":
+                continue
+            target = elem.get("Target", "")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join(base_dir, target))
+            rels[elem.get("Id", "")] = (path, elem.get("Type", ""))
+    return rels
+
+
+def _paragraph_lines(fp: BinaryIO) -> List[str]:
+    """
+    WordprocessingML / DrawingML のパートから段落を文書順に取り出します。
+    表は行ごとにセルをタブ区切りで出力し、入れ子の表はセル内に展開します。
+    """
+    lines: List[str] = []
+    para: List[str] = []
+    para_stack: List[List[str]] = []
+    # 表ごとのフレーム: 現在の行/セルのバッファと、確定した行
+    tables: List[dict] = []
+    run_depth = 0
+
+    def emit(text: str) -> None:
+        if tables and tables[-1]["cell"] is not None:
+            tables[-1]["cell"].append(text)
+        else:
+            lines.append(text)
+
+    for event, elem in iterparse(fp, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "p":
+                para_stack.append(para)
+                para = []
+            elif tag == "r":
+                run_depth += 1
+            elif tag == "tbl":
+                tables.append({"row": None, "cell": None, "lines": []})
+            elif tag == "tr" and tables:
+                tables[-1]["row"] = []
+            elif tag == "tc" and tables:
+                tables[-1]["cell"] = []
+            continue
+
+        if tag == "t":
+            para.append(elem.text or "")
+        elif tag == "tab" and run_depth:
+            # pPr 内のタブ位置定義 (w:tabs/w:tab) は除外
+            para.append("\t")
+        elif tag in ("br", "cr"):
+            para.append("\n")
+        elif tag == "r":
+            run_depth -= 1
+        elif tag == "p":
+            text = "".join(para)
+            para = para_stack.pop() if para_stack else []
+            emit(text)
+            elem.clear()
+        elif tag == "tc" and tables:
+            frame = tables[-1]
+            if frame["row"] is not None and frame["cell"] is not None:
+                frame["row"].append(" ".join(t for t in frame["cell"] if t))
+            frame["cell"] = None
+        elif tag == "tr" and tables:
+            frame = tables[-1]
+            if frame["row"] is not None:
+                frame["lines"].append("\t".join(frame["row"]))
+            frame["row"] = None
+            elem.clear()
+        elif tag == "tbl" and tables:
+            frame = tables.pop()
+            for line in frame["lines"]:
+                emit(line)
+            elem.clear()
+    return lines
+
+
+def _part_lines(zf: zipfile.ZipFile, part: str) -> List[str]:
+    try:
+        fp = zf.open(part)
+    except KeyError:
+        return []
+    with fp:
+        return _paragraph_lines(fp)
+
+
+def extract_docx_xml(source: Source) -> str:
+    """Extract headers, body (including tables) and footers from a .docx in document order."""
+    with zipfile.ZipFile(source) as zf:
+        names = zf.namelist()
+        headers = sorted((n for n in names if re.fullmatch(r"word/header\d*\.xml", n)), key=_natural_key)
+        footers = sorted((n for n in names if re.fullmatch(r"word/footer\d*\.xml", n)), key=_natural_key)
+        if "word/document.xml" not in names:
+            raise KeyError("word/document.xml")
+
+        lines: List[str] = []
+        for part in headers:
+            lines.extend(_part_lines(zf, part))
+        lines.extend(_part_lines(zf, "word/document.xml"))
+        for part in ("word/footnotes.xml", "word/endnotes.xml"):
+            if part in names:
+                lines.extend(_part_lines(zf, part))
+        for part in footers:
+            lines.extend(_part_lines(zf, part))
+    return "\n".join(lines)
+
+
+def _slide_parts(zf: zipfile.ZipFile) -> List[str]:
+    rels = _read_rels(zf, "ppt/presentation.xml")
+    slides: List[str] = []
+    with zf.open("ppt/presentation.xml") as fp:
+        for _event, elem in iterparse(fp):
+            if _local(elem.tag) == "sldId":
+                rel = rels.get(_rel_id(elem))
+                if rel:
+                    slides.append(rel[0])
+    return slides
+
+
+def extract_pptx_xml(source: Source) -> str:
+    """Extract slide text (including tables) and speaker notes from a .pptx in slide order."""
+    with zipfile.ZipFile(source) as zf:
+        text: List[str] = []
+        for i, slide in enumerate(_slide_parts(zf)):
+            text.append(f"[スライド{i + 1}]")
+            text.extend(line for line in _part_lines(zf, slide) if line)
+            for target, rel_type in _read_rels(zf, slide).values():
+                if rel_type.endswith(_REL_NOTES_SLIDE):
+                    notes = [line for line in _part_lines(zf, target) if line]
+                    if notes:
+                        text.append("[ノート]")
+                        text.extend(notes)
+    return "\n".join(text)
+
+
+def _shared_strings(zf: zipfile.ZipFile, part: Optional[str]) -> List[str]:
+    strings: List[str] = []
+    if not part or part not in zf.namelist():
+        return strings
+    current: List[str] = []
+    phonetic_depth = 0
+    with zf.open(part) as fp:
+        for event, elem in iterparse(fp, events=("start", "end")):
+            tag = _local(elem.tag)
+            if event == "start":
+                if tag == "rPh":
+                    phonetic_depth += 1
+                continue
+            if tag == "rPh":
+                phonetic_depth -= 1
+            elif tag == "t" and not phonetic_depth:
+                current.append(elem.text or "")
+            elif tag == "si":
+                strings.append("".join(current))
+                current = []
+                elem.clear()
+    return strings
+
+
+def _column_index(ref: Optional[str]) -> Optional[int]:
+    if not ref:
+        return None
+    col = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            col = col * 26 + (ord(ch) - 64)
+        else:
+            break
+    return col - 1 if col else None
+
+
+def _format_number(value: str) -> str:
+    # openpyxl と同様、整数は整数として表示
+    if value.lstrip("-").isdigit():
+        return value
+    try:
+        return str(float(value))
+    except ValueError:
+        return value
+
+
+def _is_date_format(code: str) -> bool:
+    code = _FORMAT_STRIP_RE.sub("", code.split(";")[0])
+    return _DATE_FORMAT_RE.search(code) is not None
+
+
+def _date_styles(zf: zipfile.ZipFile, part: Optional[str]) -> Dict[int, bool]:
+    """Return {cellXfs index: is elapsed-time format} for the cell styles that display numbers as dates."""
+    if not part or part not in zf.namelist():
+        return {}
+    custom: Dict[int, str] = {}
+    xf_formats: List[int] = []
+    in_cell_xfs = False
+    with zf.open(part) as fp:
+        for event, elem in iterparse(fp, events=("start", "end")):
+            tag = _local(elem.tag)
+            if tag == "cellXfs":
+                in_cell_xfs = event == "start"
+            elif event == "start":
+                continue
+            elif tag == "numFmt":
+                try:
+                    custom[int(elem.get("numFmtId", ""))] = elem.get("formatCode", "")
+                except ValueError:
+                    pass
+            elif tag == "xf" and in_cell_xfs:
+                try:
+                    xf_formats.append(int(elem.get("numFmtId", "0")))
+                except ValueError:
+                    xf_formats.append(0)
+
+    dates: Dict[int, bool] = {}
+    for style, fmt_id in enumerate(xf_formats):
+        code = custom.get(fmt_id)
+        if code is not None:
+            if _is_date_format(code):
+                dates[style] = _TIMEDELTA_FORMAT_RE.search(code.split(";")[0]) is not None
+        elif fmt_id in _BUILTIN_DATE_FORMATS:
+            dates[style] = fmt_id in _BUILTIN_TIMEDELTA_FORMATS
+    return dates
+
+
+def _format_date(value: str, epoch: datetime.datetime, elapsed: bool) -> str:
+    # openpyxl の from_excel と同じ変換 (1日未満は時刻、[h]:mm などは経過時間)
+    try:
+        serial = float(value)
+        if elapsed:
+            delta = datetime.timedelta(days=serial)
+            if delta.microseconds:
+                delta = datetime.timedelta(seconds=delta.total_seconds() // 1,
+                                           microseconds=round(delta.microseconds, -3))
+            return str(delta)
+        day, fraction = divmod(serial, 1)
+        diff = datetime.timedelta(milliseconds=round(fraction * 86400 * 1000))
+        if 0 <= serial < 1 and diff.days == 0:
+            minutes, seconds = divmod(diff.seconds, 60)
+            hours, minutes = divmod(minutes, 60)
+            return str(datetime.time(hours, minutes, seconds, diff.microseconds))
+        if 0 < serial < 60 and epoch == _WINDOWS_EPOCH:
+            day += 1  # Excel の 1900/2/29 の分
+        return str(epoch + datetime.timedelta(days=day) + diff)
+    except (ValueError, OverflowError):
+        return _format_number(value)
+
+
+def _sheet_rows(fp: BinaryIO, shared: List[str], dates: Optional[Dict[int, bool]] = None,
+                epoch: datetime.datetime = _WINDOWS_EPOCH) -> Iterator[str]:
+    # シートはファイル中で最も大きいパートなので、end イベントのみで処理します
+    row: List[str] = []
+    for _event, elem in iterparse(fp):
+        tag = elem.tag
+        if tag.endswith("}c"):
+            cell_type = elem.get("t", "n")
+            value: Optional[str] = None
+            inline = ""
+            for child in elem:
+                child_tag = child.tag
+                if child_tag.endswith("}v"):
+                    value = child.text or ""
+                elif child_tag.endswith("}is"):
+                    inline = "".join(t.text or "" for t in child.iter() if t.tag.endswith("}t"))
+
+            if cell_type == "s" and value is not None:
+                try:
+                    text = shared[int(value)]
+                except (ValueError, IndexError):
+                    text = ""
+            elif cell_type == "inlineStr":
+                text = inline
+            elif cell_type == "b" and value is not None:
+                text = "True" if value == "1" else "False"
+            elif cell_type == "n" and value is not None:
+                style = elem.get("s") if dates else None
+                if style is not None and style.isdigit() and int(style) in dates:
+                    text = _format_date(value, epoch, dates[int(style)])
+                else:
+                    text = _format_number(value)
+            elif cell_type == "d" and value is not None:
+                try:
+                    text = str(datetime.datetime.fromisoformat(value))
+                except ValueError:
+                    text = value
+            else:
+                text = value or ""
+
+            cell_col = _column_index(elem.get("r"))
+            if cell_col is not None and cell_col > len(row):
+                row.extend([""] * (cell_col - len(row)))
+            row.append(text)
+            elem.clear()
+        elif tag.endswith("}row"):
+            yield "\t".join(row)
+            row = []
+            elem.clear()
+
+
+def extract_xlsx_xml(source: Source) -> str:
+    """
+    Extract every worksheet of a .xlsx as tab separated rows, resolving shared strings.
+    Numbers in date-formatted cells are shown as dates, the same as openpyxl.
+    """
+    with zipfile.ZipFile(source) as zf:
+        rels = _read_rels(zf, "xl/workbook.xml")
+        shared_part = next(
+            (target for target, rel_type in rels.values() if rel_type.endswith("/sharedStrings")),
+            "xl/sharedStrings.xml",
+        )
+        shared = _shared_strings(zf, shared_part)
+        styles_part = next(
+            (target for target, rel_type in rels.values() if rel_type.endswith("/styles")),
+            "xl/styles.xml",
+        )
+        dates = _date_styles(zf, styles_part)
+
+        sheets: List[Tuple[str, str]] = []
+        epoch = _WINDOWS_EPOCH
+        with zf.open("xl/workbook.xml") as fp:
+            for _event, elem in iterparse(fp):
+                tag = _local(elem.tag)
+                if tag == "sheet":
+                    rel = rels.get(_rel_id(elem))
+                    if rel:
+                        sheets.append((elem.get("name", ""), rel[0]))
+                elif tag == "workbookPr" and elem.get("date1904", "").lower() in ("1", "true"):
+                    epoch = _MAC_EPOCH
+
+        text: List[str] = []
+        for name, part in sheets:
+            text.append(f"[{name}]")
+            try:
+                fp = zf.open(part)
+            except KeyError:
+                continue
+            with fp:
+                text.extend(_sheet_rows(fp, shared, dates, epoch))
+    return "\n".join(text)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from multiprocessing import cpu_count
+from multiprocessing.pool import Pool
+from typing import Optional
+
+from utils import io_layer
+from utils.memory_budget import memory_budget
+
+
+def default_pool_size() -> int:
+    return max(1, cpu_count() - 1)
+
+
+def _init_worker(memory_budget_bytes: int, io_settings: io_layer.IOSettings, io_lanes) -> None:
+    memory_budget.set_limit(memory_budget_bytes)
+    io_layer.configure(io_settings, io_lanes)
+
+
+class ExtractionPool(Pool):
+    """A multiprocessing Pool that remembers its number of worker processes (Pool has no public accessor)."""
+
+    def __init__(self, processes: int, *args, **kwargs) -> None:
+        super().__init__(processes, *args, **kwargs)
+        self.processes = processes
+
+
+def create_process_pool(processes: Optional[int] = None, memory_budget_bytes: Optional[int] = None):
+    """
+    Create the extraction pool shared by the GUI and the headless CLI.
+
+    The memory budget (default: this process's budget) is split evenly between
+    this process and the workers, so the whole application stays within it.
+    In slow-storage mode the per-mount I/O slots are created here and shared
+    with the workers, so the limit holds across all processes.
+    """
+    processes = processes or default_pool_size()
+    total = memory_budget.limit_bytes if memory_budget_bytes is None else memory_budget_bytes
+    share = total // (processes + 1)
+    memory_budget.set_limit(share)
+    io_settings = io_layer.settings
+    io_lanes = io_layer.create_mount_lanes(io_settings.concurrency) if io_settings.slow_mode else None
+    io_layer.configure(io_settings, io_lanes)
+    return ExtractionPool(processes, initializer=_init_worker, initargs=(share, io_settings, io_lanes))
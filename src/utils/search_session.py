@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+class SearchQuery:
+    """
+    内容検索のクエリです。空白区切りの語はすべて含む (AND) ファイルに一致し、
+    "..." で囲んだ部分は空白を含む1語として扱います。大文字小文字は区別しません。
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.terms: List[str] = [
+            (quoted or word).lower() for quoted, word in _TERM_PATTERN.findall(text)
+        ]
+
+    def count_hits(self, text: str) -> int:
+        """Return the total number of term occurrences, or 0 unless every term occurs."""
+        lowered = text.lower()
+        total = 0
+        for term in self.terms:
+            count = lowered.count(term)
+            if not count:
+                return 0
+            total += count
+        return total
+
+    def narrows(self, previous: SearchQuery) -> bool:
+        """
+        このクエリに一致するファイルが必ず previous にも一致するかを返します。
+        語の追加や、既存の語をより長い文字列にした場合が該当します。
+        """
+        if not previous.terms:
+            return False
+        return all(any(old in new for new in self.terms) for old in previous.terms)
+
+
+def is_literal_pattern(pattern: str) -> bool:
+    return not any(c in _REGEX_META for c in pattern)
+
+
+def normalize_name(name: str) -> str:
+    """Name as the name filter sees it: NFC, so decomposed names (e.g. from macOS) match typed text."""
+    return name if name.isascii() else unicodedata.normalize("NFC", name)
+
+
+def compile_name_filter(pattern: str) -> Optional[re.Pattern]:
+    """ツリーの名前フィルタ (大文字小文字を区別しない正規表現) をコンパイルします。空なら None。"""
+    return re.compile(normalize_name(pattern), re.IGNORECASE) if pattern else None
+
+
+def name_filter_narrows(new: str, old: str) -> bool:
+    """True when every name matching *new* also matches *old* (tree filter semantics)."""
+    if not old:
+        return True
+    if new == old:
+        return True
+    return is_literal_pattern(new) and is_literal_pattern(old) and old.lower() in new.lower()
+
+
+class SearchSession:
+    """1回の内容検索の条件とヒット集合です。ヒット数は array でコンパクトに保持します。"""
+
+    def __init__(self, root: str, name_filter: str, query: SearchQuery, refined: bool = False) -> None:
+        self.root = os.path.normcase(os.path.abspath(root))
+        self.name_filter = name_filter
+        self.query = query
+        self.refined = refined
+        # 検索にかかった秒数 (履歴から追い出すときの再計算コスト)
+        self.seconds = 0.0
+        # 全ファイルを最後まで検索できたら True。エラーや中断で途中までのヒットは、履歴にも絞り込みにも使いません
+        self.complete = False
+        self.error: Optional[str] = None
+        self._paths: List[str] = []
+        self._hits = array("L")
+        self._memory_usage: Optional[int] = None
+
+    def add_results(self, batch: Sequence[Tuple[str, int]]) -> None:
+        for path, hits in batch:
+            self._paths.append(path)
+            self._hits.append(hits)
+        self._memory_usage = None
+
+    def memory_usage(self) -> int:
+        if self._memory_usage is None:
+            self._memory_usage = (
+                sys.getsizeof(self._paths)
+                + sum(sys.getsizeof(p) for p in self._paths)
+                + self._hits.buffer_info()[1] * self._hits.itemsize
+            )
+        return self._memory_usage
+
+    @property
+    def results(self) -> List[Tuple[str, int]]:
+        return list(zip(self._paths, self._hits))
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def can_refine(self, root: str, name_filter: str, query: SearchQuery) -> bool:
+        """Whether a search for the given conditions can be evaluated on this session's hits only."""
+        if not self.complete:
+            return False
+        if os.path.normcase(os.path.abspath(root)) != self.root:
+            return False
+        if not name_filter_narrows(name_filter, self.name_filter):
+            return False
+        if query.text == self.query.text and name_filter == self.name_filter:
+            # 同じ条件での再検索は、ファイルの変更を拾うためツリー全体を再走査します
+            return False
+        return query.narrows(self.query)
+
+    def candidate_paths(self, name_filter: str) -> List[str]:
+        if not name_filter or name_filter == self.name_filter:
+            return list(self._paths)
+        regex = compile_name_filter(name_filter)
+        return [p for p in self._paths if regex.search(normalize_name(os.path.basename(p)))]
+
+    def describe(self) -> str:
+        text = f"'{self.query.text}'"
+        if self.name_filter:
+            text += f" (名前: {self.name_filter})"
+        text += f" {len(self)} 件"
+        if self.refined:
+            text += " — 絞り込み"
+        return text
+
+
+class SearchHistory:
+    """
+    検索セッションの履歴です。戻る/進むで過去のヒット集合を再計算せずに表示できます。
+    セッション数と保持するパスの総数に上限を設け、古いものから破棄します。
+    メモリ予算にも登録でき、その場合は表示中以外のセッションが古い順に追い出されます。
+    追い出しは予算に追加したスレッド (一時ファイルのコピーなど) で行われるため、操作はロックで保護します。
+    """
+
+    name = "search_history"
+
+    def __init__(self, max_sessions: int = 30, max_paths: int = 500_000) -> None:
+        self.max_sessions = max_sessions
+        self.max_paths = max_paths
+        self._sessions: List[SearchSession] = []
+        self._index = -1
+        self._lock = threading.RLock()
+
+    def push(self, session: SearchSession) -> None:
+        with self._lock:
+            # 戻った状態で新しく検索したら、進む側の履歴は捨てる
+            del self._sessions[self._index + 1:]
+            self._sessions.append(session)
+            self._enforce_limits()
+            self._index = len(self._sessions) - 1
+
+    def _enforce_limits(self) -> None:
+        total = sum(len(s) for s in self._sessions)
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or total > self.max_paths
+        ):
+            total -= len(self._sessions.pop(0))
+
+    def current(self) -> Optional[SearchSession]:
+        with self._lock:
+            return self._sessions[self._index] if self._sessions else None
+
+    def can_go_back(self) -> bool:
+        with self._lock:
+            return self._index > 0
+
+    def can_go_forward(self) -> bool:
+        with self._lock:
+            return self._index < len(self._sessions) - 1
+
+    def back(self) -> Optional[SearchSession]:
+        with self._lock:
+            if self.can_go_back():
+                self._index -= 1
+            return self.current()
+
+    def forward(self) -> Optional[SearchSession]:
+        with self._lock:
+            if self.can_go_forward():
+                self._index += 1
+            return self.current()
+
+    def find_refinable(self, root: str, name_filter: str, query: SearchQuery) -> Optional[SearchSession]:
+        """Return the smallest stored session whose hits are a superset of the new search."""
+        with self._lock:
+            candidates = [s for s in self._sessions if s.can_refine(root, name_filter, query)]
+        return min(candidates, key=len) if candidates else None
+
+    def path_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._sessions)
+
+    # --- MemoryBudget protocol ---
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(s.memory_usage() for s in self._sessions)
+
+    def _oldest_evictable(self) -> Optional[int]:
+        for i in range(len(self._sessions)):
+            if i != self._index:
+                return i
+        return None
+
+    def eviction_score(self) -> Optional[float]:
+        with self._lock:
+            i = self._oldest_evictable()
+            if i is None:
+                return None
+            session = self._sessions[i]
+        return session.seconds / (max(1, session.memory_usage()) / 1e6)
+
+    def evict_one(self) -> int:
+        with self._lock:
+            i = self._oldest_evictable()
+            if i is None:
+                return 0
+            session = self._sessions.pop(i)
+            if i < self._index:
+                self._index -= 1
+        return session.memory_usage()
@@ -1,28 +1,491 @@
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Tuple
+import io
+import json
+import os
+import queue
+import sys
+import time
+from functools import partial
+from multiprocessing import Manager, cpu_count
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
 
-from utils.file_operations import extract_text_preview
+from utils import io_layer
+from utils.archive import ArchiveMember, is_archive, iter_members, member_path, open_member, split_member_path
+from utils.diagnostics import FileDiagnostics, diagnose_archive, diagnose_file, flush_profile
+from utils.file_operations import (
+    extract_eml_text,
+    extract_msg_text,
+    extract_pdf_pages,
+    extract_text_from_stream,
+    extract_text_preview,
+    get_pdf_page_count,
+    is_extraction_error,
+)
+from utils.mail_extract import is_mail
+from utils.memory_budget import BudgetedCache
+from utils.search_session import SearchQuery, compile_name_filter, normalize_name
+from utils.text_cache import TextCache
+
+# ディスクキャッシュは GUI・CLI・全ワーカープロセスで共有されます
+text_cache = TextCache()
+
+def extract_and_cache(file_path: str, read_path: Optional[str] = None) -> str:
+    """
+    file_path のテキストをディスクキャッシュから返します。
+    キャッシュに無ければ read_path (一時コピーなど、省略時は file_path) から抽出して保存します。
+    """
+    member = split_member_path(file_path)
+    if member is not None:
+        return extract_member_and_cache(*member)
+    text = text_cache.get(file_path)
+    if text is None:
+        text = _extract_file(file_path, read_path or file_path)
+        if not is_extraction_error(text):
+            text_cache.put(file_path, text)
+    return text
+
+def _extract_file(file_path: str, read_path: str) -> str:
+    if io_layer.slow_mode():
+        # 低速ストレージでは小さな読み込みを何度も行わないよう、ファイル全体を先にメモリへ読み込みます。
+        # 大きなファイルはメモリに置かず、ローカルの一時ファイルにコピーしてから抽出します
+        data = io_layer.read_file(read_path)
+        if data is None:
+            with io_layer.local_copy(read_path) as local_path:
+                if is_mail(file_path):
+                    return _extract_mail(file_path, local_path)
+                return extract_text_preview(local_path)
+        if is_mail(file_path):
+            return _extract_mail(file_path, io.BytesIO(data))
+        return extract_text_from_stream(file_path, io.BytesIO(data))
+    if is_mail(file_path):
+        return _extract_mail(file_path, read_path)
+    with io_layer.io_slot(read_path):
+        return extract_text_preview(read_path)
+
+def _extract_mail(file_path: str, source) -> str:
+    """メールの添付ファイルはメンバーごとにキャッシュし、プレビューから開いたときにも再利用します。"""
+    def attachment_text(member, open_buffer) -> str:
+        return _extract_member(file_path, member, open_buffer)[0]
+
+    if file_path.lower().endswith(".msg"):
+        return extract_msg_text(source, attachment_text)
+    return extract_eml_text(source, attachment_text)
+
+def _member_part(name: str) -> str:
+    # アーカイブ自体の同一性 (パス・サイズ・更新時刻) にメンバー名を加えたものがキャッシュキーになります。
+    # メンバーの情報が要らないため、キャッシュにあればアーカイブを読まずに済みます
+    return f"member:{name}"
+
+def _extract_member(archive_path: str, member: ArchiveMember, open_buffer) -> Tuple[str, bool]:
+    """Return (text, was_cached) for one member, reading it only on a cache miss."""
+    text = text_cache.get(archive_path, part=_member_part(member.name))
+    if text is not None:
+        return text, True
+    buffer = open_buffer()
+    if buffer is None:
+        return f"プレビュー中にエラーが発生しました: {member.name} は大きすぎます ({member.size} bytes)", False
+    with buffer:
+        text = extract_text_from_stream(member.name, buffer)
+    if not is_extraction_error(text):
+        text_cache.put(archive_path, text, part=_member_part(member.name))
+    return text, False
+
+def extract_member_and_cache(archive_path: str, name: str) -> str:
+    """アーカイブのメンバー1件を、アーカイブを展開せずに抽出します。キャッシュにあればアーカイブは読みません。"""
+    text = text_cache.get(archive_path, part=_member_part(name))
+    if text is not None:
+        return text
+    with io_layer.io_slot(archive_path):
+        member, buffer = open_member(archive_path, name)
+    if member is None:
+        return f"プレビュー中にエラーが発生しました: {name} がアーカイブにありません"
+    return _extract_member(archive_path, member, lambda: buffer)[0]
+
+# このキャッシュはプロセスごとに作成され、プロセスのメモリ予算に従って追い出されます
+_text_memory_cache = BudgetedCache("text")
 
-# このキャッシュはプロセスごとに作成されます
-@lru_cache(maxsize=128)
 def get_cached_text_preview(file_path: str) -> str:
     """テキスト抽出の結果をキャッシュします。"""
-    return extract_text_preview(file_path)
+    text = _text_memory_cache.get(file_path)
+    if text is None:
+        start = time.perf_counter()
+        text = extract_and_cache(file_path)
+        _text_memory_cache.put(file_path, text, sys.getsizeof(text), time.perf_counter() - start)
+    return text
 
 def search_file_worker(args: Tuple[str, str]):
     """
     multiprocessingのためのワーカー関数です。
     単一のファイル内でキーワードを検索します。
-    処理したファイルパスと、キーワードが見つかったかどうかの真偽値を返します。
+    処理したファイルパスと、キーワードの出現回数 (すべての語が見つからなければ 0) を返します。
     """
     file_path, keyword = args
     try:
         # キャッシュされた関数を使用します
         text = get_cached_text_preview(file_path)
-        if keyword.lower() in text.lower():
-            return (file_path, True)
+        return (file_path, SearchQuery(keyword).count_hits(text))
     except Exception as e:
         print(f"Error processing {file_path}: {e}")
-    return (file_path, False)
+    return (file_path, 0)
+
+def warm_file_worker(file_path: str):
+    """
+    キャッシュを温めるためのワーカー関数です。
+    (ファイルパス, 抽出した文字数, 読み込んだバイト数, 処理秒数, キャッシュ済みだったか) を返します。
+    """
+    start = time.perf_counter()
+    cached = text_cache.contains(file_path)
+    chars = 0
+    try:
+        chars = len(extract_and_cache(file_path))
+        size = 0 if cached else io_layer.getsize(file_path)
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        size = 0
+    return (file_path, chars, size, time.perf_counter() - start, cached)
+
+def _member_texts(archive_path: str, names: Optional[Collection[str]] = None) -> Iterator[Tuple[str, str, int, float, bool]]:
+    """
+    Yield (virtual path, text, bytes read, seconds, was_cached) for each member, or only for *names*.
+    Cached members are returned without touching the archive; the rest are read in one streaming pass.
+    """
+    wanted = None if names is None else set(names)
+    for name in list(wanted or ()):
+        path = member_path(archive_path, name)
+        start = time.perf_counter()
+        text = _text_memory_cache.get(path)
+        if text is None:
+            text = text_cache.get(archive_path, part=_member_part(name))
+            if text is not None:
+                _text_memory_cache.put(path, text, sys.getsizeof(text), time.perf_counter() - start)
+        if text is not None:
+            wanted.discard(name)
+            yield path, text, 0, time.perf_counter() - start, True
+    if wanted is not None and not wanted:
+        return
+
+    with io_layer.io_slot(archive_path):
+        for member, open_buffer in iter_members(archive_path):
+            if wanted is not None:
+                if member.name not in wanted:
+                    continue
+                wanted.discard(member.name)
+            path = member_path(archive_path, member.name)
+            start = time.perf_counter()
+            text = _text_memory_cache.get(path)
+            cached = text is not None
+            if text is None:
+                text, cached = _extract_member(archive_path, member, open_buffer)
+                _text_memory_cache.put(path, text, sys.getsizeof(text), time.perf_counter() - start)
+            yield path, text, 0 if cached else member.size, time.perf_counter() - start, cached
+            if wanted is not None and not wanted:
+                # 必要なメンバーが揃ったら、残りは読みません
+                break
+
+def archive_search_worker(args: Tuple[str, str, Optional[List[str]]]):
+    """
+    アーカイブ1件を検索するワーカー関数です。展開せずにメンバーを順に抽出し、
+    (アーカイブのパス, [(メンバーの仮想パス, 出現回数), ...]) を返します。
+    names を指定すると、そのメンバーだけを (アーカイブを1回だけ読んで) 検索します。
+    """
+    archive_path, keyword, names = args
+    query = SearchQuery(keyword)
+    results: List[Tuple[str, int]] = []
+    try:
+        for path, text, _size, _seconds, _cached in _member_texts(archive_path, names):
+            results.append((path, query.count_hits(text)))
+    except Exception as e:
+        print(f"Error processing {archive_path}: {e}")
+    return (archive_path, results)
+
+def archive_warm_worker(args: Tuple[str, Optional[List[str]]]):
+    """
+    アーカイブ1件のメンバー (names を指定するとそのメンバーだけ) をキャッシュし、
+    メンバーごとの warm_file_worker と同じ形の結果を返します。
+    """
+    archive_path, names = args
+    results: List[tuple] = []
+    try:
+        for path, text, size, seconds, cached in _member_texts(archive_path, names):
+            results.append((path, len(text), size, seconds, cached))
+    except Exception as e:
+        print(f"Error processing {archive_path}: {e}")
+    return (archive_path, results)
+
+# ページ数の多いPDFは、ページ範囲に分割して複数のワーカーで並列に抽出します
+PDF_PARALLEL_MIN_PAGES = 200
+PDF_PAGES_PER_TASK = 50
+# ページ数を数えるために開くのは、このサイズ以上のPDFだけです
+PDF_PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+def pdf_page_range_worker(args: Tuple[str, int, int]):
+    """
+    PDFのページ範囲 [start, stop) を抽出するワーカー関数です。各ワーカーが自分で PDF を開きます。
+    ページごとのテキストの一覧を範囲ごとに1件のディスクキャッシュに保存し (ページごとに書き込むと
+    ファイルの作成が抽出より遅くなるため)、(ファイルパス, start, ページごとのテキスト or None, 処理秒数) を返します。
+    """
+    file_path, start, stop = args
+    began = time.perf_counter()
+    part = f"pages:{start}-{stop}"
+    try:
+        cached = text_cache.get(file_path, part=part)
+        if cached is not None:
+            texts = json.loads(cached)
+        else:
+            with io_layer.io_slot(file_path):
+                texts = extract_pdf_pages(file_path, list(range(start, stop)))
+            text_cache.put(file_path, json.dumps(texts, ensure_ascii=False), part=part)
+    except Exception as e:
+        print(f"Error processing {file_path} pages {start}-{stop}: {e}")
+        texts = None
+    return (file_path, start, texts, time.perf_counter() - began)
+
+def _pdf_page_ranges(file_path: str) -> List[Tuple[int, int]]:
+    """Return page ranges for a PDF that should be split, or [] to process it as one task."""
+    if os.path.splitext(file_path)[1].lower() != ".pdf":
+        return []
+    try:
+        if io_layer.getsize(file_path) < PDF_PARALLEL_MIN_BYTES or text_cache.contains(file_path):
+            return []
+    except OSError:
+        return []
+    with io_layer.io_slot(file_path):
+        page_count = get_pdf_page_count(file_path)
+    if page_count < PDF_PARALLEL_MIN_PAGES:
+        return []
+    return [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+
+def _pdf_task(worker, args):
+    """
+    PDF 1件のタスクです。ページ数はワーカー側で数えるため、最初の結果を待たせません。
+    分割しない PDF は worker でそのまま処理して (None, 結果) を、分割する PDF は最初のページ範囲だけを抽出して
+    (全ページ範囲, 最初の範囲の結果) を返します。残りの範囲は呼び出し側が改めて投入します。
+    """
+    file_path = args[0] if isinstance(args, tuple) else args
+    try:
+        ranges = _pdf_page_ranges(file_path)
+    except Exception as e:
+        print(f"Error counting pages of {file_path}: {e}")
+        ranges = []
+    if not ranges:
+        return None, worker(args)
+    start, stop = ranges[0]
+    return ranges, pdf_page_range_worker((file_path, start, stop))
+
+class _PdfPageMerger:
+    """ページ範囲の結果を集め、全範囲が揃ったらページ順に連結して文書全体のキャッシュに保存します。"""
+
+    def __init__(self) -> None:
+        self._expected: Dict[str, int] = {}
+        self._parts: Dict[str, Dict[int, Optional[List[str]]]] = {}
+        self._seconds: Dict[str, float] = {}
+
+    def expect(self, file_path: str, range_count: int) -> None:
+        self._expected[file_path] = range_count
+        self._parts[file_path] = {}
+        self._seconds[file_path] = 0.0
+
+    def add(self, result) -> Optional[Tuple[str, str, float]]:
+        """Return (file_path, text, seconds) once every range of the file has arrived."""
+        file_path, start, texts, seconds = result
+        parts = self._parts[file_path]
+        parts[start] = texts
+        self._seconds[file_path] += seconds
+        if len(parts) < self._expected[file_path]:
+            return None
+
+        del self._parts[file_path], self._expected[file_path]
+        seconds = self._seconds.pop(file_path)
+        if any(texts is None for texts in parts.values()):
+            return (file_path, "", seconds)
+        # extract_pdf_text と同じくページを区切りなしで連結します
+        text = "".join(page for start in sorted(parts) for page in parts[start])
+        text_cache.put(file_path, text)
+        return (file_path, text, seconds)
+
+def _chunksize(task_count: int) -> int:
+    return max(1, task_count // (cpu_count() * 4))
+
+def _run_chunk(worker, chunk: list) -> list:
+    return [worker(args) for args in chunk]
+
+def _chunks(task_args: list) -> list:
+    # 小さいファイルはまとめて1タスクにし、タスクごとの受け渡しのコストを抑えます
+    size = _chunksize(len(task_args))
+    return [task_args[i:i + size] for i in range(0, len(task_args), size)]
+
+def _split_tasks(file_list: List[str]) -> Tuple[List[str], List[str], List[Tuple[str, Optional[List[str]]]]]:
+    """
+    Split file_list into (ordinary files, PDFs that may be split into page ranges, archive tasks).
+    An archive task is (archive path, None) for a whole archive or (archive path, member names) for
+    member paths, which are grouped so each archive is read once.
+    """
+    whole_files: List[str] = []
+    pdfs: List[str] = []
+    archives: List[Tuple[str, Optional[List[str]]]] = []
+    members: Dict[str, List[str]] = {}
+    for file_path in file_list:
+        member = split_member_path(file_path)
+        if member is not None:
+            members.setdefault(member[0], []).append(member[1])
+        elif is_archive(file_path):
+            archives.append((file_path, None))
+        elif os.path.splitext(file_path)[1].lower() == ".pdf":
+            pdfs.append(file_path)
+        else:
+            whole_files.append(file_path)
+    archives.extend(members.items())
+    return whole_files, pdfs, archives
+
+def _iter_pipeline(pool, worker, task_args: list, archive_worker, archive_args: list,
+                   pdf_args: list = (), merger: Optional[_PdfPageMerger] = None) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (0, file result), (1, page range result) or (2, archive result) as they complete.
+    PDFs in pdf_args are processed whole, or split into page ranges whose results are expected by *merger*
+    (*pool* must come from create_process_pool; a single-worker pool never splits). Every task is submitted with apply_async and its result comes back through one queue, so waiting
+    costs nothing however many page range tasks are added while running. A worker exception is re-raised here.
+    """
+    if pool.processes < 2:
+        # ワーカーが1つなら分割しても並列にならず、ページ数の確認と範囲ごとの処理が無駄になります
+        task_args = list(task_args) + list(pdf_args)
+        pdf_args = ()
+    results: "queue.Queue[Tuple[int, bool, object]]" = queue.Queue()
+    pending = 0
+
+    def submit(source: int, func, args) -> None:
+        nonlocal pending
+        pending += 1
+        # コールバックはプールの結果スレッドで呼ばれます
+        pool.apply_async(func, (args,),
+                         callback=lambda result: results.put((source, True, result)),
+                         error_callback=lambda error: results.put((source, False, error)))
+
+    # PDF とアーカイブは1件ずつ先に投入し、複数ワーカーに分散させます
+    for args in pdf_args:
+        submit(3, partial(_pdf_task, worker), args)
+    for args in archive_args:
+        submit(2, archive_worker, args)
+    for chunk in _chunks(task_args):
+        submit(0, partial(_run_chunk, worker), chunk)
+    while pending:
+        source, ok, result = results.get()
+        pending -= 1
+        if not ok:
+            raise result
+        if source == 0:
+            for file_result in result:
+                yield 0, file_result
+        elif source == 3:
+            ranges, first = result
+            if ranges is None:
+                yield 0, first
+                continue
+            # 最初の範囲は PDF のタスク内で抽出済みなので、残りの範囲を投入します
+            merger.expect(first[0], len(ranges))
+            for start, stop in ranges[1:]:
+                submit(1, pdf_page_range_worker, (first[0], start, stop))
+            yield 1, first
+        else:
+            yield source, result
+
+def iter_search(pool, keyword: str, file_list: List[str]) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (file_path, hit_count) as pool workers finish, in completion order.
+    Archives are searched member by member and yield virtual member paths.
+    """
+    merger = _PdfPageMerger()
+    whole_files, pdfs, archives = _split_tasks(file_list)
+    tasks = [(file_path, keyword) for file_path in whole_files]
+    pdf_tasks = [(file_path, keyword) for file_path in pdfs]
+    archive_tasks = [(archive_path, keyword, names) for archive_path, names in archives]
+    query = SearchQuery(keyword)
+    for source, result in _iter_pipeline(pool, search_file_worker, tasks, archive_search_worker, archive_tasks,
+                                         pdf_tasks, merger):
+        if source == 0:
+            yield result
+            continue
+        if source == 2:
+            # アーカイブはメンバーごとの結果として返します
+            yield from result[1]
+            continue
+        merged = merger.add(result)
+        if merged is not None:
+            file_path, text, _seconds = merged
+            yield (file_path, query.count_hits(text))
+
+def iter_warm(pool, file_list: List[str]) -> Iterator[tuple]:
+    """Run the extraction pipeline over file_list, filling the shared disk cache."""
+    merger = _PdfPageMerger()
+    whole_files, pdfs, archives = _split_tasks(file_list)
+    for source, result in _iter_pipeline(pool, warm_file_worker, whole_files, archive_warm_worker, archives,
+                                         pdfs, merger):
+        if source == 0:
+            yield result
+            continue
+        if source == 2:
+            yield from result[1]
+            continue
+        merged = merger.add(result)
+        if merged is not None:
+            file_path, text, seconds = merged
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+            yield (file_path, len(text), size, seconds, False)
+
+def diagnose_file_worker(args: Tuple[str, Optional[str]]) -> FileDiagnostics:
+    """診断用のワーカー関数です。キャッシュを使わずに抽出し、計測結果を返します。"""
+    file_path, profile_dir = args
+    return diagnose_file(file_path, profile_dir)
+
+def archive_diagnose_worker(args: Tuple[str, Optional[str]]):
+    archive_path, profile_dir = args
+    return (archive_path, diagnose_archive(archive_path, profile_dir))
+
+def flush_profile_worker(args) -> None:
+    profile_dir, barrier = args
+    flush_profile(profile_dir, barrier)
+
+def _flush_profiles(pool, profile_dir: str) -> None:
+    # 各ワーカーに1件ずつ書き出しタスクを渡します。プロセス数は create_process_pool が記録したものです
+    processes = pool.processes
+    with Manager() as manager:
+        barrier = manager.Barrier(processes)
+        pool.map(flush_profile_worker, [(profile_dir, barrier)] * processes, chunksize=1)
+
+def iter_diagnose(pool, file_list: List[str], profile_dir: Optional[str] = None) -> Iterator[FileDiagnostics]:
+    """
+    Yield one FileDiagnostics per file (per member for archives) as workers finish.
+    Large PDFs are measured whole rather than split into page ranges, so their time is the real per-file cost.
+    With *profile_dir*, every worker writes its remaining profile once the last result has been yielded.
+    """
+    archives = [path for path in file_list if is_archive(path) and split_member_path(path) is None]
+    archive_set = set(archives)
+    tasks = [(path, profile_dir) for path in file_list if path not in archive_set]
+    archive_tasks = [(path, profile_dir) for path in archives]
+    for source, result in _iter_pipeline(pool, diagnose_file_worker, tasks, archive_diagnose_worker, archive_tasks):
+        if source == 2:
+            yield from result[1]
+        else:
+            yield result
+    if profile_dir is not None:
+        _flush_profiles(pool, profile_dir)
+
+def walk_files(root: str, name_pattern: str = "") -> List[str]:
+    """
+    ツリービューと同じ条件 (隠しファイル除外、名前の正規表現・大文字小文字無視) で
+    root 以下のファイルを列挙します。
+    """
+    regex = compile_name_filter(name_pattern)
+    files: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if name.startswith("."):
+                continue
+            if regex is None or regex.search(normalize_name(name)):
+                files.append(os.path.join(dirpath, name))
+    return files
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import zlib
+from typing import Optional, Tuple
+
+from utils.disk_cache import atomic_write_bytes, directory_size, file_identity, get_cache_root, touch
+
+# 抽出結果の形式のバージョンです。抽出処理の出力が変わったら上げてください (古いキャッシュは使われなくなり、
+# 使われないまま prune_cache で削除されます)
+EXTRACTOR_VERSION = 2
+
+
+class TextCache:
+    """
+    抽出済みテキストをディスクに保存するキャッシュです。
+    GUI・CLI・プールの各ワーカープロセスで共有され、ファイルの同一性 (パス・サイズ・更新時刻) と
+    EXTRACTOR_VERSION をキーにします。
+    """
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self.root = root or os.path.join(get_cache_root(), "text")
+
+    def _entry_path(self, file_path: str, part: str) -> Optional[str]:
+        """part はファイルの一部 (PDFのページなど) を表し、空文字ならファイル全体です。"""
+        identity = file_identity(file_path)
+        if identity is None:
+            return None
+        key = hashlib.sha1(f"{identity}|{EXTRACTOR_VERSION}|{part}".encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.root, key[:2], f"{key}.txt.z")
+
+    def get(self, file_path: str, part: str = "") -> Optional[str]:
+        entry_path = self._entry_path(file_path, part)
+        if entry_path is None:
+            return None
+        try:
+            with open(entry_path, "rb") as f:
+                data = f.read()
+                touch(entry_path, os.fstat(f.fileno()).st_mtime)
+            return zlib.decompress(data).decode("utf-8", "surrogatepass")
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+
+    def contains(self, file_path: str, part: str = "") -> bool:
+        entry_path = self._entry_path(file_path, part)
+        return entry_path is not None and os.path.exists(entry_path)
+
+    def put(self, file_path: str, text: str, part: str = "") -> None:
+        entry_path = self._entry_path(file_path, part)
+        if entry_path is None:
+            return
+        data = zlib.compress(text.encode("utf-8", "surrogatepass"), 1)
+        try:
+            atomic_write_bytes(entry_path, data)
+        except OSError as e:
+            print(f"Error writing text cache: {e}")
+
+    def stats(self) -> Tuple[int, int]:
+        """Return (entry count, bytes on disk)."""
+        return directory_size(self.root)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from utils.disk_cache import atomic_write_bytes, directory_size, get_cache_root, touch
+
+THUMBNAIL_DPI = 18
+# 描画方法が変わったら上げてください (古いサムネイルは prune_cache で削除されます)
+THUMBNAIL_VERSION = 1
+# ページ数はサムネイルと同じディレクトリに保存し、再度開いたときに PDF を開かずにサムネイル欄を作ります
+PAGE_COUNT_FILE = "pages"
+# ThumbnailRenderTask.run の1回の実行時間の目安。ページの表示を長く待たせないよう小分けにします
+THUMBNAIL_SLICE_SECONDS = 0.05
+
+
+class ThumbnailCache:
+    """
+    PDFページのサムネイル(PNG)をディスクに保存するキャッシュです。
+    元ファイルの同一性・ページ番号・dpi・THUMBNAIL_VERSION をキーにするため、再度開いたときは fitz を使わずに表示できます。
+    """
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self.root = root or os.path.join(get_cache_root(), "thumbnails")
+
+    def _entry_dir(self, identity: str) -> str:
+        return os.path.join(self.root, identity[:2], f"{identity}-v{THUMBNAIL_VERSION}")
+
+    def _entry_path(self, identity: str, page_num: int, dpi: int) -> str:
+        return os.path.join(self._entry_dir(identity), f"{page_num}@{dpi}.png")
+
+    def get_page_count(self, identity: str) -> Optional[int]:
+        path = os.path.join(self._entry_dir(identity), PAGE_COUNT_FILE)
+        try:
+            with open(path, "rb") as f:
+                page_count = int(f.read())
+                touch(path, os.fstat(f.fileno()).st_mtime)
+            return page_count
+        except (OSError, ValueError):
+            return None
+
+    def put_page_count(self, identity: str, page_count: int) -> None:
+        try:
+            atomic_write_bytes(os.path.join(self._entry_dir(identity), PAGE_COUNT_FILE), str(page_count).encode("ascii"))
+        except OSError as e:
+            print(f"Error writing thumbnail cache: {e}")
+
+    def get(self, identity: str, page_num: int, dpi: int = THUMBNAIL_DPI) -> Optional[bytes]:
+        path = self._entry_path(identity, page_num, dpi)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+                touch(path, os.fstat(f.fileno()).st_mtime)
+            return png
+        except OSError:
+            return None
+
+    def put(self, identity: str, page_num: int, png: bytes, dpi: int = THUMBNAIL_DPI) -> None:
+        try:
+            atomic_write_bytes(self._entry_path(identity, page_num, dpi), png)
+        except OSError as e:
+            print(f"Error writing thumbnail cache: {e}")
+
+    def stats(self) -> Tuple[int, int]:
+        """Return (thumbnail count, bytes on disk)."""
+        return directory_size(self.root)
+
+
+class ThumbnailRenderTask:
+    """
+    サムネイルをバックグラウンドで生成するタスクです。
+    表示中のページ (prioritize で指定) から順に、キャッシュ済みなら読み込み、未作成なら低dpiで描画します。
+    PyMuPDF はスレッドセーフではないため、run は fitz 専用のスレッド (utils.worker.pdf_thread_pool) で
+    THUMBNAIL_SLICE_SECONDS ずつ実行し、その合間にページの描画を挟めるようにします。
+    """
+
+    def __init__(self, pdf_path: Optional[str], identity: Optional[str], pages: Iterable[int],
+                 cache: ThumbnailCache, dpi: int = THUMBNAIL_DPI) -> None:
+        # pdf_path は読み取り用の一時コピーで、コピー中は None (キャッシュ済みのページだけ読み込みます)。
+        # identity は元ファイルの file_identity で、キャッシュのキーになります
+        self.pdf_path = pdf_path
+        self.identity = identity
+        self.cache = cache
+        self.dpi = dpi
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._pending: List[int] = list(pages)
+        self._priority: List[int] = []
+        # 描画が必要だが pdf_path がまだ無いページ
+        self._waiting: List[int] = []
+        # 呼び出し側が run を実行待ちに入れている間 True にします
+        self.queued = False
+        self.done = False
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def set_pdf_path(self, pdf_path: str) -> bool:
+        """Set the copy to render from once it exists. Returns True if pages were waiting for it."""
+        with self._lock:
+            self.pdf_path = pdf_path
+            waiting = self._waiting
+            self._waiting = []
+            self._pending.extend(waiting)
+            if waiting:
+                self.done = False
+            return bool(waiting)
+
+    def has_work(self) -> bool:
+        """True if pages can be loaded or rendered by another run."""
+        with self._lock:
+            return bool(self._pending) and not self._cancelled.is_set()
+
+    def prioritize(self, pages: Iterable[int]) -> None:
+        with self._lock:
+            pending = set(self._pending)
+            self._priority = [p for p in pages if p in pending]
+
+    def _next_page(self) -> Optional[int]:
+        with self._lock:
+            while self._priority:
+                page_num = self._priority.pop(0)
+                if page_num in self._pending:
+                    self._pending.remove(page_num)
+                    return page_num
+            if self._pending:
+                return self._pending.pop(0)
+            return None
+
+    def run(self, progress_callback: Callable[[object], None]) -> bool:
+        """
+        Call progress_callback with (page_num, png) for pages until cancelled or the time slice is used up.
+        Returns True if pages are left for another run.
+        """
+        doc = None
+        matrix = fitz.Matrix(self.dpi / 72, self.dpi / 72)
+        deadline = time.perf_counter() + THUMBNAIL_SLICE_SECONDS
+        try:
+            while not self._cancelled.is_set() and time.perf_counter() < deadline:
+                page_num = self._next_page()
+                if page_num is None:
+                    break
+                png = self.cache.get(self.identity, page_num, self.dpi) if self.identity else None
+                if png is None:
+                    if self.pdf_path is None:
+                        with self._lock:
+                            self._waiting.append(page_num)
+                        continue
+                    # キャッシュに無いページがあるときだけ PDF を開く
+                    if doc is None:
+                        doc = fitz.open(self.pdf_path)
+                    png = doc[page_num].get_pixmap(matrix=matrix).tobytes("png")
+                    if self.identity is not None:
+                        self.cache.put(self.identity, page_num, png, self.dpi)
+                if not self._cancelled.is_set():
+                    progress_callback((page_num, png))
+        finally:
+            if doc is not None:
+                doc.close()
+        with self._lock:
+            more = bool(self._pending) and not self._cancelled.is_set()
+            self.done = not more and (not self._waiting or self._cancelled.is_set())
+        return more
@@ -2,9 +2,27 @@ from __future__ import annotations
 
 import sys
 import traceback
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
-from PyQt6.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+# pdf_thread_pool に入れる、ページの表示など待たせたくない作業の優先度 (サムネイルは 0)
+PDF_PAGE_PRIORITY = 1
+
+_pdf_thread_pool: Optional[QThreadPool] = None
+
+
+def pdf_thread_pool() -> QThreadPool:
+    """
+    The single thread that runs every PyMuPDF (fitz) call of the GUI process.
+    PyMuPDF is not thread-safe, so page rendering, page counts, thumbnails and
+    mail previews (which may extract PDF attachments) all share this thread.
+    """
+    global _pdf_thread_pool
+    if _pdf_thread_pool is None:
+        _pdf_thread_pool = QThreadPool()
+        _pdf_thread_pool.setMaxThreadCount(1)
+    return _pdf_thread_pool
 
 class WorkerSignals(QObject):
     """
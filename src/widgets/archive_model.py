@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+from PyQt6.QtCore import QModelIndex, QObject, Qt
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+from PyQt6.QtWidgets import QFileIconProvider
+
+from utils.archive import ArchiveMember, member_path
+from utils.search_session import normalize_name
+
+
+class ArchiveModel(QStandardItemModel):
+    """
+    アーカイブのメンバーをフォルダ階層つきで表示するモデルです。
+    ツリービューから DirectoryModel と同じように扱えるよう filePath() / isDir() を持ちます。
+    """
+
+    PathRole = Qt.ItemDataRole.UserRole + 1
+    DirRole = Qt.ItemDataRole.UserRole + 2
+    # 名前フィルタ用の正規化した名前
+    NameRole = Qt.ItemDataRole.UserRole + 3
+
+    def __init__(self, archive_path: str, members: List[ArchiveMember], parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.archive_path = archive_path
+        icons = QFileIconProvider()
+        self._dir_icon = icons.icon(QFileIconProvider.IconType.Folder)
+        self._file_icon = icons.icon(QFileIconProvider.IconType.File)
+        self._dirs: Dict[str, QStandardItem] = {}
+        for member in members:
+            self._add_member(member)
+        # フォルダを先に、それぞれ名前順に並べます
+        self.sort(0)
+
+    def _dir_item(self, dir_name: str) -> QStandardItem:
+        if not dir_name:
+            return self.invisibleRootItem()
+        item = self._dirs.get(dir_name)
+        if item is None:
+            parent_name, _, base = dir_name.rpartition("/")
+            item = QStandardItem(self._dir_icon, base)
+            item.setEditable(False)
+            item.setData(member_path(self.archive_path, dir_name), self.PathRole)
+            item.setData(True, self.DirRole)
+            item.setData(normalize_name(base), self.NameRole)
+            item.setData(f"0{base.lower()}", Qt.ItemDataRole.UserRole)
+            self._dir_item(parent_name).appendRow(item)
+            self._dirs[dir_name] = item
+        return item
+
+    def _add_member(self, member: ArchiveMember) -> None:
+        dir_name, _, base = member.name.strip("/").rpartition("/")
+        item = QStandardItem(self._file_icon, base)
+        item.setEditable(False)
+        item.setData(member_path(self.archive_path, member.name), self.PathRole)
+        item.setData(False, self.DirRole)
+        item.setData(normalize_name(base), self.NameRole)
+        item.setData(f"1{base.lower()}", Qt.ItemDataRole.UserRole)
+        self._dir_item(dir_name).appendRow(item)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:  # type: ignore[override]
+        self.setSortRole(Qt.ItemDataRole.UserRole)
+        super().sort(column, order)
+
+    def filePath(self, index: QModelIndex) -> str:
+        """Return the virtual member path of *index*; the invalid root index is the archive itself."""
+        if not index.isValid():
+            return self.archive_path
+        return index.data(self.PathRole)
+
+    def isDir(self, index: QModelIndex) -> bool:
+        return not index.isValid() or bool(index.data(self.DirRole))
+
+    def row_key(self, source_row: int, source_parent: QModelIndex) -> Tuple[object, str]:
+        """(virtual path, normalized name) of a row, for PathFilterProxyModel."""
+        item = self.itemFromIndex(self.index(source_row, 0, source_parent))
+        return item.data(self.PathRole), item.data(self.NameRole)
+
+    def pin_key(self, path: str) -> object:
+        return path
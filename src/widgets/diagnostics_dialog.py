@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QDialog,
+    QFileDialog,
+    QHBoxLayout,
+    QLabel,
+    QMessageBox,
+    QPlainTextEdit,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget,
+)
+
+from utils.diagnostics import DiagnosticsReport, FileDiagnostics
+
+# 画面に表示する遅いファイルの件数 (CSV にはすべて出力します)
+DIALOG_TOP_FILES = 500
+
+
+class _NumericItem(QTableWidgetItem):
+    """表示は整形した文字列、並べ替えは UserRole の数値で行います。"""
+
+    def __lt__(self, other: QTableWidgetItem) -> bool:
+        mine = self.data(Qt.ItemDataRole.UserRole)
+        theirs = other.data(Qt.ItemDataRole.UserRole)
+        if mine is None or theirs is None:
+            return super().__lt__(other)
+        return mine < theirs
+
+
+def _cell(value: float, text: str) -> QTableWidgetItem:
+    item = _NumericItem()
+    item.setData(Qt.ItemDataRole.DisplayRole, text)
+    item.setData(Qt.ItemDataRole.UserRole, value)
+    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+    return item
+
+
+def _table(headers: Sequence[str]) -> QTableWidget:
+    table = QTableWidget(0, len(headers))
+    table.setHorizontalHeaderLabels(list(headers))
+    table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    table.verticalHeader().setVisible(False)
+    table.horizontalHeader().setStretchLastSection(True)
+    return table
+
+
+class DiagnosticsDialog(QDialog):
+    """
+    診断結果 (遅いファイル・形式別の集計・失敗・プロファイル) を表示し、CSV に書き出すダイアログです。
+    ファイルの行をダブルクリックするとプレビューを開きます。
+    """
+
+    file_selected = pyqtSignal(str)
+
+    def __init__(self, report: DiagnosticsReport, profile_text: str = "", parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.report = report
+        self.setWindowTitle("診断レポート")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        total_bytes = sum(r.bytes_read for r in report.records)
+        layout.addWidget(QLabel(
+            f"{report.root}\n{len(report.records)} 件, {total_bytes / 1e6:.1f} MB, "
+            f"抽出時間の合計 {sum(r.seconds for r in report.records):.1f} 秒 (経過 {report.seconds:.1f} 秒), "
+            f"失敗 {len(report.failures())} 件"
+        ))
+
+        tabs = QTabWidget()
+        tabs.addTab(self._files_table(report.worst_files(DIALOG_TOP_FILES)), "遅いファイル")
+        tabs.addTab(self._formats_table(), "形式別")
+        tabs.addTab(self._files_table(report.failures(), with_error=True), f"失敗 ({len(report.failures())})")
+        if profile_text:
+            profile_view = QPlainTextEdit(profile_text)
+            profile_view.setReadOnly(True)
+            profile_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+            profile_view.setFont(QFont("Consolas, monospace"))
+            tabs.addTab(profile_view, "プロファイル")
+        layout.addWidget(tabs, 1)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch(1)
+        export_button = QPushButton("CSV に書き出す...")
+        export_button.clicked.connect(self.export_csv)
+        close_button = QPushButton("閉じる")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(export_button)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+    def _files_table(self, records: List[FileDiagnostics], with_error: bool = False) -> QTableWidget:
+        headers = ["秒", "MB", "最大メモリ MB", "形式", "パス"]
+        if with_error:
+            headers.append("エラー")
+        table = _table(headers)
+        table.setRowCount(len(records))
+        for row, r in enumerate(records):
+            table.setItem(row, 0, _cell(r.seconds, f"{r.seconds:.3f}"))
+            table.setItem(row, 1, _cell(r.bytes_read, f"{r.bytes_read / 1e6:.2f}"))
+            table.setItem(row, 2, _cell(r.peak_memory, f"{r.peak_memory / 1e6:.1f}"))
+            table.setItem(row, 3, QTableWidgetItem(r.format))
+            table.setItem(row, 4, QTableWidgetItem(r.path))
+            if with_error:
+                table.setItem(row, 5, QTableWidgetItem(r.error))
+        table.setSortingEnabled(True)
+        table.sortByColumn(0, Qt.SortOrder.DescendingOrder)
+        table.resizeColumnsToContents()
+        table.cellDoubleClicked.connect(lambda row, _column: self.file_selected.emit(table.item(row, 4).text()))
+        return table
+
+    def _formats_table(self) -> QTableWidget:
+        summary = self.report.format_summary()
+        table = _table(["形式", "件数", "合計秒", "平均秒", "最大秒", "MB/s", "最大メモリ MB", "失敗"])
+        table.setRowCount(len(summary))
+        for row, s in enumerate(summary):
+            table.setItem(row, 0, QTableWidgetItem(s.format))
+            table.setItem(row, 1, _cell(s.files, str(s.files)))
+            table.setItem(row, 2, _cell(s.seconds, f"{s.seconds:.2f}"))
+            table.setItem(row, 3, _cell(s.mean_seconds, f"{s.mean_seconds:.3f}"))
+            table.setItem(row, 4, _cell(s.max_seconds, f"{s.max_seconds:.2f}"))
+            table.setItem(row, 5, _cell(s.megabytes_per_second, f"{s.megabytes_per_second:.1f}"))
+            table.setItem(row, 6, _cell(s.peak_memory, f"{s.peak_memory / 1e6:.1f}"))
+            table.setItem(row, 7, _cell(s.failures, str(s.failures)))
+        table.setSortingEnabled(True)
+        table.sortByColumn(2, Qt.SortOrder.DescendingOrder)
+        table.resizeColumnsToContents()
+        return table
+
+    def export_csv(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(self, "診断結果を CSV に書き出す", "diagnostics.csv", "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            self.report.write_csv(path)
+        except OSError as e:
+            QMessageBox.warning(self, "診断レポート", f"CSV を書き出せませんでした: {e}")
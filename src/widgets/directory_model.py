@@ -0,0 +1,422 @@
+from __future__ import annotations
+
+import os
+import stat as stat_module
+import time
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex, QObject, QPersistentModelIndex, Qt, QThreadPool, pyqtSignal
+from PyQt6.QtWidgets import QFileIconProvider
+
+from utils.archive import split_member_path
+from utils.search_session import normalize_name
+from utils.worker import Worker, WorkerSignals
+from widgets.search_results_model import format_size
+
+# 最初のバッチは小さくし、大きなフォルダでも最初の画面をすぐに表示します
+FIRST_BATCH_SIZE = 256
+# 以降はこの間隔 (秒) ごとに、届いた分をまとめて追加します
+BATCH_INTERVAL = 0.5
+# 追加する行が並び順でこれ以上の箇所に散らばる場合は、末尾に追加して読み込みの最後に一度だけ並べ直します
+MAX_INSERT_GROUPS = 32
+# これより前に読み込んだフォルダは、ルートとして開いたときにバックグラウンドで読み直します
+LISTING_TTL_SECONDS = 30.0
+
+_FILE_ATTRIBUTE_HIDDEN = getattr(stat_module, "FILE_ATTRIBUTE_HIDDEN", 2)
+
+# (名前, パス, フォルダか, サイズ, 更新時刻, フィルタ用の正規化した名前)
+EntryInfo = Tuple[str, str, bool, int, float, str]
+
+
+def _entry_info(entry: os.DirEntry) -> Optional[EntryInfo]:
+    name = entry.name
+    if name.startswith("."):
+        return None
+    try:
+        is_dir = entry.is_dir()
+        # Windows では scandir の結果に含まれるため追加の I/O はありません
+        st: Optional[os.stat_result] = entry.stat()
+    except OSError:
+        is_dir, st = False, None
+    if st is not None and getattr(st, "st_file_attributes", 0) & _FILE_ATTRIBUTE_HIDDEN:
+        return None
+    size = st.st_size if st is not None and not is_dir else 0
+    mtime = st.st_mtime if st is not None else 0.0
+    return (name, entry.path, is_dir, size, mtime, normalize_name(name))
+
+
+def scan_directory(path: str, emit_batch: Callable[[List[EntryInfo]], None]) -> Tuple[List[EntryInfo], bool]:
+    """
+    os.scandir でフォルダを列挙し、メタデータつきのエントリを少しずつ emit_batch に渡します (バックグラウンドで実行)。
+    (最後のバッチ, 最後まで列挙できたか) を返します。
+    """
+    batch: List[EntryInfo] = []
+    first = True
+    last_emit = time.monotonic()
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                info = _entry_info(entry)
+                if info is None:
+                    continue
+                batch.append(info)
+                if (len(batch) >= FIRST_BATCH_SIZE) if first else (time.monotonic() - last_emit >= BATCH_INTERVAL):
+                    emit_batch(batch)
+                    batch = []
+                    first = False
+                    last_emit = time.monotonic()
+    except OSError as e:
+        print(f"Error listing {path}: {e}")
+        return batch, False
+    return batch, True
+
+
+class _Node:
+    __slots__ = ("name", "key", "path", "parent", "row", "is_dir", "size", "mtime", "filter_name",
+                 "children", "by_key", "listed_at", "loading", "scanned")
+
+    def __init__(self, name: str, path: str, parent: Optional[_Node], is_dir: bool = True,
+                 size: int = 0, mtime: float = 0.0, filter_name: Optional[str] = None) -> None:
+        self.name = name
+        self.key = os.path.normcase(name)
+        self.path = path
+        self.parent = parent
+        self.row = 0
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+        self.filter_name = filter_name if filter_name is not None else normalize_name(name)
+        self.children: List[_Node] = []
+        self.by_key: Dict[str, _Node] = {}
+        # 最後に一覧を読み込んだ時刻 (まだなら None)
+        self.listed_at: Optional[float] = None
+        self.loading = False
+        # 親フォルダの一覧で見つかったか (パス入力で作っただけの隠しフォルダなどは一覧から消しません)
+        self.scanned = False
+
+
+def _sort_key(node: _Node) -> Tuple[bool, str]:
+    # フォルダを先に、それぞれ名前順 (ArchiveModel と同じ)
+    return (not node.is_dir, node.filter_name.lower())
+
+
+def _ranges(rows: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted row numbers into (first, last) runs."""
+    runs: List[Tuple[int, int]] = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1] = (runs[-1][0], row)
+        else:
+            runs.append((row, row))
+    return runs
+
+
+class DirectoryModel(QAbstractItemModel):
+    """
+    QFileSystemModel の代わりに使うファイルシステムのモデルです。
+    フォルダはバックグラウンドの os.scandir で読み込み、メタデータごとキャッシュして、行をバッチ単位で追加します。
+    ツリービューから QFileSystemModel と同じように index(path) / filePath() / isDir() で扱えます。
+    """
+
+    COLUMNS = ("名前", "サイズ", "種類", "更新日時")
+    COL_NAME, COL_SIZE, COL_TYPE, COL_MTIME = range(4)
+
+    directory_loaded = pyqtSignal(str)
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._root = _Node("", "", None)
+        self._root.listed_at = 0.0  # 最上位 (ドライブやルート) は列挙しません
+        icons = QFileIconProvider()
+        self._dir_icon = icons.icon(QFileIconProvider.IconType.Folder)
+        self._file_icon = icons.icon(QFileIconProvider.IconType.File)
+        # 読み込み中のフォルダと、その読み込みのシグナル (古い読み込みの結果を捨てるため)
+        self._scans: Dict[_Node, WorkerSignals] = {}
+        self._seen: Dict[_Node, Set[str]] = {}
+        # 読み込みの最後に並べ直しが必要なフォルダ
+        self._unsorted: Set[_Node] = set()
+        self._updated: Set[_Node] = set()
+
+    # --- QFileSystemModel compatible API ---
+
+    def index(self, row, column: int = 0, parent: QModelIndex = QModelIndex()) -> QModelIndex:  # type: ignore[override]
+        """index(row, column, parent) or, like QFileSystemModel, index(path)."""
+        # ビューとプロキシから行ごとに呼ばれるため、処理を最小限にしています
+        if parent.isValid():
+            children = parent.internalPointer().children
+        elif isinstance(row, str):
+            return self._index_of(self.node_for_path(row), column)
+        else:
+            children = self._root.children
+        if 0 <= row < len(children) and 0 <= column < 4:
+            return self.createIndex(row, column, children[row])
+        return QModelIndex()
+
+    def filePath(self, index: QModelIndex) -> str:
+        return self._node(index).path
+
+    def isDir(self, index: QModelIndex) -> bool:
+        return self._node(index).is_dir
+
+    def node_for_path(self, path: str, create: bool = True) -> Optional[_Node]:
+        """Return the node of *path*, adding it and its ancestors (not yet listed) when missing."""
+        path = os.path.abspath(path)
+        drive, rest = os.path.splitdrive(path)
+        top = drive + os.sep
+        node = self._child(self._root, top, top, create)
+        current = top
+        for part in rest.split(os.sep):
+            if not part or node is None:
+                continue
+            current = os.path.join(current, part)
+            node = self._child(node, part, current, create)
+        return node
+
+    # --- Filter support (PathFilterProxyModel) ---
+
+    def row_key(self, source_row: int, source_parent: QModelIndex) -> Tuple[object, str]:
+        """(identity, normalized name) of a row; the proxy filters on these without computing paths."""
+        node = (source_parent.internalPointer() if source_parent.isValid() else self._root).children[source_row]
+        return node, node.filter_name
+
+    def pin_key(self, path: str) -> object:
+        if split_member_path(path) is not None:
+            return None
+        return self.node_for_path(path, create=False)
+
+    # --- Loading ---
+
+    def load(self, index: QModelIndex) -> None:
+        """Start listing a folder that was never listed, or re-list it when the listing is stale."""
+        node = self._node(index)
+        if not node.is_dir or node.loading or node is self._root:
+            return
+        if node.listed_at is None or time.monotonic() - node.listed_at > LISTING_TTL_SECONDS:
+            self._start_scan(node)
+
+    def refresh(self, index: QModelIndex) -> None:
+        node = self._node(index)
+        if node.is_dir and not node.loading and node is not self._root:
+            self._start_scan(node)
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:  # type: ignore[override]
+        node = self._node(parent)
+        return node.is_dir and node.listed_at is None and not node.loading
+
+    def fetchMore(self, parent: QModelIndex) -> None:  # type: ignore[override]
+        if self.canFetchMore(parent):
+            self._start_scan(self._node(parent))
+
+    def _start_scan(self, node: _Node) -> None:
+        signals = WorkerSignals()
+        signals.progress.connect(lambda batch, s=signals: self._on_batch(s, node, batch))
+        signals.result.connect(lambda result, s=signals: self._on_scan_finished(s, node, result))
+        node.loading = True
+        self._scans[node] = signals
+        self._seen[node] = set()
+        QThreadPool.globalInstance().start(Worker(scan_directory, node.path, signals.progress.emit, signals=signals))
+
+    def _on_batch(self, signals: WorkerSignals, node: _Node, batch: List[EntryInfo]) -> None:
+        if self._scans.get(node) is signals:
+            self._merge(node, batch)
+
+    def _on_scan_finished(self, signals: WorkerSignals, node: _Node, result: Tuple[List[EntryInfo], bool]) -> None:
+        if self._scans.get(node) is not signals:
+            return  # 読み直しが始まったか、フォルダが消えた
+        del self._scans[node]
+        batch, complete = result
+        self._merge(node, batch)
+        seen = self._seen.pop(node)
+        node.loading = False
+        node.listed_at = time.monotonic()
+        if complete:
+            self._remove_missing(node, seen)
+        if node in self._unsorted:
+            self._unsorted.discard(node)
+            self._sort_children(node)
+        if node in self._updated:
+            self._updated.discard(node)
+            if node.children:
+                parent = self._index_of(node)
+                self.dataChanged.emit(self.index(0, self.COL_SIZE, parent),
+                                      self.index(len(node.children) - 1, self.COL_MTIME, parent))
+        self.directory_loaded.emit(node.path)
+
+    def _merge(self, node: _Node, batch: List[EntryInfo]) -> None:
+        seen = self._seen[node]
+        new_nodes: List[_Node] = []
+        for name, path, is_dir, size, mtime, filter_name in batch:
+            key = os.path.normcase(name)
+            seen.add(key)
+            child = node.by_key.get(key)
+            if child is None:
+                child = _Node(name, path, node, is_dir, size, mtime, filter_name)
+                child.scanned = True
+                new_nodes.append(child)
+                continue
+            child.scanned = True
+            if (child.is_dir, child.size, child.mtime) != (is_dir, size, mtime):
+                if child.is_dir != is_dir:
+                    self._unsorted.add(node)
+                child.is_dir, child.size, child.mtime = is_dir, size, mtime
+                self._updated.add(node)
+        if new_nodes:
+            self._insert_sorted(node, new_nodes)
+
+    def _insert_sorted(self, node: _Node, new_nodes: List[_Node]) -> None:
+        """
+        Insert *new_nodes* into the children of *node* at their sorted positions, rows that land next to
+        each other in one insertion. Each insertion costs the proxy and view a pass over the list, so when
+        the rows are spread over many places they are appended instead and sorted once when loading ends
+        (a layout change, after which the proxy filters every row again).
+        """
+        new_nodes.sort(key=_sort_key)
+        for child in new_nodes:
+            node.by_key[child.key] = child
+        children = node.children
+        groups: List[Tuple[int, List[_Node]]] = []
+        if node not in self._unsorted:
+            keys = [_sort_key(child) for child in children]
+            for child in new_nodes:
+                position = bisect_right(keys, _sort_key(child))
+                if groups and groups[-1][0] == position:
+                    groups[-1][1].append(child)
+                else:
+                    groups.append((position, [child]))
+        if not groups or len(groups) > MAX_INSERT_GROUPS:
+            groups = [(len(children), new_nodes)]
+            if children:
+                self._unsorted.add(node)
+        # 読み込み済みの子を持つ行は parent() で行番号が使われるため、挿入のたびに合わせます
+        branches = [(child.row, child) for child in children if child.children]
+        parent = self._index_of(node)
+        # 後ろから挿入すると、前の挿入位置がずれません
+        for position, group in reversed(groups):
+            self.beginInsertRows(parent, position, position + len(group) - 1)
+            children[position:position] = group
+            for row, child in enumerate(group, position):
+                child.row = row
+            for original_row, branch in branches:
+                if original_row >= position:
+                    branch.row += len(group)
+            self.endInsertRows()
+        self._renumber(node)
+
+    def _renumber(self, node: _Node, start: int = 0) -> None:
+        children = node.children
+        for row in range(start, len(children)):
+            children[row].row = row
+
+    def _remove_missing(self, node: _Node, seen: Set[str]) -> None:
+        missing = [child.row for child in node.children if child.scanned and child.key not in seen]
+        if not missing:
+            return
+        parent = self._index_of(node)
+        for first, last in reversed(_ranges(missing)):
+            self.beginRemoveRows(parent, first, last)
+            for child in node.children[first:last + 1]:
+                del node.by_key[child.key]
+                seen.discard(child.key)
+                self._forget(child)
+            del node.children[first:last + 1]
+            self._renumber(node, first)
+            self.endRemoveRows()
+
+    def _forget(self, node: _Node) -> None:
+        """Drop the loading state of a removed node and everything below it, so nothing refers to it any more."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self._scans.pop(current, None)
+            self._seen.pop(current, None)
+            self._unsorted.discard(current)
+            self._updated.discard(current)
+            current.loading = False
+            stack.extend(current.children)
+
+    def _sort_children(self, node: _Node) -> None:
+        ordered = sorted(node.children, key=_sort_key)
+        parents = [QPersistentModelIndex(self._index_of(node))]
+        self.layoutAboutToBeChanged.emit(parents, QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
+        persistent = self.persistentIndexList()
+        node.children = ordered
+        self._renumber(node)
+        # 各インデックスは自分のノードを指しているため、新しい行番号はノードから分かります
+        self.changePersistentIndexList(
+            persistent, [self.createIndex(i.internalPointer().row, i.column(), i.internalPointer()) for i in persistent]
+        )
+        self.layoutChanged.emit(parents, QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
+
+    # --- Tree structure ---
+
+    def _node(self, index: QModelIndex) -> _Node:
+        return index.internalPointer() if index.isValid() else self._root
+
+    def _index_of(self, node: _Node, column: int = 0) -> QModelIndex:
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, column, node)
+
+    def _child(self, parent: _Node, name: str, path: str, create: bool) -> Optional[_Node]:
+        child = parent.by_key.get(os.path.normcase(name))
+        if child is not None or not create:
+            return child
+        child = _Node(name, path, parent)
+        self._insert_sorted(parent, [child])
+        return child
+
+    def parent(self, index: QModelIndex = None):  # type: ignore[override]
+        if index is None:
+            return super().parent()  # QObject.parent()
+        if not index.isValid():
+            return QModelIndex()
+        return self._index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        if not parent.isValid():
+            return len(self._root.children)
+        if parent.column() > 0:
+            return 0
+        return len(parent.internalPointer().children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return len(self.COLUMNS)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:  # type: ignore[override]
+        node = self._node(parent)
+        if parent.column() > 0:
+            return False
+        if node.listed_at is None:
+            return node.is_dir  # 未読み込みのフォルダは展開できるように表示します
+        return bool(node.children)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if not index.isValid():
+            return None
+        node: _Node = index.internalPointer()
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.COL_NAME:
+                return node.name
+            if column == self.COL_SIZE:
+                return "" if node.is_dir else format_size(node.size)
+            if column == self.COL_TYPE:
+                if node.is_dir:
+                    return "フォルダー"
+                ext = os.path.splitext(node.name)[1]
+                return f"{ext[1:].upper()} ファイル" if ext else "ファイル"
+            if column == self.COL_MTIME:
+                return time.strftime("%Y-%m-%d %H:%M", time.localtime(node.mtime)) if node.mtime else ""
+        elif role == Qt.ItemDataRole.DecorationRole and column == self.COL_NAME:
+            return self._dir_icon if node.is_dir else self._file_icon
+        elif role == Qt.ItemDataRole.TextAlignmentRole and column == self.COL_SIZE:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        elif role == Qt.ItemDataRole.UserRole:
+            return f"{0 if node.is_dir else 1}{node.filter_name.lower()}"
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
@@ -1,38 +1,63 @@
 from __future__ import annotations
 
 import os
-from typing import List
+import re
+from typing import List, Optional
 
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTreeView, QLineEdit, QPushButton
-from PyQt6.QtCore import QDir, Qt, pyqtSignal, QSortFilterProxyModel
-from PyQt6.QtGui import QFileSystemModel, QShortcut, QKeySequence
+from PyQt6.QtCore import Qt, pyqtSignal, QSortFilterProxyModel, QModelIndex, QThreadPool
+from PyQt6.QtGui import QShortcut, QKeySequence
+
+from utils.archive import is_archive, list_members
+from utils.search_session import compile_name_filter
+from utils.worker import Worker, WorkerSignals
+from widgets.archive_model import ArchiveModel
+from widgets.directory_model import DirectoryModel
 
 class PathFilterProxyModel(QSortFilterProxyModel):
     """Keep the current root directory always visible to prevent fallback to drives."""
 
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
-        self._pinned_root_path: str | None = None
-        self._fs_model: QFileSystemModel | None = None
+        self._pinned_key: object = None
+        self._fs_model: DirectoryModel | ArchiveModel | None = None
+        self._name_regex: Optional[re.Pattern] = None
+        self._filter_error = False
 
     def setSourceModel(self, source) -> None:  # type: ignore[override]
-        super().setSourceModel(source)
-        # QFileSystemModel への参照を保持
+        # DirectoryModel (またはアーカイブのモデル) への参照を保持
+        # (setSourceModel の中で filterAcceptsRow が呼ばれるため、先に切り替えます)
         self._fs_model = source
+        # ピン止めはモデルごとの識別子なので、モデルを切り替えたら設定し直します
+        self._pinned_key = None
+        super().setSourceModel(source)
 
     def set_pinned_root_path(self, path: str) -> None:
-        self._pinned_root_path = os.path.normcase(os.path.abspath(path))
+        # 行ごとにパスを計算しないよう、モデルのノード (アーカイブでは仮想パス) で比較します
+        self._pinned_key = self._fs_model.pin_key(path) if self._fs_model is not None else None
+
+    def setFilterRegularExpression(self, pattern) -> None:  # type: ignore[override]
+        # 名前の照合は、モデルが正規化済みの名前に対して Python の正規表現で行います (walk_files と同じ条件)
+        text = pattern if isinstance(pattern, str) else pattern.pattern()
+        try:
+            self._name_regex = compile_name_filter(text)
+            self._filter_error = False
+        except re.error:
+            self._name_regex = None
+            self._filter_error = True  # 不正な正規表現には何も一致しません
+        super().setFilterRegularExpression(pattern)
 
     def filterAcceptsRow(self, source_row: int, source_parent) -> bool:  # type: ignore[override]
-        if self._fs_model is not None and self._pinned_root_path:
-            idx = self._fs_model.index(source_row, 0, source_parent)
-            if idx.isValid():
-                item_path = os.path.normcase(self._fs_model.filePath(idx))
-                # ピン止めしたルートは常に表示
-                if item_path == self._pinned_root_path:
-                    return True
-        # それ以外は標準の判定（再帰フィルタ有効）
-        return super().filterAcceptsRow(source_row, source_parent)
+        if self._fs_model is None:
+            return True
+        key, name = self._fs_model.row_key(source_row, source_parent)
+        # ピン止めしたルートは常に表示
+        if self._pinned_key is not None and key == self._pinned_key:
+            return True
+        # 子孫の判定は再帰フィルタ (setRecursiveFilteringEnabled) が行います
+        if self._name_regex is None:
+            return not self._filter_error
+        return self._name_regex.search(name) is not None
 
 
 class FileTreeView(QWidget):
@@ -42,6 +67,7 @@ class FileTreeView(QWidget):
     def __init__(self, initial_dir: str, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.initial_dir = initial_dir
+        self._archive_signals: WorkerSignals | None = None
         self.init_ui()
 
     def init_ui(self) -> None:
@@ -50,9 +76,10 @@ class FileTreeView(QWidget):
         layout.setSpacing(0)
         self.setLayout(layout)
 
-        self.model = QFileSystemModel()
-        self.model.setRootPath(QDir.rootPath())
-        self.model.setFilter(QDir.Filter.AllDirs | QDir.Filter.AllEntries | QDir.Filter.NoDotAndDotDot)
+        # フォルダはバックグラウンドで読み込まれ、行はバッチ単位で追加されます
+        self.fs_model = DirectoryModel(self)
+        # 表示中のモデル。アーカイブを開いている間は ArchiveModel に切り替わります
+        self.model: DirectoryModel | ArchiveModel = self.fs_model
 
         self.proxy_model = PathFilterProxyModel()
         self.proxy_model.setSourceModel(self.model)
@@ -62,9 +89,12 @@ class FileTreeView(QWidget):
         self.tree = QTreeView()
         self.tree.setModel(self.proxy_model)
         self.tree.setColumnWidth(0, 300)
+        # 行の高さはすべて同じなので、大きなフォルダでも行ごとに高さを測りません
+        self.tree.setUniformRowHeights(True)
         root_src_idx = self.model.index(self.initial_dir)
         self.proxy_model.set_pinned_root_path(self.initial_dir)
         self.tree.setRootIndex(self.proxy_model.mapFromSource(root_src_idx))
+        self.fs_model.load(root_src_idx)
         self.tree.doubleClicked.connect(self.on_item_double_clicked)
         self.tree.setHeaderHidden(True)
         self.tree.setIndentation(15)
@@ -75,6 +105,7 @@ class FileTreeView(QWidget):
         
         shortcut = QShortcut(QKeySequence("Ctrl+L"), self)
         shortcut.activated.connect(self.path_bar.selectAll)
+        QShortcut(QKeySequence("F5"), self, activated=self.refresh_current_directory)
 
         self.back_button = QPushButton("⬅")
         self.back_button.setObjectName("back_button")
@@ -88,20 +119,59 @@ class FileTreeView(QWidget):
         layout.addLayout(path_layout)
         layout.addWidget(self.tree)
 
+    def in_archive(self) -> bool:
+        return isinstance(self.model, ArchiveModel)
+
+    def open_archive(self, archive_path: str) -> None:
+        """List the archive's members in the background, then browse them in the tree."""
+        signals = WorkerSignals()
+        signals.result.connect(lambda members, s=signals: self.show_archive(s, archive_path, members))
+        signals.error.connect(lambda error: print(f"Error reading archive {archive_path}: {error}"))
+        self._archive_signals = signals
+        QThreadPool.globalInstance().start(Worker(list_members, archive_path, signals=signals))
+
+    def show_archive(self, signals: WorkerSignals, archive_path: str, members) -> None:
+        if signals is not self._archive_signals:
+            return  # 後から別のアーカイブが開かれた
+        self._archive_signals = None
+        self.model = ArchiveModel(archive_path, members, self)
+        self.proxy_model.setSourceModel(self.model)
+        self.tree.setRootIndex(QModelIndex())
+        self.path_bar.setText(archive_path)
+        self.proxy_model.set_pinned_root_path(archive_path)
+        self.directory_changed.emit(archive_path)
+
+    def close_archive(self) -> str:
+        """Return to the file system model; returns the path of the archive that was open."""
+        archive_path = self.model.archive_path
+        self.model = self.fs_model
+        self.proxy_model.setSourceModel(self.fs_model)
+        return archive_path
+
     def on_item_double_clicked(self, index) -> None:
         source_index = self.proxy_model.mapToSource(index)
         file_path = self.model.filePath(source_index)
-        if os.path.isfile(file_path):
+        if self.in_archive() and not self.model.isDir(source_index):
+            self.file_double_clicked.emit(file_path)
+        elif not self.in_archive() and is_archive(file_path) and os.path.isfile(file_path):
+            self.open_archive(file_path)
+        elif os.path.isfile(file_path):
             self.file_double_clicked.emit(file_path)
         else:
             self.tree.setRootIndex(index)
             self.path_bar.setText(file_path)
             # ルート固定（フィルタで隠れないようにする）
             self.proxy_model.set_pinned_root_path(file_path)
+            self._load_directory(source_index)
             self.directory_changed.emit(file_path)
 
     def on_path_entered(self) -> None:
         path = self.path_bar.text()
+        if is_archive(path) and os.path.isfile(path):
+            self.open_archive(path)
+            return
+        if os.path.isdir(path) and self.in_archive():
+            self.close_archive()
         if os.path.isdir(path):
             source_index = self.model.index(path)
             if source_index.isValid():
@@ -109,6 +179,7 @@ class FileTreeView(QWidget):
                 self.tree.setRootIndex(proxy_index)
                 self.tree.scrollTo(proxy_index)
                 self.proxy_model.set_pinned_root_path(path)
+                self._load_directory(source_index)
                 self.directory_changed.emit(path)
         elif os.path.isfile(path):
             self.file_double_clicked.emit(path)
@@ -116,19 +187,45 @@ class FileTreeView(QWidget):
     def go_to_parent_directory(self) -> None:
         current_index = self.tree.rootIndex()
         source_index = self.proxy_model.mapToSource(current_index)
-        parent_source_index = source_index.parent()
+        if self.in_archive() and not source_index.isValid():
+            # アーカイブの最上位からは、アーカイブのあるフォルダに戻ります
+            archive_path = self.close_archive()
+            parent_source_index = self.fs_model.index(os.path.dirname(archive_path))
+        else:
+            parent_source_index = source_index.parent()
         if parent_source_index.isValid():
             parent_proxy_index = self.proxy_model.mapFromSource(parent_source_index)
             self.tree.setRootIndex(parent_proxy_index)
             file_path = self.model.filePath(parent_source_index)
             self.path_bar.setText(file_path)
             self.proxy_model.set_pinned_root_path(file_path)
+            self._load_directory(parent_source_index)
             self.directory_changed.emit(file_path)
+        elif self.in_archive():
+            # アーカイブ内のフォルダからアーカイブの最上位へ
+            self.tree.setRootIndex(QModelIndex())
+            self.path_bar.setText(self.model.archive_path)
+            self.proxy_model.set_pinned_root_path(self.model.archive_path)
+            self.directory_changed.emit(self.model.archive_path)
+
+    def _load_directory(self, source_index: QModelIndex) -> None:
+        # 未読み込みのフォルダは読み込みを始め、古くなった一覧は読み直します
+        if not self.in_archive():
+            self.fs_model.load(source_index)
+
+    def refresh_current_directory(self) -> None:
+        if not self.in_archive():
+            self.fs_model.refresh(self.proxy_model.mapToSource(self.tree.rootIndex()))
 
     def apply_filter(self, filter_pattern: str) -> None:
         self.proxy_model.setFilterRegularExpression(filter_pattern)
 
+    def get_filter_pattern(self) -> str:
+        """Return the name filter currently applied to the tree (not the text being typed)."""
+        return self.proxy_model.filterRegularExpression().pattern()
+
     def get_current_directory(self) -> str:
+        """Return the tree's root: a directory, an open archive or a folder inside it (virtual path)."""
         source_index = self.proxy_model.mapToSource(self.tree.rootIndex())
         return self.model.filePath(source_index)
 
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import re
+import sys
+import threading
+from bisect import bisect_left
+from typing import Callable, List, Optional, Tuple
+
+from PyQt6.QtCore import Qt, QThreadPool, QTimer
+from PyQt6.QtGui import QColor, QKeySequence, QShortcut, QTextCharFormat, QTextCursor
+from PyQt6.QtWidgets import QHBoxLayout, QLabel, QLineEdit, QPushButton, QTextEdit, QWidget
+
+from utils.worker import Worker, WorkerSignals
+
+# 入力が止まってから検索を始めるまでの時間 (ms)
+FIND_DEBOUNCE_MS = 120
+# 位置を保持するヒット数の上限 (件数はすべて数えます)
+MAX_FIND_HITS = 100_000
+# ハイライト表示するヒット数の上限
+MAX_HIGHLIGHTS = 2000
+# キャンセルを確認する間隔 (ヒット数)
+CANCEL_CHECK_INTERVAL = 512
+
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def compile_find_pattern(text: str) -> Optional[re.Pattern]:
+    """
+    入力全体を1つの文字列として (空白も含めてそのまま) 大文字小文字を区別せずに検索するパターンです。
+    内容検索の AND 検索とは異なり、ブラウザやエディタの検索と同じく入力どおりの並びだけに一致します。
+    """
+    return re.compile(re.escape(text), re.IGNORECASE) if text else None
+
+
+def find_matches(pattern: re.Pattern, text: str, cancelled: threading.Event,
+                 first_hit: Callable[[Tuple[int, int]], None]) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+    """
+    text 内の一致をすべて数え、(件数, [(開始, 終了), ...]) を返します。位置は QTextDocument と同じ UTF-16 単位です。
+    最初の一致は見つかった時点で first_hit に渡します。キャンセルされた場合は None を返します。
+    """
+    # BMP 外の文字は UTF-16 で2単位になるため、その位置を数えて補正します
+    astral = [] if text.isascii() else [m.start() for m in _ASTRAL.finditer(text)]
+
+    def utf16(pos: int) -> int:
+        return pos + bisect_left(astral, pos) if astral else pos
+
+    count = 0
+    hits: List[Tuple[int, int]] = []
+    for match in pattern.finditer(text):
+        if count % CANCEL_CHECK_INTERVAL == 0 and cancelled.is_set():
+            return None
+        count += 1
+        if len(hits) < MAX_FIND_HITS:
+            hits.append((utf16(match.start()), utf16(match.end())))
+            if count == 1:
+                first_hit(hits[0])
+    return count, hits
+
+
+class FindBar(QWidget):
+    """
+    表示中のテキスト内を入力しながら検索するバーです (Ctrl+F で表示、Esc で閉じる)。
+    走査はバックグラウンドで行い、入力のたびに古い走査をキャンセルします。
+    """
+
+    def __init__(self, text_edit: QTextEdit, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self._text: Optional[str] = None
+        self._generation = 0
+        self._cancel: Optional[threading.Event] = None
+        self._signals: Optional[WorkerSignals] = None
+        self._hits: List[Tuple[int, int]] = []
+        self._count = 0
+        self._current = -1
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(FIND_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.start_find)
+        # 別のファイルを表示したら、保持しているテキストと結果を捨てます
+        self.text_edit.textChanged.connect(self.on_document_changed)
+
+        self.init_ui()
+        self.hide()
+
+    def init_ui(self) -> None:
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("表示中のテキストを検索（Enter: 次, Shift+Enter: 前）")
+        self.find_input.textChanged.connect(lambda _text: self._debounce.start())
+        self.find_input.returnPressed.connect(self.find_next)
+        layout.addWidget(self.find_input)
+
+        self.count_label = QLabel("")
+        layout.addWidget(self.count_label)
+
+        self.prev_button = QPushButton("▲")
+        self.prev_button.setFixedWidth(28)
+        self.prev_button.clicked.connect(self.find_previous)
+        self.next_button = QPushButton("▼")
+        self.next_button.setFixedWidth(28)
+        self.next_button.clicked.connect(self.find_next)
+        self.close_button = QPushButton("X")
+        self.close_button.setFixedSize(24, 24)
+        self.close_button.clicked.connect(self.close_bar)
+        layout.addWidget(self.prev_button)
+        layout.addWidget(self.next_button)
+        layout.addWidget(self.close_button)
+
+        QShortcut(QKeySequence("Shift+Return"), self.find_input, activated=self.find_previous,
+                  context=Qt.ShortcutContext.WidgetShortcut)
+        QShortcut(QKeySequence("Escape"), self, activated=self.close_bar,
+                  context=Qt.ShortcutContext.WidgetWithChildrenShortcut)
+
+    def open_bar(self) -> None:
+        self.show()
+        self.find_input.setFocus()
+        self.find_input.selectAll()
+        if self.find_input.text():
+            self.start_find()
+
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self._text) if self._text is not None else 0
+
+    def close_bar(self) -> None:
+        self._cancel_scan()
+        self.text_edit.setExtraSelections([])
+        self.hide()
+        self.text_edit.setFocus()
+
+    def on_document_changed(self) -> None:
+        self._text = None
+        self._cancel_scan()
+        self._set_results(0, [])
+        if self.isVisible() and self.find_input.text():
+            self._debounce.start()
+
+    def _cancel_scan(self) -> None:
+        self._generation += 1
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+        self._signals = None
+
+    def start_find(self) -> None:
+        self._cancel_scan()
+        pattern = compile_find_pattern(self.find_input.text())
+        if pattern is None:
+            self._set_results(0, [])
+            self.count_label.setText("")
+            return
+        if self._text is None:
+            # 文書と同じ位置になるよう、表示中の文書からテキストを取り出します (ファイルごとに1回)
+            self._text = self.text_edit.toPlainText()
+
+        generation = self._generation
+        cancelled = threading.Event()
+        signals = WorkerSignals()
+        signals.progress.connect(lambda hit: self.on_first_hit(generation, hit))
+        signals.result.connect(lambda result: self.on_find_finished(generation, result))
+        self._cancel = cancelled
+        self._signals = signals
+        self.count_label.setText("検索中...")
+        worker = Worker(find_matches, pattern, self._text, cancelled, signals.progress.emit, signals=signals)
+        QThreadPool.globalInstance().start(worker)
+
+    def on_first_hit(self, generation: int, hit: Tuple[int, int]) -> None:
+        if generation != self._generation:
+            return
+        self._select(hit)
+
+    def on_find_finished(self, generation: int, result) -> None:
+        if generation != self._generation or result is None:
+            return
+        count, hits = result
+        self._cancel = None
+        self._set_results(count, hits)
+        if hits:
+            self._current = 0
+            self._select(hits[0])
+        self._update_label()
+
+    def _set_results(self, count: int, hits: List[Tuple[int, int]]) -> None:
+        self._count = count
+        self._hits = hits
+        self._current = -1
+        self._highlight(hits[:MAX_HIGHLIGHTS])
+
+    def _highlight(self, hits: List[Tuple[int, int]]) -> None:
+        fmt = QTextCharFormat()
+        fmt.setBackground(QColor("#ffd27f"))
+        selections = []
+        document = self.text_edit.document()
+        for start, end in hits:
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = QTextCursor(document)
+            selection.cursor.setPosition(start)
+            selection.cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            selection.format = fmt
+            selections.append(selection)
+        self.text_edit.setExtraSelections(selections)
+
+    def _select(self, hit: Tuple[int, int]) -> None:
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(hit[0])
+        cursor.setPosition(hit[1], QTextCursor.MoveMode.KeepAnchor)
+        self.text_edit.setTextCursor(cursor)
+        self.text_edit.ensureCursorVisible()
+
+    def _update_label(self) -> None:
+        if not self._count:
+            self.count_label.setText("見つかりません")
+        else:
+            self.count_label.setText(f"{self._current + 1} / {self._count} 件")
+
+    def _step(self, delta: int) -> None:
+        if not self._hits:
+            return
+        self._current = (self._current + delta) % len(self._hits)
+        self._select(self._hits[self._current])
+        self._update_label()
+
+    def find_next(self) -> None:
+        if self._debounce.isActive():
+            # 入力直後の Enter は待たずに検索します
+            self._debounce.stop()
+            self.start_find()
+            return
+        self._step(1)
+
+    def find_previous(self) -> None:
+        self._step(-1)
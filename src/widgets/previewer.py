@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import os
-from typing import List
+import time
+from typing import Sequence, Tuple
 
 from PyQt6.QtWidgets import (
     QWidget,
@@ -13,24 +14,69 @@ from PyQt6.QtWidgets import (
     QStackedWidget,
     QListWidget,
     QListWidgetItem,
+    QLineEdit,
+    QTableView,
+    QAbstractItemView,
+    QHeaderView,
     QMenu,
     QApplication,
 )
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QPixmap, QImage, QTextCharFormat, QTextCursor, QColor, QTextDocument
+from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer, QModelIndex
+from PyQt6.QtGui import QPixmap, QImage, QIcon, QTextCharFormat, QTextCursor, QColor, QKeySequence, QShortcut
+
+from utils.disk_cache import file_identity
+from utils.file_operations import get_pdf_page_count, render_pdf_page
+from utils.memory_budget import BudgetedCache, MemoryReporter, memory_budget
+from utils.search_session import SearchQuery
+from utils.thumbnail_cache import ThumbnailCache, ThumbnailRenderTask
+from utils.worker import PDF_PAGE_PRIORITY, Worker, WorkerSignals, pdf_thread_pool
+from widgets.find_bar import FindBar
+from widgets.search_results_model import SearchResultsModel, SearchResultsProxy, format_size
+
+
+def render_page_image(pdf_path: str, page_num: int, width: int, height: int):
+    """Render a page scaled to width x height on the PDF thread. Returns (QImage or None, seconds)."""
+    start = time.perf_counter()
+    page_pixmap = render_pdf_page(pdf_path, page_num)
+    if page_pixmap is None:
+        return None, 0.0
+    img = QImage(page_pixmap.samples, page_pixmap.width, page_pixmap.height, page_pixmap.stride, QImage.Format.Format_RGB888)
+    # scaled() copies, so the image no longer refers to the pixmap's buffer
+    image = img.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    return image, time.perf_counter() - start
 
-from utils.file_operations import render_pdf_as_pixmaps
 
 class Previewer(QWidget):
     file_selected_from_search = pyqtSignal(str)
+    history_back_requested = pyqtSignal()
+    history_forward_requested = pyqtSignal()
+    attachment_selected = pyqtSignal(str)
+    # Budget eviction can run on any thread; icons are cleared on the GUI thread
+    thumbnail_evicted = pyqtSignal(int)
 
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
+        # current_pdf_path is the temporary copy (None while it is being made); current_pdf_file the original
         self.current_pdf_path = None
+        self.current_pdf_file = None
         self.current_pdf_page = 0
         self.total_pdf_pages = 0
         self.search_keyword = ""
+        self.thumbnail_cache = ThumbnailCache()
+        self._thumbnail_task: ThumbnailRenderTask | None = None
+        self._thumbnail_signals: WorkerSignals | None = None
+        self._thumbnail_identity: str | None = None
+        self._pdf_signals: WorkerSignals | None = None
+        self._results_revealed = False
+        # Rendered pages (QImage, safe to free from any thread) and loaded thumbnails
+        self.page_image_cache = BudgetedCache("pdf_pages")
+        self.thumbnail_icons = BudgetedCache(
+            "thumbnails", on_evict=lambda page_num, _value: self.thumbnail_evicted.emit(page_num)
+        )
+        self._preview_text_bytes = 0
+        memory_budget.register(MemoryReporter("preview_text", self._preview_text_usage))
         self.init_ui()
+        self.thumbnail_evicted.connect(self.on_thumbnail_evicted)
 
     def init_ui(self) -> None:
         main_layout = QVBoxLayout()
@@ -49,8 +95,52 @@ class Previewer(QWidget):
         # --- View 1: Search Results View ---
         self.search_results_view = QWidget()
         results_layout = QVBoxLayout()
-        self.search_results_list = QListWidget()
-        self.search_results_list.itemDoubleClicked.connect(self.on_search_result_selected)
+        history_layout = QHBoxLayout()
+        self.history_back_button = QPushButton("◀")
+        self.history_back_button.setToolTip("前の検索結果")
+        self.history_back_button.clicked.connect(self.history_back_requested)
+        self.history_forward_button = QPushButton("▶")
+        self.history_forward_button.setToolTip("次の検索結果")
+        self.history_forward_button.clicked.connect(self.history_forward_requested)
+        self.history_label = QLabel("")
+        history_layout.addWidget(self.history_back_button)
+        history_layout.addWidget(self.history_forward_button)
+        history_layout.addWidget(self.history_label, 1)
+        results_layout.addLayout(history_layout)
+        self.set_history_state(False, False, "")
+
+        self.results_filter = QLineEdit()
+        self.results_filter.setPlaceholderText("検索結果をパスで絞り込み")
+        self.results_filter.setClearButtonEnabled(True)
+        results_layout.addWidget(self.results_filter)
+
+        # Rows are added in batches while the search is still running; the view
+        # only asks the model for (and stats) the rows that are on screen.
+        # Streamed rows are appended unsorted and sorted once when the search
+        # finishes (or a header is clicked), instead of re-sorting every batch
+        self.search_results_model = SearchResultsModel(self)
+        self.search_results_proxy = SearchResultsProxy(self)
+        self.search_results_proxy.setSourceModel(self.search_results_model)
+        self.results_filter.textChanged.connect(self.search_results_proxy.setFilterFixedString)
+
+        # A table with fixed row heights lays out 50,000+ rows without measuring them
+        self.search_results_list = QTableView()
+        self.search_results_list.setModel(self.search_results_proxy)
+        self.search_results_list.setShowGrid(False)
+        self.search_results_list.setWordWrap(False)
+        self.search_results_list.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.search_results_list.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        rows = self.search_results_list.verticalHeader()
+        rows.hide()
+        rows.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        rows.setDefaultSectionSize(self.fontMetrics().height() + 6)
+        self.search_results_list.setSortingEnabled(True)
+        self.search_results_list.sortByColumn(SearchResultsModel.COL_PATH, Qt.SortOrder.AscendingOrder)
+        header = self.search_results_list.horizontalHeader()
+        header.setHighlightSections(False)
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(SearchResultsModel.COL_PATH, QHeaderView.ResizeMode.Stretch)
+        self.search_results_list.doubleClicked.connect(self.on_search_result_selected)
         # Add context menu for copying path
         self.search_results_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.search_results_list.customContextMenuRequested.connect(self.show_search_result_context_menu)
@@ -78,12 +168,38 @@ class Previewer(QWidget):
         self.preview_stack = QStackedWidget()
         self.text_preview = QTextEdit()
         self.text_preview.setReadOnly(True)
+        self.find_bar = FindBar(self.text_preview)
+        preview_layout.addWidget(self.find_bar)
+        QShortcut(QKeySequence("Ctrl+F"), self.preview_view, activated=self.open_find_bar)
         self.pdf_preview = QLabel()
         self.pdf_preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        # Page thumbnails, rendered in the background (visible pages first)
+        self.thumbnail_strip = QListWidget()
+        self.thumbnail_strip.setIconSize(QSize(96, 136))
+        self.thumbnail_strip.setUniformItemSizes(True)
+        self.thumbnail_strip.setFixedWidth(140)
+        self.thumbnail_strip.currentRowChanged.connect(self.on_thumbnail_selected)
+        self.thumbnail_strip.verticalScrollBar().valueChanged.connect(self.prioritize_visible_thumbnails)
+
+        self.pdf_view = QWidget()
+        pdf_view_layout = QHBoxLayout()
+        pdf_view_layout.setContentsMargins(0, 0, 0, 0)
+        pdf_view_layout.addWidget(self.thumbnail_strip)
+        pdf_view_layout.addWidget(self.pdf_preview, 1)
+        self.pdf_view.setLayout(pdf_view_layout)
+
         self.preview_stack.addWidget(self.text_preview)
-        self.preview_stack.addWidget(self.pdf_preview)
+        self.preview_stack.addWidget(self.pdf_view)
         preview_layout.addWidget(self.preview_stack)
 
+        # Mail attachments, opened on double-click
+        self.attachment_list = QListWidget()
+        self.attachment_list.setMaximumHeight(110)
+        self.attachment_list.itemDoubleClicked.connect(self.on_attachment_double_clicked)
+        self.attachment_list.hide()
+        preview_layout.addWidget(self.attachment_list)
+
         # PDF navigation
         pdf_nav_layout = QHBoxLayout()
         self.pdf_prev_button = QPushButton("◀ 前のページ")
@@ -112,12 +228,35 @@ class Previewer(QWidget):
         self.pdf_controls.hide()
         self.back_button.setVisible(bool(self.search_keyword))
         self.current_file_label.setText(file_path)
-        self.text_preview.setText(text_content)
+        # Plain text, so HTML/XML sources are shown as-is and find positions match the text
+        self.text_preview.setPlainText(text_content)
+        # QString holds UTF-16; the budget accounts for the displayed text
+        self._preview_text_bytes = len(text_content) * 2
         self.stack.setCurrentWidget(self.preview_view)
         
         # Always call highlight_keyword. It will handle resetting if the keyword is empty.
         self.highlight_keyword(self.search_keyword)
 
+    def _preview_text_usage(self) -> int:
+        return self._preview_text_bytes + self.find_bar.memory_usage()
+
+    def open_find_bar(self) -> None:
+        if self.preview_stack.currentWidget() is self.text_preview:
+            self.find_bar.open_bar()
+
+    def show_attachments(self, attachments: Sequence[Tuple[str, str, int]]) -> None:
+        """Show (virtual path, file name, size) entries of a mail's attachments below the text."""
+        self.attachment_list.clear()
+        for path, name, size in attachments:
+            item = QListWidgetItem(f"📎 {name}" + (f"  ({format_size(size)})" if size > 0 else ""))
+            item.setData(Qt.ItemDataRole.UserRole, path)
+            item.setToolTip(path)
+            self.attachment_list.addItem(item)
+        self.attachment_list.setVisible(bool(attachments))
+
+    def on_attachment_double_clicked(self, item: QListWidgetItem) -> None:
+        self.attachment_selected.emit(item.data(Qt.ItemDataRole.UserRole))
+
     def highlight_keyword(self, keyword: str) -> None:
         cursor = self.text_preview.textCursor()
         cursor.beginEditBlock()
@@ -135,20 +274,24 @@ class Previewer(QWidget):
             cursor.endEditBlock()
             return
 
-        # Apply new highlights for the given keyword
+        # Apply new highlights for every term of the query (case-insensitive, like the search)
         fmt.setBackground(QColor('yellow'))
         doc = self.text_preview.document()
-        find_flags = QTextDocument.FindFlag.FindCaseSensitively
 
-        first_match_cursor = doc.find(keyword, 0, find_flags)
-        if not first_match_cursor.isNull():
+        first_match_cursor = QTextCursor()
+        for term in SearchQuery(keyword).terms:
+            match_cursor = doc.find(term, 0)
+            if match_cursor.isNull():
+                continue
+            if first_match_cursor.isNull() or match_cursor.position() < first_match_cursor.position():
+                first_match_cursor = match_cursor
             # Use a separate cursor for highlighting to not interfere with find operation
             highlight_cursor = QTextCursor(doc)
             while not highlight_cursor.isNull() and not highlight_cursor.atEnd():
-                highlight_cursor = doc.find(keyword, highlight_cursor, find_flags)
+                highlight_cursor = doc.find(term, highlight_cursor)
                 if not highlight_cursor.isNull():
                     highlight_cursor.mergeCharFormat(fmt)
-        
+
         cursor.endEditBlock()
 
         # Move viewport to the first match
@@ -156,30 +299,179 @@ class Previewer(QWidget):
             self.text_preview.setTextCursor(first_match_cursor)
 
 
+    def show_cached_pdf(self, file_path: str) -> bool:
+        """
+        Show the page thumbnails of *file_path* from the disk cache before the PDF has been copied.
+        Returns False if the PDF has not been opened before (its page count is not cached).
+        """
+        identity = file_identity(file_path)
+        page_count = self.thumbnail_cache.get_page_count(identity) if identity else None
+        if not page_count:
+            return False
+        self.current_pdf_path = None
+        self._show_pdf_view(file_path, identity, page_count)
+        return True
+
     def show_pdf_preview(self, temp_path: str, file_path: str) -> None:
         self.current_pdf_path = temp_path
+        if self.current_pdf_file == file_path and self._thumbnail_task is not None:
+            # Already shown from the thumbnail cache; pages missing from it can be rendered now
+            if self._thumbnail_task.set_pdf_path(temp_path):
+                self._schedule_thumbnail_task()
+            self.display_pdf_page(self.current_pdf_page)
+            return
+        identity = file_identity(file_path)
+        page_count = self.thumbnail_cache.get_page_count(identity) if identity else None
+        if page_count:
+            self._show_pdf_view(file_path, identity, page_count)
+            self.display_pdf_page(0)
+            return
+        # First open: count the pages on the PDF thread, then build the strip
+        self.current_pdf_file = file_path
+        signals = WorkerSignals()
+        signals.result.connect(lambda count: self.on_pdf_page_count(temp_path, file_path, identity, count))
+        self._pdf_signals = signals
+        pdf_thread_pool().start(Worker(get_pdf_page_count, temp_path, signals=signals), PDF_PAGE_PRIORITY)
+
+    def on_pdf_page_count(self, temp_path: str, file_path: str, identity: str | None, page_count: int) -> None:
+        if temp_path != self.current_pdf_path:
+            return  # 別のファイルに切り替わった後の古い結果
+        if page_count <= 0:
+            self.set_info_text("PDFプレビューエラー")
+            return
+        if identity is not None:
+            self.thumbnail_cache.put_page_count(identity, page_count)
+        self._show_pdf_view(file_path, identity, page_count)
+        self.display_pdf_page(0)
+
+    def _show_pdf_view(self, file_path: str, identity: str | None, page_count: int) -> None:
+        self.current_pdf_file = file_path
         self.current_pdf_page = 0
-        self.preview_stack.setCurrentWidget(self.pdf_preview)
+        self.total_pdf_pages = page_count
+        self.preview_stack.setCurrentWidget(self.pdf_view)
+        self.find_bar.hide()
         self.pdf_controls.show()
         self.back_button.setVisible(bool(self.search_keyword))
         self.current_file_label.setText(file_path)
-        self.display_pdf_page(0)
+        self.pdf_preview.clear()
+        self.pdf_page_label.setText(f"ページ: 1/{page_count}")
+        self.start_thumbnail_rendering(identity)
         self.stack.setCurrentWidget(self.preview_view)
 
     def display_pdf_page(self, page_num: int) -> None:
-        images = render_pdf_as_pixmaps(self.current_pdf_path)
-        if not images:
-            self.set_info_text("PDFプレビューエラー")
-            return
-
-        self.total_pdf_pages = len(images)
         self.current_pdf_page = page_num
         self.pdf_page_label.setText(f"ページ: {self.current_pdf_page + 1}/{self.total_pdf_pages}")
 
-        img = QImage(images[page_num].samples, images[page_num].width, images[page_num].height, images[page_num].stride, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(img)
-        scaled_pixmap = pixmap.scaled(self.pdf_preview.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-        self.pdf_preview.setPixmap(scaled_pixmap)
+        # Keep the thumbnail selection in sync without re-rendering the page
+        if self.thumbnail_strip.currentRow() != page_num:
+            self.thumbnail_strip.blockSignals(True)
+            self.thumbnail_strip.setCurrentRow(page_num)
+            self.thumbnail_strip.blockSignals(False)
+
+        if self.current_pdf_path is None:
+            return  # コピーが終わったら show_pdf_preview が表示します
+        key = (self.current_pdf_path, page_num, self.pdf_preview.width(), self.pdf_preview.height())
+        image = self.page_image_cache.get(key)
+        if image is not None:
+            self.pdf_preview.setPixmap(QPixmap.fromImage(image))
+            return
+        signals = WorkerSignals()
+        signals.result.connect(lambda result: self.on_pdf_page_rendered(key, result))
+        self._pdf_signals = signals
+        pdf_thread_pool().start(Worker(render_page_image, *key, signals=signals), PDF_PAGE_PRIORITY)
+
+    def on_pdf_page_rendered(self, key: tuple, result) -> None:
+        image, seconds = result
+        pdf_path, page_num = key[:2]
+        if image is None:
+            if pdf_path == self.current_pdf_path:
+                self.set_info_text("PDFプレビューエラー")
+            return
+        self.page_image_cache.put(key, image, image.sizeInBytes(), seconds)
+        if pdf_path == self.current_pdf_path and page_num == self.current_pdf_page:
+            self.pdf_preview.setPixmap(QPixmap.fromImage(image))
+
+    def start_thumbnail_rendering(self, identity: str | None) -> None:
+        self.stop_thumbnail_rendering()
+        self.thumbnail_icons.clear()
+        self.thumbnail_strip.clear()
+        for page_num in range(self.total_pdf_pages):
+            self.thumbnail_strip.addItem(QListWidgetItem(str(page_num + 1)))
+        self._thumbnail_identity = identity
+        self._start_thumbnail_task(range(self.total_pdf_pages))
+        # Prioritize once the strip has been laid out
+        QTimer.singleShot(0, self.prioritize_visible_thumbnails)
+
+    def _start_thumbnail_task(self, pages) -> None:
+        task = ThumbnailRenderTask(self.current_pdf_path, self._thumbnail_identity, pages, self.thumbnail_cache)
+        signals = WorkerSignals()
+        signals.progress.connect(lambda payload, t=task: self.on_thumbnail_ready(t, payload))
+        signals.result.connect(lambda more, t=task: self.on_thumbnail_slice_done(t, more))
+        self._thumbnail_task = task
+        self._thumbnail_signals = signals
+        self._schedule_thumbnail_task()
+
+    def _schedule_thumbnail_task(self) -> None:
+        # The task runs in short slices on the PDF thread, so page rendering can cut in between them
+        task = self._thumbnail_task
+        if task is None or task.queued:
+            return
+        task.queued = True
+        pdf_thread_pool().start(Worker(task.run, self._thumbnail_signals.progress.emit, signals=self._thumbnail_signals))
+
+    def on_thumbnail_slice_done(self, task: ThumbnailRenderTask, more: bool) -> None:
+        task.queued = False
+        # set_pdf_path may have added pages after the slice checked for more
+        if task is self._thumbnail_task and (more or task.has_work()):
+            self._schedule_thumbnail_task()
+
+    def stop_thumbnail_rendering(self) -> None:
+        if self._thumbnail_task is not None:
+            self._thumbnail_task.cancel()
+        self._thumbnail_task = None
+        self._thumbnail_signals = None
+
+    def on_thumbnail_ready(self, task: ThumbnailRenderTask, payload) -> None:
+        if task is not self._thumbnail_task:
+            return  # 別のPDFに切り替わった後の古い結果
+        page_num, png = payload
+        item = self.thumbnail_strip.item(page_num)
+        if item is None:
+            return
+        pixmap = QPixmap()
+        if pixmap.loadFromData(png, "PNG"):
+            item.setIcon(QIcon(pixmap))
+            # Reloading from the disk cache is cheap, so thumbnails are evicted early
+            self.thumbnail_icons.put(page_num, None, pixmap.width() * pixmap.height() * 4, 0.001)
+
+    def on_thumbnail_evicted(self, page_num: int) -> None:
+        if page_num in self.thumbnail_icons:
+            return  # 追い出し後に再読み込み済み
+        item = self.thumbnail_strip.item(page_num)
+        if item is not None:
+            item.setIcon(QIcon())
+
+    def prioritize_visible_thumbnails(self, *_args) -> None:
+        if self._thumbnail_task is None or self.thumbnail_strip.count() == 0:
+            return
+        viewport = self.thumbnail_strip.viewport().rect()
+        first = self.thumbnail_strip.indexAt(viewport.topLeft()).row()
+        last = self.thumbnail_strip.indexAt(viewport.bottomLeft()).row()
+        first = max(first, 0)
+        if last < 0:
+            last = min(self.thumbnail_strip.count() - 1, first + 20)
+        visible = range(first, last + 1)
+        if self._thumbnail_task.done:
+            # Reload thumbnails that were evicted under the memory budget
+            missing = [p for p in visible if p not in self.thumbnail_icons]
+            if missing:
+                self._start_thumbnail_task(missing)
+        else:
+            self._thumbnail_task.prioritize(visible)
+
+    def on_thumbnail_selected(self, row: int) -> None:
+        if 0 <= row < self.total_pdf_pages and row != self.current_pdf_page:
+            self.display_pdf_page(row)
 
     def show_prev_pdf_page(self) -> None:
         if self.current_pdf_page > 0:
@@ -189,38 +481,69 @@ class Previewer(QWidget):
         if self.current_pdf_page < self.total_pdf_pages - 1:
             self.display_pdf_page(self.current_pdf_page + 1)
 
-    def display_search_results(self, found_files: List[str], keyword: str) -> None:
+    def begin_search_results(self, keyword: str) -> None:
+        """Reset the results view for a search whose hits will arrive in batches."""
         self.search_keyword = keyword
-        self.search_results_list.clear()
-        if not found_files:
+        self.results_filter.clear()
+        self.search_results_model.clear()
+        self._results_revealed = False
+
+    def append_search_results(self, batch: Sequence[Tuple[str, int]]) -> None:
+        self.search_results_model.append_results(batch)
+        # Show the list as soon as the first hits arrive, but only once, so a
+        # preview opened during the search is not replaced by later batches.
+        if not self._results_revealed and self.search_results_model.rowCount() > 0:
+            self._results_revealed = True
+            self.show_search_results()
+
+    def finish_search_results(self, keyword: str) -> None:
+        self.sort_search_results()
+        if self.search_results_model.rowCount() == 0:
             self.set_info_text(f"'{keyword}' は見つかりませんでした。")
-            return
-            
-        for file_path in found_files:
-            item = QListWidgetItem(file_path)
-            self.search_results_list.addItem(item)
-        self.show_search_results()
+
+    def sort_search_results(self) -> None:
+        """Sort the results once by the header's current column (streamed rows arrive unsorted)."""
+        header = self.search_results_list.horizontalHeader()
+        self.search_results_proxy.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+
+    def display_search_results(self, results: Sequence[Tuple[str, int]], keyword: str) -> None:
+        self.begin_search_results(keyword)
+        self.append_search_results(results)
+        self.finish_search_results(keyword)
+
+    def set_history_state(self, can_go_back: bool, can_go_forward: bool, description: str) -> None:
+        self.history_back_button.setEnabled(can_go_back)
+        self.history_forward_button.setEnabled(can_go_forward)
+        self.history_label.setText(description)
 
     def show_search_results(self) -> None:
         self.stack.setCurrentWidget(self.search_results_view)
 
-    def on_search_result_selected(self, item: QListWidgetItem) -> None:
-        self.file_selected_from_search.emit(item.text())
+    def on_search_result_selected(self, index: QModelIndex) -> None:
+        file_path = index.data(SearchResultsModel.PathRole)
+        if file_path:
+            self.file_selected_from_search.emit(file_path)
 
     def clear_preview(self, clear_keyword: bool = True) -> None:
+        self.stop_thumbnail_rendering()
+        self.current_pdf_path = None
+        self.current_pdf_file = None
+        self.text_preview.clear()
+        self._preview_text_bytes = 0
+        self.attachment_list.clear()
+        self.attachment_list.hide()
         self.set_info_text("")
         if clear_keyword:
             self.search_keyword = ""
 
     def show_search_result_context_menu(self, pos) -> None:
-        if not self.search_results_list.itemAt(pos):
+        index = self.search_results_list.indexAt(pos)
+        if not index.isValid():
             return
-        
+
         menu = QMenu()
         copy_action = menu.addAction("パスをコピー")
-        action = menu.exec(self.search_results_list.mapToGlobal(pos))
-        
+        action = menu.exec(self.search_results_list.viewport().mapToGlobal(pos))
+
         if action == copy_action:
-            item = self.search_results_list.currentItem()
-            if item:
-                QApplication.clipboard().setText(item.text())
+            QApplication.clipboard().setText(index.data(SearchResultsModel.PathRole))
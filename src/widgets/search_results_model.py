@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QObject, QSortFilterProxyModel, Qt
+
+from utils import io_layer
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return str(size)
+
+
+class SearchResultsModel(QAbstractTableModel):
+    """
+    検索結果 (パス, ヒット数) を保持するモデルです。
+    結果はバッチ単位で行追加し、サイズ・更新日時はビューが要求したときに初めて stat します。
+    並べ替えは data() を経由した比較ではなく、Python のリストを直接ソートします。
+    """
+
+    PathRole = Qt.ItemDataRole.UserRole
+
+    COLUMNS = ("パス", "サイズ", "更新日時", "ヒット数")
+    COL_PATH, COL_SIZE, COL_MTIME, COL_HITS = range(4)
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._paths: List[str] = []
+        self._hits: List[int] = []
+        # (size, mtime) per row; None until first requested
+        self._metadata: List[Optional[Tuple[int, float]]] = []
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._paths = []
+        self._hits = []
+        self._metadata = []
+        self.endResetModel()
+
+    def append_results(self, batch: Sequence[Tuple[str, int]]) -> None:
+        if not batch:
+            return
+        first = len(self._paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for path, hits in batch:
+            self._paths.append(path)
+            self._hits.append(hits)
+        self._metadata.extend([None] * len(batch))
+        self.endInsertRows()
+
+    def results(self) -> List[Tuple[str, int]]:
+        return list(zip(self._paths, self._hits))
+
+    def _file_metadata(self, row: int) -> Tuple[int, float]:
+        meta = self._metadata[row]
+        if meta is None:
+            try:
+                st = io_layer.stat(self._paths[row])
+                meta = (st.st_size, st.st_mtime)
+            except OSError:
+                meta = (-1, 0.0)
+            self._metadata[row] = meta
+        return meta
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return 0 if parent.isValid() else len(self._paths)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role in (self.PathRole, Qt.ItemDataRole.ToolTipRole):
+            return self._paths[row]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == self.COL_PATH:
+                return self._paths[row]
+            if col == self.COL_HITS:
+                return str(self._hits[row])
+            size, mtime = self._file_metadata(row)
+            if col == self.COL_SIZE:
+                return format_size(size) if size >= 0 else ""
+            return time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime)) if mtime else ""
+
+        if role == Qt.ItemDataRole.TextAlignmentRole and col != self.COL_PATH:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def _sort_key(self, column: int):
+        if column == self.COL_PATH:
+            return lambda row: self._paths[row].lower()
+        if column == self.COL_HITS:
+            return self._hits.__getitem__
+        # サイズ・更新日時で並べ替えるときだけ、全行を stat します
+        index = 0 if column == self.COL_SIZE else 1
+        return lambda row: self._file_metadata(row)[index]
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:  # type: ignore[override]
+        if not 0 <= column < len(self.COLUMNS) or not self._paths:
+            return
+        self.layoutAboutToBeChanged.emit()
+        rows = sorted(range(len(self._paths)), key=self._sort_key(column),
+                      reverse=order == Qt.SortOrder.DescendingOrder)
+        self._paths = [self._paths[r] for r in rows]
+        self._hits = [self._hits[r] for r in rows]
+        self._metadata = [self._metadata[r] for r in rows]
+        new_rows = [0] * len(rows)
+        for new_row, old_row in enumerate(rows):
+            new_rows[old_row] = new_row
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(new_rows[i.row()], i.column()) for i in persistent]
+        )
+        self.layoutChanged.emit()
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+
+class SearchResultsProxy(QSortFilterProxyModel):
+    """
+    検索結果をパスで絞り込むプロキシです。並べ替えは SearchResultsModel.sort に任せ、
+    行の追加ごとに並べ替え直すこともしません (結果の受信中は追加順、検索の完了時に1回だけ並べ替えます)。
+    """
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.setDynamicSortFilter(False)
+        self.setFilterKeyColumn(SearchResultsModel.COL_PATH)
+        self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:  # type: ignore[override]
+        self.sourceModel().sort(column, order)